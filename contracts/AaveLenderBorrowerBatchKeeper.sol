@@ -0,0 +1,157 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import {StrategyAPI} from "@yearnvaults/contracts/BaseStrategy.sol";
+
+import "@openzeppelin/contracts/utils/Address.sol";
+
+// Tends or harvests a list of strategies in one transaction, calling only the
+// ones whose trigger is true. It has to be set as keeper of every strategy.
+// A strategy that reverts is reported and skipped, the rest of the batch goes on.
+// Strategies of the same market read the same reserve, interest rate strategy
+// and oracle slots, which are warm after the first one.
+contract AaveLenderBorrowerBatchKeeper {
+    using Address for address;
+
+    struct Result {
+        address strategy;
+        bool triggered;
+        bool success;
+        uint256 gasUsed;
+    }
+
+    address public governance;
+    mapping(address => bool) public keepers;
+
+    event Executed(address indexed strategy, bool harvest, uint256 gasUsed);
+    event Failed(address indexed strategy, bool harvest, bytes reason);
+    event UpdatedGovernance(address governance);
+    event UpdatedKeeper(address indexed keeper, bool allowed);
+
+    modifier onlyGovernance() {
+        require(msg.sender == governance); // dev: !governance
+        _;
+    }
+
+    modifier onlyKeepers() {
+        require(msg.sender == governance || keepers[msg.sender]); // dev: !keeper
+        _;
+    }
+
+    constructor() public {
+        governance = msg.sender;
+    }
+
+    function name() external pure returns (string memory) {
+        return "Yearn-AaveLenderBorrowerBatchKeeper@0.4.3";
+    }
+
+    function setGovernance(address _governance) external onlyGovernance {
+        require(_governance != address(0));
+        governance = _governance;
+        emit UpdatedGovernance(_governance);
+    }
+
+    function setKeeper(address _keeper, bool _allowed) external onlyGovernance {
+        keepers[_keeper] = _allowed;
+        emit UpdatedKeeper(_keeper, _allowed);
+    }
+
+    // callCost is passed to the triggers, in wei
+    function tendMany(address[] calldata _strategies, uint256 _callCost)
+        external
+        onlyKeepers
+        returns (Result[] memory)
+    {
+        return _execute(_strategies, _callCost, false);
+    }
+
+    function harvestMany(address[] calldata _strategies, uint256 _callCost)
+        external
+        onlyKeepers
+        returns (Result[] memory)
+    {
+        return _execute(_strategies, _callCost, true);
+    }
+
+    // what tendMany / harvestMany would call, for keepers to check off-chain
+    function workable(
+        address[] calldata _strategies,
+        uint256 _callCost,
+        bool _harvest
+    ) external view returns (bool[] memory triggered) {
+        triggered = new bool[](_strategies.length);
+        for (uint256 i = 0; i < _strategies.length; i++) {
+            triggered[i] = _trigger(_strategies[i], _callCost, _harvest);
+        }
+    }
+
+    function _execute(
+        address[] calldata _strategies,
+        uint256 _callCost,
+        bool _harvest
+    ) internal returns (Result[] memory results) {
+        results = new Result[](_strategies.length);
+        for (uint256 i = 0; i < _strategies.length; i++) {
+            address strategy = _strategies[i];
+            results[i].strategy = strategy;
+            if (!_trigger(strategy, _callCost, _harvest)) {
+                continue;
+            }
+            results[i].triggered = true;
+
+            uint256 gasBefore = gasleft();
+            bytes memory reason;
+            if (_harvest) {
+                try StrategyAPI(strategy).harvest() {
+                    results[i].success = true;
+                } catch (bytes memory _reason) {
+                    reason = _reason;
+                }
+            } else {
+                try StrategyAPI(strategy).tend() {
+                    results[i].success = true;
+                } catch (bytes memory _reason) {
+                    reason = _reason;
+                }
+            }
+            results[i].gasUsed = gasBefore - gasleft();
+
+            if (results[i].success) {
+                emit Executed(strategy, _harvest, results[i].gasUsed);
+            } else {
+                emit Failed(strategy, _harvest, reason);
+            }
+        }
+    }
+
+    function _trigger(
+        address _strategy,
+        uint256 _callCost,
+        bool _harvest
+    ) internal view returns (bool) {
+        // calling an address without code would revert the whole batch
+        if (!_strategy.isContract()) {
+            return false;
+        }
+
+        if (_harvest) {
+            try StrategyAPI(_strategy).harvestTrigger(_callCost) returns (
+                bool triggered
+            ) {
+                return triggered;
+            } catch {
+                return false;
+            }
+        }
+
+        try StrategyAPI(_strategy).tendTrigger(_callCost) returns (
+            bool triggered
+        ) {
+            return triggered;
+        } catch {
+            return false;
+        }
+    }
+}
@@ -5,6 +5,26 @@ pragma experimental ABIEncoderV2;
 import "./Strategy.sol";
 
 contract AaveLenderBorrowerCloner {
+    // everything a clone is initialized with, see Strategy.setStrategyParams
+    struct CloneParams {
+        address vault;
+        address strategist;
+        address rewards;
+        address keeper;
+        address yVault;
+        string strategyName;
+        uint16 targetLTVMultiplier;
+        uint16 warningLTVMultiplier;
+        uint256 acceptableCostsRay;
+        uint16 aaveReferral;
+        uint256 maxTotalBorrowIT;
+        bool isWantIncentivised;
+        bool isInvestmentTokenIncentivised;
+        bool leaveDebtBehind;
+        uint256 maxLoss;
+        uint256 maxGasPriceToTend;
+    }
+
     address public immutable original;
 
     event Cloned(address indexed clone);
@@ -91,4 +111,100 @@ contract AaveLenderBorrowerCloner {
 
         emit Cloned(newStrategy);
     }
+
+    // CREATE2 clones: the address only depends on the caller and _salt, so it
+    // can be known (and funded, or added to a vault) before the clone exists
+    function predictCloneAddress(address _deployer, bytes32 _salt)
+        external
+        view
+        returns (address)
+    {
+        bytes32 hash =
+            keccak256(
+                abi.encodePacked(
+                    bytes1(0xff),
+                    address(this),
+                    _cloneSalt(_deployer, _salt),
+                    keccak256(_cloneCode())
+                )
+            );
+        return address(uint256(hash));
+    }
+
+    function cloneAaveLenderBorrowerDeterministic(
+        CloneParams memory _params,
+        bytes32 _salt
+    ) public returns (address newStrategy) {
+        bytes memory cloneCode = _cloneCode();
+        bytes32 salt = _cloneSalt(msg.sender, _salt);
+        assembly {
+            newStrategy := create2(
+                0,
+                add(cloneCode, 0x20),
+                mload(cloneCode),
+                salt
+            )
+        }
+        require(newStrategy != address(0)); // dev: salt already used
+
+        Strategy(newStrategy).initialize(
+            _params.vault,
+            _params.yVault,
+            _params.strategyName
+        );
+        Strategy(newStrategy).setStrategyParams(
+            _params.targetLTVMultiplier,
+            _params.warningLTVMultiplier,
+            _params.acceptableCostsRay,
+            _params.aaveReferral,
+            _params.maxTotalBorrowIT,
+            _params.isWantIncentivised,
+            _params.isInvestmentTokenIncentivised,
+            _params.leaveDebtBehind,
+            _params.maxLoss,
+            _params.maxGasPriceToTend
+        );
+
+        Strategy(newStrategy).setKeeper(_params.keeper);
+        Strategy(newStrategy).setRewards(_params.rewards);
+        Strategy(newStrategy).setStrategist(_params.strategist);
+
+        emit Cloned(newStrategy);
+    }
+
+    // deploys and configures a whole vault family in one transaction
+    function cloneAaveLenderBorrowerBatch(
+        CloneParams[] memory _params,
+        bytes32[] memory _salts
+    ) external returns (address[] memory newStrategies) {
+        require(_params.length == _salts.length); // dev: length mismatch
+
+        newStrategies = new address[](_params.length);
+        for (uint256 i = 0; i < _params.length; i++) {
+            newStrategies[i] = cloneAaveLenderBorrowerDeterministic(
+                _params[i],
+                _salts[i]
+            );
+        }
+    }
+
+    // EIP-1167 minimal proxy to original, as in cloneAaveLenderBorrower
+    function _cloneCode() internal view returns (bytes memory) {
+        return
+            abi.encodePacked(
+                hex"3d602d80600a3d3981f3363d3d373d3d3d363d73",
+                original,
+                hex"5af43d82803e903d91602b57fd5bf3"
+            );
+    }
+
+    // salts are namespaced by caller, so nobody can take an address predicted
+    // for someone else
+    function _cloneSalt(address _deployer, bytes32 _salt)
+        internal
+        pure
+        returns (bytes32)
+    {
+        return keccak256(abi.encodePacked(_deployer, _salt));
+    }
 }
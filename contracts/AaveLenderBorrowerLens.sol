@@ -0,0 +1,254 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "./Strategy.sol";
+
+// Read-only view of what the next tend of each strategy would do, in one call.
+// It follows adjustPosition step by step: the idle want over debtOutstanding is
+// counted as deposited, then the LTV range decides whether debt is borrowed,
+// repaid or left as is. Nothing is cached: all values are read at the block the
+// call is made at, through the lending pool and price oracle the strategy
+// cached (see Strategy.refreshAaveAddresses), as tend would.
+// amountToRepayIT is what adjustPosition asks the yVault for, the amount
+// actually repaid may be lower if the yVault cannot return all of it.
+contract AaveLenderBorrowerLens {
+    using SafeMath for uint256;
+    using Address for address;
+
+    enum Branch {
+        NO_COLLATERAL, // nothing deposited, adjustPosition returns early
+        SUBOPTIMAL, // borrow
+        HEALTHY, // do nothing
+        UNHEALTHY // repay
+    }
+
+    struct Decision {
+        address strategy;
+        bool success;
+        Branch branch;
+        uint256 amountToBorrowIT;
+        uint256 amountToRepayIT;
+        // bps, after the idle want is deposited
+        uint256 currentLTV;
+        uint256 targetLTV;
+        uint256 warningLTV;
+        // ETH, see AaveLenderBorrowerLib.calcMaxDebt
+        uint256 currentProtocolDebt;
+        uint256 maxProtocolDebt;
+        uint256 targetUtilisationRay;
+        uint256 maxTotalBorrowIT;
+    }
+
+    // Hack to avoid the stack too deep compiler error.
+    struct PreviewLocalVars {
+        ILendingPool lendingPool;
+        IPriceOracle priceOracle;
+        address want;
+        address investmentToken;
+        uint256 totalCollateralETH;
+        uint256 totalDebtETH;
+        uint256 availableBorrowsETH;
+        uint256 currentLiquidationThreshold;
+        uint256 ltv;
+    }
+
+    uint256 internal constant MAX_BPS = 10_000;
+    address internal constant WETH = 0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2;
+
+    function name() external pure returns (string memory) {
+        return "Yearn-AaveLenderBorrowerLens@0.4.3";
+    }
+
+    // a strategy that reverts (or is not a contract) is returned with success false
+    function previewTends(address[] calldata _strategies)
+        external
+        view
+        returns (Decision[] memory decisions)
+    {
+        decisions = new Decision[](_strategies.length);
+        for (uint256 i = 0; i < _strategies.length; i++) {
+            address strategy = _strategies[i];
+            decisions[i].strategy = strategy;
+            if (!strategy.isContract()) {
+                continue;
+            }
+            try this.previewTend(strategy) returns (Decision memory decision) {
+                decisions[i] = decision;
+            } catch {}
+        }
+    }
+
+    function previewTend(address _strategy)
+        public
+        view
+        returns (Decision memory d)
+    {
+        Strategy strategy = Strategy(_strategy);
+        d.strategy = _strategy;
+        d.success = true;
+        d.maxTotalBorrowIT = strategy.maxTotalBorrowIT();
+
+        PreviewLocalVars memory vars;
+        vars.lendingPool = strategy.lendingPool();
+        vars.priceOracle = strategy.priceOracle();
+        vars.want = address(strategy.want());
+        vars.investmentToken = strategy.yVault().token();
+        (
+            vars.totalCollateralETH,
+            vars.totalDebtETH,
+            vars.availableBorrowsETH,
+            vars.currentLiquidationThreshold,
+            vars.ltv,
+
+        ) = vars.lendingPool.getUserAccountData(_strategy);
+
+        // adjustPosition deposits the want over debtOutstanding first
+        uint256 wantBalance = IERC20(vars.want).balanceOf(_strategy);
+        uint256 debtOutstanding =
+            IVault(address(strategy.vault())).debtOutstanding(_strategy);
+        if (wantBalance > debtOutstanding) {
+            _deposit(vars, wantBalance.sub(debtOutstanding));
+        }
+
+        if (vars.totalCollateralETH == 0) {
+            return d;
+        }
+
+        d.currentLTV = vars.totalDebtETH.mul(MAX_BPS).div(
+            vars.totalCollateralETH
+        );
+        d.targetLTV = vars
+            .currentLiquidationThreshold
+            .mul(uint256(strategy.targetLTVMultiplier()))
+            .div(MAX_BPS);
+        d.warningLTV = vars
+            .currentLiquidationThreshold
+            .mul(uint256(strategy.warningLTVMultiplier()))
+            .div(MAX_BPS);
+        (
+            d.currentProtocolDebt,
+            d.maxProtocolDebt,
+            d.targetUtilisationRay
+        ) = AaveLenderBorrowerLib.calcMaxDebt(
+            vars.lendingPool,
+            vars.priceOracle,
+            vars.investmentToken,
+            strategy.acceptableCostsRay()
+        );
+
+        if (
+            d.targetLTV > d.currentLTV &&
+            d.currentProtocolDebt < d.maxProtocolDebt
+        ) {
+            d.branch = Branch.SUBOPTIMAL;
+            d.amountToBorrowIT = _amountToBorrowIT(vars, d);
+        } else if (
+            d.currentLTV > d.warningLTV ||
+            d.currentProtocolDebt > d.maxProtocolDebt
+        ) {
+            d.branch = Branch.UNHEALTHY;
+            d.amountToRepayIT = _amountToRepayIT(vars, d);
+        } else {
+            d.branch = Branch.HEALTHY;
+        }
+    }
+
+    // account data after depositing amount of want, as Aave would compute it
+    // for a single collateral asset (the liquidation threshold is unchanged)
+    function _deposit(PreviewLocalVars memory vars, uint256 amount)
+        internal
+        view
+    {
+        vars.totalCollateralETH = vars.totalCollateralETH.add(
+            _toETH(vars, amount, vars.want)
+        );
+        uint256 maxBorrowsETH = vars.totalCollateralETH.mul(vars.ltv).div(
+            MAX_BPS
+        );
+        vars.availableBorrowsETH = maxBorrowsETH > vars.totalDebtETH
+            ? maxBorrowsETH.sub(vars.totalDebtETH)
+            : 0;
+    }
+
+    function _amountToBorrowIT(
+        PreviewLocalVars memory vars,
+        Decision memory d
+    ) internal view returns (uint256) {
+        uint256 targetDebtETH =
+            vars.totalCollateralETH.mul(d.targetLTV).div(MAX_BPS);
+        uint256 amountToBorrowETH =
+            Math.min(
+                vars.availableBorrowsETH,
+                targetDebtETH.sub(vars.totalDebtETH)
+            );
+
+        if (
+            d.currentProtocolDebt.add(amountToBorrowETH) > d.maxProtocolDebt
+        ) {
+            amountToBorrowETH = d.maxProtocolDebt.sub(d.currentProtocolDebt);
+        }
+
+        uint256 maxTotalBorrowETH =
+            _toETH(vars, d.maxTotalBorrowIT, vars.investmentToken);
+        if (vars.totalDebtETH.add(amountToBorrowETH) > maxTotalBorrowETH) {
+            amountToBorrowETH = maxTotalBorrowETH > vars.totalDebtETH
+                ? maxTotalBorrowETH.sub(vars.totalDebtETH)
+                : 0;
+        }
+
+        return _fromETH(vars, amountToBorrowETH, vars.investmentToken);
+    }
+
+    function _amountToRepayIT(
+        PreviewLocalVars memory vars,
+        Decision memory d
+    ) internal view returns (uint256) {
+        uint256 targetDebtETH =
+            d.targetLTV.mul(vars.totalCollateralETH).div(MAX_BPS);
+        uint256 amountToRepayETH =
+            targetDebtETH < vars.totalDebtETH
+                ? vars.totalDebtETH.sub(targetDebtETH)
+                : 0;
+
+        if (d.maxProtocolDebt == 0) {
+            amountToRepayETH = vars.totalDebtETH;
+        } else if (d.currentProtocolDebt > d.maxProtocolDebt) {
+            uint256 iterativeRepayAmountETH =
+                d
+                    .currentProtocolDebt
+                    .sub(d.maxProtocolDebt)
+                    .mul(WadRayMath.RAY)
+                    .div(uint256(WadRayMath.RAY).sub(d.targetUtilisationRay));
+            amountToRepayETH = Math.max(
+                amountToRepayETH,
+                iterativeRepayAmountETH
+            );
+        }
+
+        return _fromETH(vars, amountToRepayETH, vars.investmentToken);
+    }
+
+    // same special cases as Strategy._toETH and _fromETH
+    function _toETH(
+        PreviewLocalVars memory vars,
+        uint256 _amount,
+        address asset
+    ) internal view returns (uint256) {
+        if (_amount == 0 || _amount == type(uint256).max || asset == WETH) {
+            return _amount;
+        }
+        return AaveLenderBorrowerLib.toETH(_amount, asset, vars.priceOracle);
+    }
+
+    function _fromETH(
+        PreviewLocalVars memory vars,
+        uint256 _amount,
+        address asset
+    ) internal view returns (uint256) {
+        if (_amount == 0 || _amount == type(uint256).max || asset == WETH) {
+            return _amount;
+        }
+        return AaveLenderBorrowerLib.fromETH(_amount, asset, vars.priceOracle);
+    }
+}
@@ -33,30 +33,51 @@ contract Strategy is BaseStrategy {
     using SafeMath for uint256;
     using WadRayMath for uint256;
 
-    // max interest rate we can afford to pay for borrowing investment token
-    // amount in Ray (1e27 = 100%)
-    uint256 public acceptableCostsRay = WadRayMath.RAY;
+    // Parameters set with setStrategyParams (and setFlashLoanUnwind), packed
+    // in a single slot: tendTrigger and adjustPosition copy it to memory with
+    // one SLOAD. Each one but referral has a getter of the same name
+    struct Config {
+        // max interest rate we can afford to pay for borrowing investment token
+        // amount in Ray (1e27 = 100%)
+        uint96 acceptableCostsRay;
+        // NOTE: LTV = Loan-To-Value = debt/collateral
+        // Target LTV: ratio up to which which we will borrow
+        uint16 targetLTVMultiplier;
+        // Warning LTV: ratio at which we will repay
+        uint16 warningLTVMultiplier;
+        // max base fee to borrow or repay when LTV is not past warning
+        uint64 maxGasPriceToTend;
+        // bps, for yVault withdrawals
+        uint16 maxLoss;
+        // Aave's referral code
+        uint16 referral;
+        bool isWantIncentivised;
+        bool isInvestmentTokenIncentivised;
+        // if set to true, the strategy will not try to repay debt by selling want
+        bool leaveDebtBehind;
+        // if set to true, withdrawals the yVault cannot cover repay the debt
+        // with a flash loan of investment token, see _flashLoanUnwind
+        bool flashLoanUnwind;
+    }
+
+    Config internal config =
+        Config({
+            acceptableCostsRay: uint96(WadRayMath.RAY),
+            targetLTVMultiplier: 6_000,
+            warningLTVMultiplier: 8_000, // 80% of liquidation LTV
+            maxGasPriceToTend: 0,
+            maxLoss: 0,
+            referral: 0,
+            isWantIncentivised: false,
+            isInvestmentTokenIncentivised: false,
+            leaveDebtBehind: false,
+            flashLoanUnwind: false
+        });
 
     // max amount to borrow. used to manually limit amount (for yVault to keep APY)
+    // only read when borrowing, so it keeps its own slot
     uint256 public maxTotalBorrowIT;
 
-    bool public isWantIncentivised;
-    bool public isInvestmentTokenIncentivised;
-
-    // if set to true, the strategy will not try to repay debt by selling want
-    bool public leaveDebtBehind;
-
-    // Aave's referral code
-    uint16 internal referral;
-
-    // NOTE: LTV = Loan-To-Value = debt/collateral
-
-    // Target LTV: ratio up to which which we will borrow
-    uint16 public targetLTVMultiplier = 6_000;
-
-    // Warning LTV: ratio at which we will repay
-    uint16 public warningLTVMultiplier = 8_000; // 80% of liquidation LTV
-
     // support
     uint16 internal constant MAX_BPS = 10_000; // 100%
     uint16 internal constant MAX_MULTIPLIER = 9_000; // 90%
@@ -68,6 +89,15 @@ contract Strategy is BaseStrategy {
 
     ISwap public router;
 
+    // resolved from Aave's addresses provider, see refreshAaveAddresses
+    ILendingPool public lendingPool;
+    IPriceOracle public priceOracle;
+    // cached at initialization, packed in the same slot as priceOracle
+    uint8 internal wantDecimals;
+    uint8 internal investmentTokenDecimals;
+    // investment token's interest rate strategy params, see calcMaxDebt
+    AaveLenderBorrowerLib.IrsCache internal irsCache;
+
     IStakedAave internal constant stkAave =
         IStakedAave(0x4da27a545c0c5B758a6BA100e3a049001de870f5);
 
@@ -83,12 +113,110 @@ contract Strategy is BaseStrategy {
         ISwap(0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D);
 
     uint256 internal minThreshold;
-    uint256 public maxLoss;
-    uint256 public maxGasPriceToTend;
     string internal strategyName;
 
+    // what limited the amount adjustPosition borrowed, NONE if it borrowed up
+    // to targetLTV
+    enum BorrowCap {
+        NONE,
+        AVAILABLE_BORROWS,
+        MAX_PROTOCOL_DEBT,
+        MAX_TOTAL_BORROW
+    }
+
+    // why adjustPosition repaid: LTV over warningLTV (takes precedence),
+    // borrowing costs over acceptableCostsRay, or costs that are not
+    // acceptable at any utilisation (maxProtocolDebt == 0, all debt is repaid)
+    enum RepayReason {
+        WARNING_LTV,
+        COSTS,
+        NO_ACCEPTABLE_DEBT
+    }
+
     event RepayDebt(uint256 repayAmount, uint256 previousDebtBalance);
 
+    // One of Borrowed, Repaid or Held is emitted by every adjustPosition with
+    // collateral in Aave, with the values the decision was made on: LTVs in
+    // bps, collateral, debt and protocol debts in ETH. Together with Unwound
+    // and FlashLoanUnwound they follow every change of the position without
+    // reading past state.
+    event Borrowed(
+        uint256 amountIT,
+        BorrowCap cap,
+        uint256 totalCollateralETH,
+        uint256 totalDebtETH,
+        uint256 targetLTV,
+        uint256 currentProtocolDebt,
+        uint256 maxProtocolDebt
+    );
+    // amountIT is what was asked from the yVault, repaidIT what was repaid
+    event Repaid(
+        uint256 amountIT,
+        uint256 repaidIT,
+        RepayReason reason,
+        uint256 totalCollateralETH,
+        uint256 totalDebtETH,
+        uint256 targetLTV,
+        uint256 currentProtocolDebt,
+        uint256 maxProtocolDebt
+    );
+    event Held(
+        uint256 totalCollateralETH,
+        uint256 totalDebtETH,
+        uint256 targetLTV,
+        uint256 warningLTV,
+        uint256 currentProtocolDebt,
+        uint256 maxProtocolDebt
+    );
+    // liquidatePosition, when the want balance did not cover amountNeeded.
+    // boughtIT is the investment token bought with want to repay the debt
+    // left once the yVault is empty (realising a loss)
+    event Unwound(
+        uint256 amountNeeded,
+        uint256 repaidIT,
+        uint256 withdrawn,
+        uint256 boughtIT,
+        uint256 loss
+    );
+    // boughtIT is the part of the loan and premium paid back with want
+    event FlashLoanUnwound(
+        uint256 amountIT,
+        uint256 premiumIT,
+        uint256 boughtIT
+    );
+    // reason is the revert data of the loan or of executeOperation
+    event FlashLoanFailed(uint256 amountIT, bytes reason);
+    event SoldAave(uint256 aaveAmount, uint256 wantAmount);
+    event StartedCooldown(uint256 stkAaveBalance);
+
+    // Values a harvest, tend or withdrawal would otherwise read several times.
+    // They are loaded on first use (see _loadPrices, _loadYVault and
+    // _loadAccount) and passed through the internal functions. The account
+    // data is updated in place after each repay and withdrawal from Aave
+    // (availableBorrowsETH is not, it is only used before any of them)
+    struct Context {
+        uint256 wantPrice;
+        uint256 investmentTokenPrice;
+        uint256 pricePerShare;
+        uint256 yVaultUnit;
+        bool accountLoaded;
+        uint256 totalCollateralETH;
+        uint256 totalDebtETH;
+        uint256 availableBorrowsETH;
+        uint256 currentLiquidationThreshold;
+        uint256 ltv;
+    }
+
+    // what adjustPosition decides on, in memory to keep the stack small
+    struct Adjustment {
+        uint256 currentLTV;
+        uint256 targetLTV;
+        uint256 warningLTV;
+        uint256 currentProtocolDebt;
+        uint256 maxProtocolDebt;
+        uint256 targetUtilisationRay;
+    }
+
     constructor(
         address _vault,
         address _yVault,
@@ -103,23 +231,45 @@ contract Strategy is BaseStrategy {
         return strategyName;
     }
 
+    function acceptableCostsRay() external view returns (uint256) {
+        return config.acceptableCostsRay;
+    }
+
+    function targetLTVMultiplier() external view returns (uint16) {
+        return config.targetLTVMultiplier;
+    }
+
+    function warningLTVMultiplier() external view returns (uint16) {
+        return config.warningLTVMultiplier;
+    }
+
+    function maxGasPriceToTend() external view returns (uint256) {
+        return config.maxGasPriceToTend;
+    }
+
+    function maxLoss() external view returns (uint256) {
+        return config.maxLoss;
+    }
+
+    function isWantIncentivised() external view returns (bool) {
+        return config.isWantIncentivised;
+    }
+
+    function isInvestmentTokenIncentivised() external view returns (bool) {
+        return config.isInvestmentTokenIncentivised;
+    }
+
+    function leaveDebtBehind() external view returns (bool) {
+        return config.leaveDebtBehind;
+    }
+
+    function flashLoanUnwind() external view returns (bool) {
+        return config.flashLoanUnwind;
+    }
+
     function estimatedTotalAssets() public view override returns (uint256) {
-        // not taking into account aave rewards (they are staked and not accesible)
-        return
-            balanceOfWant() // balance of want
-                .add(balanceOfAToken()) // asset suplied as collateral
-                .add(
-                _fromETH(
-                    _toETH(_valueOfInvestment(), address(investmentToken)),
-                    address(want)
-                )
-            ) // current value of assets deposited in vault
-                .sub(
-                _fromETH(
-                    _toETH(balanceOfDebt(), address(investmentToken)),
-                    address(want)
-                )
-            ); // liabilities
+        Context memory ctx;
+        return _estimatedTotalAssets(ctx);
     }
 
     // ----------------- SETTERS -----------------
@@ -140,18 +290,37 @@ contract Strategy is BaseStrategy {
             _warningLTVMultiplier <= MAX_MULTIPLIER &&
                 _targetLTVMultiplier <= _warningLTVMultiplier
         );
-        targetLTVMultiplier = _targetLTVMultiplier;
-        warningLTVMultiplier = _warningLTVMultiplier;
-        acceptableCostsRay = _acceptableCostsRay;
+        require(_maxLoss <= 10_000);
+        // larger values do not fit in their config field
+        require(
+            _acceptableCostsRay <= type(uint96).max &&
+                _maxGasPriceToTend <= type(uint64).max
+        );
+        config = Config({
+            acceptableCostsRay: uint96(_acceptableCostsRay),
+            targetLTVMultiplier: _targetLTVMultiplier,
+            warningLTVMultiplier: _warningLTVMultiplier,
+            maxGasPriceToTend: uint64(_maxGasPriceToTend),
+            maxLoss: uint16(_maxLoss),
+            referral: _aaveReferral,
+            isWantIncentivised: _isWantIncentivised,
+            isInvestmentTokenIncentivised: _isInvestmentTokenIncentivised,
+            leaveDebtBehind: _leaveDebtBehind,
+            flashLoanUnwind: config.flashLoanUnwind
+        });
         maxTotalBorrowIT = _maxTotalBorrowIT;
-        referral = _aaveReferral;
-        isWantIncentivised = _isWantIncentivised;
-        isInvestmentTokenIncentivised = _isInvestmentTokenIncentivised;
-        leaveDebtBehind = _leaveDebtBehind;
-        maxGasPriceToTend = _maxGasPriceToTend;
+    }
 
-        require(_maxLoss <= 10_000);
-        maxLoss = _maxLoss;
+    function setFlashLoanUnwind(bool _flashLoanUnwind)
+        external
+        onlyVaultManagers
+    {
+        config.flashLoanUnwind = _flashLoanUnwind;
+    }
+
+    // Re-read the lending pool and price oracle after Aave updates them in the addresses provider
+    function refreshAaveAddresses() external onlyEmergencyAuthorized {
+        _setAaveAddresses();
     }
 
     // Allow switching between Uniswap and SushiSwap
@@ -180,6 +349,10 @@ contract Strategy is BaseStrategy {
             );
 
         variableDebtToken = IVariableDebtToken(_variableDebtToken);
+        _setAaveAddresses();
+        wantDecimals = IOptionalERC20(address(want)).decimals();
+        investmentTokenDecimals = IOptionalERC20(address(investmentToken))
+            .decimals();
         minThreshold = (10**(yVault.decimals())).div(100); // 0.01 minThreshold
 
         // Set default router to SushiSwap
@@ -220,16 +393,18 @@ contract Strategy is BaseStrategy {
         _claimRewards();
 
         // claim rewards from yVault
-        _takeVaultProfit();
+        Context memory ctx;
+        _takeVaultProfit(ctx);
 
-        uint256 totalAssetsAfterProfit = estimatedTotalAssets();
+        uint256 totalAssetsAfterProfit = _estimatedTotalAssets(ctx);
 
         _profit = totalAssetsAfterProfit > totalDebt
             ? totalAssetsAfterProfit.sub(totalDebt)
             : 0;
 
         uint256 _amountFreed;
-        (_amountFreed, _loss) = liquidatePosition(
+        (_amountFreed, _loss) = _liquidatePosition(
+            ctx,
             _debtOutstanding.add(_profit)
         );
         _debtPayment = Math.min(_debtOutstanding, _amountFreed);
@@ -262,24 +437,22 @@ contract Strategy is BaseStrategy {
         }
 
         // NOTE: debt + collateral calcs are done in ETH
-        (
-            uint256 totalCollateralETH,
-            uint256 totalDebtETH,
-            uint256 availableBorrowsETH,
-            uint256 currentLiquidationThreshold,
-            ,
-
-        ) = _getAaveUserAccountData();
+        Context memory ctx;
+        _loadAccount(ctx);
 
         // if there is no want deposited into aave, don't do nothing
         // this means no debt is borrowed from aave too
-        if (totalCollateralETH == 0) {
+        if (ctx.totalCollateralETH == 0) {
             return;
         }
 
-        uint256 currentLTV = totalDebtETH.mul(MAX_BPS).div(totalCollateralETH);
-        uint256 targetLTV = _getTargetLTV(currentLiquidationThreshold); // 60% under liquidation Threshold
-        uint256 warningLTV = _getWarningLTV(currentLiquidationThreshold); // 80% under liquidation Threshold
+        Config memory cfg = config;
+        Adjustment memory adj;
+        adj.currentLTV = ctx.totalDebtETH.mul(MAX_BPS).div(
+            ctx.totalCollateralETH
+        );
+        adj.targetLTV = _getTargetLTV(cfg, ctx.currentLiquidationThreshold); // 60% under liquidation Threshold
+        adj.warningLTV = _getWarningLTV(cfg, ctx.currentLiquidationThreshold); // 80% under liquidation Threshold
 
         // decide in which range we are and act accordingly:
         // SUBOPTIMAL(borrow) (e.g. from 0 to 60% liqLTV)
@@ -292,95 +465,34 @@ contract Strategy is BaseStrategy {
         // maxProtocolDebt => amount of total debt at which the cost of capital is equal to our acceptable costs
         // if the current protocol debt is higher than the max protocol debt, we will repay debt
         (
-            uint256 currentProtocolDebt,
-            uint256 maxProtocolDebt,
-            uint256 targetUtilisationRay
-        ) =
-            AaveLenderBorrowerLib.calcMaxDebt(
-                address(investmentToken),
-                acceptableCostsRay
-            );
+            adj.currentProtocolDebt,
+            adj.maxProtocolDebt,
+            adj.targetUtilisationRay
+        ) = _calcMaxDebt(cfg.acceptableCostsRay);
 
-        if (targetLTV > currentLTV && currentProtocolDebt < maxProtocolDebt) {
+        if (
+            adj.targetLTV > adj.currentLTV &&
+            adj.currentProtocolDebt < adj.maxProtocolDebt
+        ) {
             // SUBOPTIMAL RATIO: our current Loan-to-Value is lower than what we want
             // AND costs are lower than our max acceptable costs
-
-            // we need to take on more debt
-            uint256 targetDebtETH =
-                totalCollateralETH.mul(targetLTV).div(MAX_BPS);
-
-            uint256 amountToBorrowETH = targetDebtETH.sub(totalDebtETH); // safe bc we checked ratios
-            amountToBorrowETH = Math.min(
-                availableBorrowsETH,
-                amountToBorrowETH
-            );
-
-            // cap the amount of debt we are taking according to our acceptable costs
-            // if with the new loan we are increasing our cost of capital over what is healthy
-            if (currentProtocolDebt.add(amountToBorrowETH) > maxProtocolDebt) {
-                // Can't underflow because it's checked in the previous if condition
-                amountToBorrowETH = maxProtocolDebt.sub(currentProtocolDebt);
-            }
-
-            uint256 maxTotalBorrowETH =
-                _toETH(maxTotalBorrowIT, address(investmentToken));
-            if (totalDebtETH.add(amountToBorrowETH) > maxTotalBorrowETH) {
-                amountToBorrowETH = maxTotalBorrowETH > totalDebtETH
-                    ? maxTotalBorrowETH.sub(totalDebtETH)
-                    : 0;
-            }
-
-            // convert to InvestmentToken
-            uint256 amountToBorrowIT =
-                _fromETH(amountToBorrowETH, address(investmentToken));
-
-            if (amountToBorrowIT > 0) {
-                _lendingPool().borrow(
-                    address(investmentToken),
-                    amountToBorrowIT,
-                    2,
-                    referral,
-                    address(this)
-                );
-            }
+            _borrowToTarget(ctx, adj);
         } else if (
-            currentLTV > warningLTV || currentProtocolDebt > maxProtocolDebt
+            adj.currentLTV > adj.warningLTV ||
+            adj.currentProtocolDebt > adj.maxProtocolDebt
         ) {
             // UNHEALTHY RATIO
             // we may be in this case if the current cost of capital is higher than our max cost of capital
-            // we repay debt to set it to targetLTV
-            uint256 targetDebtETH =
-                targetLTV.mul(totalCollateralETH).div(MAX_BPS);
-            uint256 amountToRepayETH =
-                targetDebtETH < totalDebtETH
-                    ? totalDebtETH.sub(targetDebtETH)
-                    : 0;
-
-            if (maxProtocolDebt == 0) {
-                amountToRepayETH = totalDebtETH;
-            } else if (currentProtocolDebt > maxProtocolDebt) {
-                // NOTE: take into account that we are withdrawing from yvVault which might have a GenLender lending to Aave
-                // REPAY = (currentProtocolDebt - maxProtocolDebt) / (1 - TargetUtilisation)
-                // coming from
-                // TargetUtilisation = (totalDebt - REPAY) / (currentLiquidity - REPAY)
-                // currentLiquidity = maxProtocolDebt / TargetUtilisation
-
-                uint256 iterativeRepayAmountETH =
-                    currentProtocolDebt
-                        .sub(maxProtocolDebt)
-                        .mul(WadRayMath.RAY)
-                        .div(uint256(WadRayMath.RAY).sub(targetUtilisationRay));
-                amountToRepayETH = Math.max(
-                    amountToRepayETH,
-                    iterativeRepayAmountETH
-                );
-            }
-            emit RepayDebt(amountToRepayETH, totalDebtETH);
-
-            uint256 amountToRepayIT =
-                _fromETH(amountToRepayETH, address(investmentToken));
-            uint256 withdrawnIT = _withdrawFromYVault(amountToRepayIT); // we withdraw from investmentToken vault
-            _repayInvestmentTokenDebt(withdrawnIT); // we repay the investmentToken debt with Aave
+            _repayToTarget(ctx, adj);
+        } else {
+            emit Held(
+                ctx.totalCollateralETH,
+                ctx.totalDebtETH,
+                adj.targetLTV,
+                adj.warningLTV,
+                adj.currentProtocolDebt,
+                adj.maxProtocolDebt
+            );
         }
 
         uint256 balanceIT = balanceOfInvestmentToken();
@@ -395,18 +507,141 @@ contract Strategy is BaseStrategy {
         }
     }
 
+    // we need to take on more debt
+    function _borrowToTarget(Context memory ctx, Adjustment memory adj)
+        internal
+    {
+        uint256 targetDebtETH =
+            ctx.totalCollateralETH.mul(adj.targetLTV).div(MAX_BPS);
+
+        BorrowCap cap = BorrowCap.NONE;
+        uint256 amountToBorrowETH = targetDebtETH.sub(ctx.totalDebtETH); // safe bc we checked ratios
+        if (ctx.availableBorrowsETH < amountToBorrowETH) {
+            amountToBorrowETH = ctx.availableBorrowsETH;
+            cap = BorrowCap.AVAILABLE_BORROWS;
+        }
+
+        // cap the amount of debt we are taking according to our acceptable costs
+        // if with the new loan we are increasing our cost of capital over what is healthy
+        if (
+            adj.currentProtocolDebt.add(amountToBorrowETH) >
+            adj.maxProtocolDebt
+        ) {
+            // Can't underflow because it's checked in the previous if condition
+            amountToBorrowETH = adj.maxProtocolDebt.sub(
+                adj.currentProtocolDebt
+            );
+            cap = BorrowCap.MAX_PROTOCOL_DEBT;
+        }
+
+        uint256 maxTotalBorrowETH =
+            _toETH(ctx, maxTotalBorrowIT, address(investmentToken));
+        if (ctx.totalDebtETH.add(amountToBorrowETH) > maxTotalBorrowETH) {
+            amountToBorrowETH = maxTotalBorrowETH > ctx.totalDebtETH
+                ? maxTotalBorrowETH.sub(ctx.totalDebtETH)
+                : 0;
+            cap = BorrowCap.MAX_TOTAL_BORROW;
+        }
+
+        // convert to InvestmentToken
+        uint256 amountToBorrowIT =
+            _fromETH(ctx, amountToBorrowETH, address(investmentToken));
+
+        if (amountToBorrowIT > 0) {
+            _lendingPool().borrow(
+                address(investmentToken),
+                amountToBorrowIT,
+                2,
+                config.referral,
+                address(this)
+            );
+        }
+        emit Borrowed(
+            amountToBorrowIT,
+            cap,
+            ctx.totalCollateralETH,
+            ctx.totalDebtETH,
+            adj.targetLTV,
+            adj.currentProtocolDebt,
+            adj.maxProtocolDebt
+        );
+    }
+
+    // we repay debt to set it to targetLTV
+    function _repayToTarget(Context memory ctx, Adjustment memory adj)
+        internal
+    {
+        uint256 amountToRepayETH =
+            _subOrZero(
+                ctx.totalDebtETH,
+                adj.targetLTV.mul(ctx.totalCollateralETH).div(MAX_BPS)
+            );
+
+        RepayReason reason =
+            adj.currentLTV > adj.warningLTV
+                ? RepayReason.WARNING_LTV
+                : RepayReason.COSTS;
+        if (adj.maxProtocolDebt == 0) {
+            amountToRepayETH = ctx.totalDebtETH;
+            reason = RepayReason.NO_ACCEPTABLE_DEBT;
+        } else if (adj.currentProtocolDebt > adj.maxProtocolDebt) {
+            // NOTE: take into account that we are withdrawing from yvVault which might have a GenLender lending to Aave
+            // REPAY = (currentProtocolDebt - maxProtocolDebt) / (1 - TargetUtilisation)
+            // coming from
+            // TargetUtilisation = (totalDebt - REPAY) / (currentLiquidity - REPAY)
+            // currentLiquidity = maxProtocolDebt / TargetUtilisation
+
+            uint256 iterativeRepayAmountETH =
+                adj
+                    .currentProtocolDebt
+                    .sub(adj.maxProtocolDebt)
+                    .mul(WadRayMath.RAY)
+                    .div(uint256(WadRayMath.RAY).sub(adj.targetUtilisationRay));
+            amountToRepayETH = Math.max(
+                amountToRepayETH,
+                iterativeRepayAmountETH
+            );
+        }
+        uint256 totalDebtETH = ctx.totalDebtETH;
+        emit RepayDebt(amountToRepayETH, totalDebtETH);
+
+        uint256 amountToRepayIT =
+            _fromETH(ctx, amountToRepayETH, address(investmentToken));
+        uint256 withdrawnIT = _withdrawFromYVault(ctx, amountToRepayIT); // we withdraw from investmentToken vault
+        uint256 repaidIT = _repayInvestmentTokenDebt(ctx, withdrawnIT); // we repay the investmentToken debt with Aave
+        emit Repaid(
+            amountToRepayIT,
+            repaidIT,
+            reason,
+            ctx.totalCollateralETH,
+            totalDebtETH,
+            adj.targetLTV,
+            adj.currentProtocolDebt,
+            adj.maxProtocolDebt
+        );
+    }
+
     function liquidateAllPositions()
         internal
         override
         returns (uint256 _amountFreed)
     {
-        (_amountFreed, ) = liquidatePosition(estimatedTotalAssets());
+        Context memory ctx;
+        (_amountFreed, ) = _liquidatePosition(ctx, _estimatedTotalAssets(ctx));
     }
 
     function liquidatePosition(uint256 _amountNeeded)
         internal
         override
         returns (uint256 _liquidatedAmount, uint256 _loss)
+    {
+        Context memory ctx;
+        return _liquidatePosition(ctx, _amountNeeded);
+    }
+
+    function _liquidatePosition(Context memory ctx, uint256 _amountNeeded)
+        internal
+        returns (uint256 _liquidatedAmount, uint256 _loss)
     {
         uint256 balance = balanceOfWant();
         // if we have enough want to take care of the liquidatePosition without actually liquidating positons
@@ -416,38 +651,52 @@ contract Strategy is BaseStrategy {
         // NOTE: amountNeeded is in want
         // NOTE: repayment amount is in investmentToken
         // NOTE: collateral and debt calcs are done in ETH (always, see Aave docs)
+        uint256 debtBefore = balanceOfDebt();
+        uint256 collateralBefore = balanceOfAToken();
+        uint256 boughtIT;
 
         // We first repay whatever we need to repay to keep healthy ratios
-        uint256 amountToRepayIT = _calculateAmountToRepay(_amountNeeded);
-        uint256 withdrawnIT = _withdrawFromYVault(amountToRepayIT); // we withdraw from investmentToken vault
-        _repayInvestmentTokenDebt(withdrawnIT); // we repay the investmentToken debt with Aave
+        uint256 amountToRepayIT = _calculateAmountToRepay(ctx, _amountNeeded);
+        uint256 withdrawnIT = _withdrawFromYVault(ctx, amountToRepayIT); // we withdraw from investmentToken vault
+        _repayInvestmentTokenDebt(ctx, withdrawnIT); // we repay the investmentToken debt with Aave
 
         // it will return the free amount of want
-        _withdrawWantFromAave(_amountNeeded);
+        _withdrawWantFromAave(ctx, _amountNeeded);
 
         balance = balanceOfWant();
+        // the collateral still locked is unlocked in a single flash loan. It may
+        // sell want to pay the loan back, so not if debt is left behind
+        if (
+            config.flashLoanUnwind &&
+            !config.leaveDebtBehind &&
+            _amountNeeded > balance &&
+            balanceOfDebt() > 0
+        ) {
+            _flashLoanUnwind(ctx, _amountNeeded.sub(balance));
+            balance = balanceOfWant();
+        }
         // we check if we withdrew less than expected AND should buy investmentToken with want (realising losses)
         if (
             _amountNeeded > balance &&
             balanceOfDebt() > 0 && // still some debt remaining
-            balanceOfInvestmentToken().add(_valueOfInvestment()) == 0 && // but no capital to repay
-            !leaveDebtBehind // if set to true, the strategy will not try to repay debt by selling want
+            balanceOfInvestmentToken().add(_valueOfInvestment(ctx)) == 0 && // but no capital to repay
+            !config.leaveDebtBehind // if set to true, the strategy will not try to repay debt by selling want
         ) {
             // using this part of code will result in losses but it is necessary to unlock full collateral in case of wind down
             // we calculate how much want we need to fulfill the want request
             uint256 remainingAmountWant = _amountNeeded.sub(balance);
             // then calculate how much InvestmentToken we need to unlock collateral
-            amountToRepayIT = _calculateAmountToRepay(remainingAmountWant);
+            amountToRepayIT = _calculateAmountToRepay(ctx, remainingAmountWant);
 
             // we buy investmentToken with Want
-            _buyInvestmentTokenWithWant(amountToRepayIT);
+            boughtIT = _buyInvestmentTokenWithWant(amountToRepayIT);
 
             // we repay debt to actually unlock collateral
             // after this, balanceOfDebt should be 0
-            _repayInvestmentTokenDebt(amountToRepayIT);
+            _repayInvestmentTokenDebt(ctx, amountToRepayIT);
 
             // then we try withdraw once more
-            _withdrawWantFromAave(remainingAmountWant);
+            _withdrawWantFromAave(ctx, remainingAmountWant);
         }
 
         uint256 totalAssets = balanceOfWant();
@@ -457,15 +706,51 @@ contract Strategy is BaseStrategy {
         } else {
             _liquidatedAmount = _amountNeeded;
         }
+        // the balances also count what a flash loan repaid and withdrew
+        emit Unwound(
+            _amountNeeded,
+            _subOrZero(debtBefore, balanceOfDebt()),
+            _subOrZero(collateralBefore, balanceOfAToken()),
+            boughtIT,
+            _loss
+        );
+    }
+
+    // Aave's flash loan callback, see _flashLoanUnwind
+    function executeOperation(
+        address[] calldata,
+        uint256[] calldata amounts,
+        uint256[] calldata premiums,
+        address initiator,
+        bytes calldata params
+    ) external returns (bool) {
+        require(msg.sender == address(lendingPool)); // dev: !lendingPool
+        require(initiator == address(this)); // dev: !initiator
+
+        Context memory ctx;
+        uint256 owed = amounts[0].add(premiums[0]);
+        _repayInvestmentTokenDebt(ctx, amounts[0]);
+
+        // the loan is paid back with the yVault first and with want for the rest
+        _withdrawFromYVault(ctx, _subOrZero(owed, balanceOfInvestmentToken()));
+        uint256 shortfallIT = _subOrZero(owed, balanceOfInvestmentToken());
+        _withdrawWantFromAave(
+            ctx,
+            abi.decode(params, (uint256)).add(
+                _investmentTokenToWant(ctx, shortfallIT)
+            )
+        );
+        uint256 boughtIT = _buyInvestmentTokenWithWant(shortfallIT);
+
+        _checkAllowance(address(lendingPool), address(investmentToken), owed);
+        emit FlashLoanUnwound(amounts[0], premiums[0], boughtIT);
+        return true;
     }
 
     function delegatedAssets() external view override returns (uint256) {
         // returns total debt borrowed in want (which is the delegatedAssets)
-        return
-            _fromETH(
-                _toETH(balanceOfDebt(), address(investmentToken)),
-                address(want)
-            );
+        Context memory ctx;
+        return _investmentTokenToWant(ctx, balanceOfDebt());
     }
 
     function prepareMigration(address _newStrategy) internal override {
@@ -483,7 +768,7 @@ contract Strategy is BaseStrategy {
 
         return
             _checkCooldown() ||
-            super.harvestTrigger(_fromETH(callCost, address(want)));
+            super.harvestTrigger(ethToWant(callCost));
     }
 
     function tendTrigger(uint256 callCost) public view override returns (bool) {
@@ -504,24 +789,28 @@ contract Strategy is BaseStrategy {
             return false;
         }
 
-        uint256 targetLTV = _getTargetLTV(currentLiquidationThreshold);
-        uint256 warningLTV = _getWarningLTV(currentLiquidationThreshold);
-
+        Config memory cfg = config;
         return
             AaveLenderBorrowerLib.shouldRebalance(
+                lendingPool,
+                priceOracle,
                 address(investmentToken),
-                acceptableCostsRay,
-                targetLTV,
-                warningLTV,
+                cfg.acceptableCostsRay,
+                _getTargetLTV(cfg, currentLiquidationThreshold),
+                _getWarningLTV(cfg, currentLiquidationThreshold),
                 totalCollateralETH,
                 totalDebtETH,
-                maxGasPriceToTend
+                cfg.maxGasPriceToTend,
+                irsCache
             );
     }
 
     // ----------------- INTERNAL FUNCTIONS SUPPORT -----------------
 
-    function _withdrawFromYVault(uint256 _amountIT) internal returns (uint256) {
+    function _withdrawFromYVault(Context memory ctx, uint256 _amountIT)
+        internal
+        returns (uint256)
+    {
         if (_amountIT == 0) {
             return 0;
         }
@@ -529,19 +818,24 @@ contract Strategy is BaseStrategy {
         uint256 balancePrior = balanceOfInvestmentToken();
         uint256 sharesToWithdraw =
             Math.min(
-                _investmentTokenToYShares(_amountIT),
+                _investmentTokenToYShares(ctx, _amountIT),
                 yVault.balanceOf(address(this))
             );
         if (sharesToWithdraw == 0) {
             return 0;
         }
-        yVault.withdraw(sharesToWithdraw, address(this), maxLoss);
+        yVault.withdraw(sharesToWithdraw, address(this), config.maxLoss);
+        ctx.pricePerShare = 0; // may have moved with the withdrawal
         return balanceOfInvestmentToken().sub(balancePrior);
     }
 
-    function _repayInvestmentTokenDebt(uint256 amount) internal {
+    // returns the amount repaid
+    function _repayInvestmentTokenDebt(Context memory ctx, uint256 amount)
+        internal
+        returns (uint256)
+    {
         if (amount == 0) {
-            return;
+            return 0;
         }
 
         // we cannot pay more than loose balance
@@ -562,11 +856,70 @@ contract Strategy is BaseStrategy {
                 uint256(2),
                 address(this)
             );
+            if (ctx.accountLoaded) {
+                ctx.totalDebtETH = _subOrZero(
+                    ctx.totalDebtETH,
+                    _toETH(ctx, amount, address(investmentToken))
+                );
+            }
+        }
+        return amount;
+    }
+
+    // Flash loans the investment token debt that keeps the collateral for
+    // _amountNeeded locked, sized by AaveLenderBorrowerLib.calcFlashLoanAmountETH
+    // so the position is left at targetLTV, and settles it in executeOperation
+    function _flashLoanUnwind(Context memory ctx, uint256 _amountNeeded)
+        internal
+    {
+        _loadAccount(ctx);
+        uint256 amountETH =
+            AaveLenderBorrowerLib.calcFlashLoanAmountETH(
+                _toETH(ctx, _amountNeeded, address(want)),
+                ctx.totalCollateralETH,
+                ctx.totalDebtETH,
+                _getTargetLTV(config, ctx.currentLiquidationThreshold),
+                _toETH(
+                    ctx,
+                    balanceOfInvestmentToken().add(_valueOfInvestment(ctx)),
+                    address(investmentToken)
+                ),
+                lendingPool.FLASHLOAN_PREMIUM_TOTAL()
+            );
+        uint256 debt = balanceOfDebt();
+        uint256 amountIT =
+            amountETH >= ctx.totalDebtETH
+                ? debt
+                : Math.min(
+                    _fromETH(ctx, amountETH, address(investmentToken)),
+                    debt
+                );
+        if (amountIT == 0) {
+            return;
+        }
+
+        // If the loan or a swap in executeOperation reverts, the withdrawal goes
+        // on as it would without flashLoanUnwind
+        (bool success, bytes memory reason) =
+            AaveLenderBorrowerLib.flashLoan(
+                lendingPool,
+                address(investmentToken),
+                amountIT,
+                abi.encode(_amountNeeded),
+                config.referral
+            );
+        if (!success) {
+            emit FlashLoanFailed(amountIT, reason);
         }
+
+        // the callback moved balances outside of ctx
+        ctx.accountLoaded = false;
+        ctx.pricePerShare = 0;
     }
 
     function _claimRewards() internal {
-        if (isInvestmentTokenIncentivised || isWantIncentivised) {
+        Config memory cfg = config;
+        if (cfg.isInvestmentTokenIncentivised || cfg.isWantIncentivised) {
             // redeem AAVE from stkAave
             uint256 stkAaveBalance =
                 IERC20(address(stkAave)).balanceOf(address(this));
@@ -581,28 +934,17 @@ contract Strategy is BaseStrategy {
             // a minimum balance of 0.01 AAVE is required
             uint256 aaveBalance = IERC20(AAVE).balanceOf(address(this));
             if (aaveBalance > 1e15) {
-                _sellAForB(aaveBalance, address(AAVE), address(want));
+                uint256 wantAmount =
+                    _sellAForB(aaveBalance, address(AAVE), address(want));
+                emit SoldAave(aaveBalance, wantAmount);
             }
 
             // claim rewards
-            // only add to assets those assets that are incentivised
-            address[] memory assets;
-            if (isInvestmentTokenIncentivised && isWantIncentivised) {
-                assets = new address[](2);
-                assets[0] = address(aToken);
-                assets[1] = address(variableDebtToken);
-            } else if (isInvestmentTokenIncentivised) {
-                assets = new address[](1);
-                assets[0] = address(variableDebtToken);
-            } else if (isWantIncentivised) {
-                assets = new address[](1);
-                assets[0] = address(aToken);
-            }
-
-            _incentivesController().claimRewards(
-                assets,
-                type(uint256).max,
-                address(this)
+            AaveLenderBorrowerLib.claimIncentives(
+                aToken,
+                variableDebtToken,
+                cfg.isWantIncentivised,
+                cfg.isInvestmentTokenIncentivised
             );
 
             // request start of cooldown period
@@ -610,8 +952,9 @@ contract Strategy is BaseStrategy {
                 IStakedAave(stkAave).stakersCooldowns(address(this));
             uint256 COOLDOWN_SECONDS = IStakedAave(stkAave).COOLDOWN_SECONDS();
             uint256 UNSTAKE_WINDOW = IStakedAave(stkAave).UNSTAKE_WINDOW();
+            stkAaveBalance = IERC20(address(stkAave)).balanceOf(address(this));
             if (
-                IERC20(address(stkAave)).balanceOf(address(this)) > 0 &&
+                stkAaveBalance > 0 &&
                 (cooldownStartTimestamp == 0 ||
                     block.timestamp >
                     cooldownStartTimestamp.add(COOLDOWN_SECONDS).add(
@@ -619,19 +962,22 @@ contract Strategy is BaseStrategy {
                     ))
             ) {
                 stkAave.cooldown();
+                emit StartedCooldown(stkAaveBalance);
             }
         }
     }
 
     //withdraw an amount including any want balance
-    function _withdrawWantFromAave(uint256 amount) internal {
+    function _withdrawWantFromAave(Context memory ctx, uint256 amount)
+        internal
+    {
         uint256 balanceUnderlying = balanceOfAToken();
         if (amount > balanceUnderlying) {
             amount = balanceUnderlying;
         }
 
         uint256 maxWithdrawal =
-            Math.min(_maxWithdrawal(), want.balanceOf(address(aToken)));
+            Math.min(_maxWithdrawal(ctx), want.balanceOf(address(aToken)));
 
         uint256 toWithdraw = Math.min(amount, maxWithdrawal);
         if (toWithdraw > 0) {
@@ -641,22 +987,39 @@ contract Strategy is BaseStrategy {
                 toWithdraw
             );
             _lendingPool().withdraw(address(want), toWithdraw, address(this));
+            if (ctx.accountLoaded) {
+                ctx.totalCollateralETH = _subOrZero(
+                    ctx.totalCollateralETH,
+                    _toETH(ctx, toWithdraw, address(want))
+                );
+            }
         }
     }
 
-    function _maxWithdrawal() internal view returns (uint256) {
-        (uint256 totalCollateralETH, uint256 totalDebtETH, , , uint256 ltv, ) =
-            _getAaveUserAccountData();
+    function _maxWithdrawal(Context memory ctx)
+        internal
+        view
+        returns (uint256)
+    {
+        _loadAccount(ctx);
+        uint256 totalCollateralETH = ctx.totalCollateralETH;
+        uint256 ltv = ctx.ltv;
         uint256 minCollateralETH =
-            ltv > 0 ? totalDebtETH.mul(MAX_BPS).div(ltv) : totalCollateralETH;
+            ltv > 0
+                ? ctx.totalDebtETH.mul(MAX_BPS).div(ltv)
+                : totalCollateralETH;
         if (minCollateralETH > totalCollateralETH) {
             return 0;
         }
         return
-            _fromETH(totalCollateralETH.sub(minCollateralETH), address(want));
+            _fromETH(
+                ctx,
+                totalCollateralETH.sub(minCollateralETH),
+                address(want)
+            );
     }
 
-    function _calculateAmountToRepay(uint256 amount)
+    function _calculateAmountToRepay(Context memory ctx, uint256 amount)
         internal
         view
         returns (uint256)
@@ -665,27 +1028,18 @@ contract Strategy is BaseStrategy {
             return 0;
         }
         // we check if the collateral that we are withdrawing leaves us in a risky range, we then take action
-        (
-            uint256 totalCollateralETH,
-            uint256 totalDebtETH,
-            ,
-            uint256 currentLiquidationThreshold,
-            ,
-
-        ) = _getAaveUserAccountData();
-        uint256 warningLTV = _getWarningLTV(currentLiquidationThreshold);
-        uint256 targetLTV = _getTargetLTV(currentLiquidationThreshold);
-        uint256 amountETH = _toETH(amount, address(want));
-        return
-            AaveLenderBorrowerLib.calculateAmountToRepay(
-                amountETH,
-                totalCollateralETH,
-                totalDebtETH,
-                warningLTV,
-                targetLTV,
-                address(investmentToken),
+        _loadAccount(ctx);
+        Config memory cfg = config;
+        uint256 amountToRepayETH =
+            AaveLenderBorrowerLib.calculateAmountToRepayETH(
+                _toETH(ctx, amount, address(want)),
+                ctx.totalCollateralETH,
+                ctx.totalDebtETH,
+                _getWarningLTV(cfg, ctx.currentLiquidationThreshold),
+                _getTargetLTV(cfg, ctx.currentLiquidationThreshold),
                 minThreshold
             );
+        return _fromETH(ctx, amountToRepayETH, address(investmentToken));
     }
 
     function _depositToAave(uint256 amount) internal {
@@ -695,14 +1049,14 @@ contract Strategy is BaseStrategy {
 
         ILendingPool lp = _lendingPool();
         _checkAllowance(address(lp), address(want), amount);
-        lp.deposit(address(want), amount, address(this), referral);
+        lp.deposit(address(want), amount, address(this), config.referral);
     }
 
     function _checkCooldown() internal view returns (bool) {
         return
             AaveLenderBorrowerLib.checkCooldown(
-                isWantIncentivised,
-                isInvestmentTokenIncentivised,
+                config.isWantIncentivised,
+                config.isInvestmentTokenIncentivised,
                 address(stkAave)
             );
     }
@@ -718,17 +1072,18 @@ contract Strategy is BaseStrategy {
         }
     }
 
-    function _takeVaultProfit() internal {
+    function _takeVaultProfit(Context memory ctx) internal {
         uint256 _debt = balanceOfDebt();
-        uint256 _valueInVault = _valueOfInvestment();
+        uint256 _valueInVault = _valueOfInvestment(ctx);
         if (_debt >= _valueInVault) {
             return;
         }
 
         uint256 profit = _valueInVault.sub(_debt);
-        uint256 ySharesToWithdraw = _investmentTokenToYShares(profit);
+        uint256 ySharesToWithdraw = _investmentTokenToYShares(ctx, profit);
         if (ySharesToWithdraw > 0) {
-            yVault.withdraw(ySharesToWithdraw, address(this), maxLoss);
+            yVault.withdraw(ySharesToWithdraw, address(this), config.maxLoss);
+            ctx.pricePerShare = 0;
             _sellAForB(
                 balanceOfInvestmentToken(),
                 address(investmentToken),
@@ -754,19 +1109,38 @@ contract Strategy is BaseStrategy {
         return variableDebtToken.balanceOf(address(this));
     }
 
-    function _valueOfInvestment() internal view returns (uint256) {
+    function _valueOfInvestment(Context memory ctx)
+        internal
+        view
+        returns (uint256)
+    {
+        _loadYVault(ctx);
         return
-            yVault.balanceOf(address(this)).mul(yVault.pricePerShare()).div(
-                10**yVault.decimals()
+            yVault.balanceOf(address(this)).mul(ctx.pricePerShare).div(
+                ctx.yVaultUnit
             );
     }
 
-    function _investmentTokenToYShares(uint256 amount)
+    function _investmentTokenToYShares(Context memory ctx, uint256 amount)
         internal
         view
         returns (uint256)
     {
-        return amount.mul(10**yVault.decimals()).div(yVault.pricePerShare());
+        _loadYVault(ctx);
+        return amount.mul(ctx.yVaultUnit).div(ctx.pricePerShare);
+    }
+
+    function _estimatedTotalAssets(Context memory ctx)
+        internal
+        view
+        returns (uint256)
+    {
+        // not taking into account aave rewards (they are staked and not accesible)
+        return
+            balanceOfWant() // balance of want
+                .add(balanceOfAToken()) // asset suplied as collateral
+                .add(_investmentTokenToWant(ctx, _valueOfInvestment(ctx))) // current value of assets deposited in vault
+                .sub(_investmentTokenToWant(ctx, balanceOfDebt())); // liabilities
     }
 
     function _getAaveUserAccountData()
@@ -784,22 +1158,24 @@ contract Strategy is BaseStrategy {
         return _lendingPool().getUserAccountData(address(this));
     }
 
-    function _getTargetLTV(uint256 liquidationThreshold)
+    function _getTargetLTV(Config memory cfg, uint256 liquidationThreshold)
         internal
-        view
+        pure
         returns (uint256)
     {
         return
-            liquidationThreshold.mul(uint256(targetLTVMultiplier)).div(MAX_BPS);
+            liquidationThreshold.mul(uint256(cfg.targetLTVMultiplier)).div(
+                MAX_BPS
+            );
     }
 
-    function _getWarningLTV(uint256 liquidationThreshold)
+    function _getWarningLTV(Config memory cfg, uint256 liquidationThreshold)
         internal
-        view
+        pure
         returns (uint256)
     {
         return
-            liquidationThreshold.mul(uint256(warningLTVMultiplier)).div(
+            liquidationThreshold.mul(uint256(cfg.warningLTVMultiplier)).div(
                 MAX_BPS
             );
     }
@@ -823,28 +1199,35 @@ contract Strategy is BaseStrategy {
         }
     }
 
+    // returns the amount of tokenB received (_amount if tokenA is tokenB)
     function _sellAForB(
         uint256 _amount,
         address tokenA,
         address tokenB
-    ) internal {
+    ) internal returns (uint256) {
         if (_amount == 0 || tokenA == tokenB) {
-            return;
+            return _amount;
         }
 
         _checkAllowance(address(router), tokenA, _amount);
-        router.swapExactTokensForTokens(
-            _amount,
-            0,
-            getTokenOutPath(tokenA, tokenB),
-            address(this),
-            now
-        );
+        uint256[] memory amounts =
+            router.swapExactTokensForTokens(
+                _amount,
+                0,
+                getTokenOutPath(tokenA, tokenB),
+                address(this),
+                now
+            );
+        return amounts[amounts.length - 1];
     }
 
-    function _buyInvestmentTokenWithWant(uint256 _amount) internal {
+    // returns the amount of investmentToken bought
+    function _buyInvestmentTokenWithWant(uint256 _amount)
+        internal
+        returns (uint256)
+    {
         if (_amount == 0 || address(investmentToken) == address(want)) {
-            return;
+            return 0;
         }
 
         _checkAllowance(address(router), address(want), _amount);
@@ -855,13 +1238,15 @@ contract Strategy is BaseStrategy {
             address(this),
             now
         );
+        return _amount;
     }
 
-    function _toETH(uint256 _amount, address asset)
-        internal
-        view
-        returns (uint256)
-    {
+    // only want and investmentToken are converted, at the prices in ctx
+    function _toETH(
+        Context memory ctx,
+        uint256 _amount,
+        address asset
+    ) internal view returns (uint256) {
         if (
             _amount == 0 ||
             _amount == type(uint256).max ||
@@ -869,37 +1254,110 @@ contract Strategy is BaseStrategy {
         ) {
             return _amount;
         }
-        return AaveLenderBorrowerLib.toETH(_amount, asset);
+        _loadPrices(ctx);
+        return
+            asset == address(want)
+                ? _amount.mul(ctx.wantPrice).div(
+                    uint256(10)**uint256(wantDecimals)
+                )
+                : _amount.mul(ctx.investmentTokenPrice).div(
+                    uint256(10)**uint256(investmentTokenDecimals)
+                );
     }
 
-    function ethToWant(uint256 _amtInWei)
-        public
+    function _fromETH(
+        Context memory ctx,
+        uint256 _amount,
+        address asset
+    ) internal view returns (uint256) {
+        if (
+            _amount == 0 ||
+            _amount == type(uint256).max ||
+            address(asset) == address(WETH) // 1:1 change
+        ) {
+            return _amount;
+        }
+        _loadPrices(ctx);
+        return
+            asset == address(want)
+                ? _amount.mul(uint256(10)**uint256(wantDecimals)).div(
+                    ctx.wantPrice
+                )
+                : _amount
+                    .mul(uint256(10)**uint256(investmentTokenDecimals))
+                    .div(ctx.investmentTokenPrice);
+    }
+
+    function _investmentTokenToWant(Context memory ctx, uint256 _amount)
+        internal
         view
-        override
         returns (uint256)
     {
-        return _fromETH(_amtInWei, address(want));
+        return
+            _fromETH(
+                ctx,
+                _toETH(ctx, _amount, address(investmentToken)),
+                address(want)
+            );
     }
 
-    function _fromETH(uint256 _amount, address asset)
-        internal
+    function ethToWant(uint256 _amtInWei)
+        public
         view
+        override
         returns (uint256)
     {
-        if (
-            _amount == 0 ||
-            _amount == type(uint256).max ||
-            address(asset) == address(WETH) // 1:1 change
-        ) {
-            return _amount;
+        Context memory ctx;
+        return _fromETH(ctx, _amtInWei, address(want));
+    }
+
+    // ----------------- CONTEXT -----------------
+
+    // prices of want and investmentToken in a single oracle call
+    function _loadPrices(Context memory ctx) internal view {
+        if (ctx.wantPrice != 0) {
+            return;
+        }
+        address[] memory assets = new address[](2);
+        assets[0] = address(want);
+        assets[1] = address(investmentToken);
+        uint256[] memory prices = priceOracle.getAssetsPrices(assets);
+        ctx.wantPrice = prices[0];
+        ctx.investmentTokenPrice = prices[1];
+    }
+
+    function _loadYVault(Context memory ctx) internal view {
+        if (ctx.yVaultUnit == 0) {
+            ctx.yVaultUnit = 10**yVault.decimals();
+        }
+        if (ctx.pricePerShare == 0) {
+            ctx.pricePerShare = yVault.pricePerShare();
+        }
+    }
+
+    function _loadAccount(Context memory ctx) internal view {
+        if (ctx.accountLoaded) {
+            return;
         }
-        return AaveLenderBorrowerLib.fromETH(_amount, asset);
+        (
+            ctx.totalCollateralETH,
+            ctx.totalDebtETH,
+            ctx.availableBorrowsETH,
+            ctx.currentLiquidationThreshold,
+            ctx.ltv,
+
+        ) = _getAaveUserAccountData();
+        ctx.accountLoaded = true;
+    }
+
+    function _subOrZero(uint256 a, uint256 b) internal pure returns (uint256) {
+        return a > b ? a - b : 0;
     }
 
     // ----------------- INTERNAL SUPPORT GETTERS -----------------
 
-    function _lendingPool() internal view returns (ILendingPool lendingPool) {
-        return AaveLenderBorrowerLib.lendingPool();
+    function _lendingPool() internal view returns (ILendingPool) {
+        return lendingPool;
     }
 
     function _protocolDataProvider()
@@ -911,20 +1369,29 @@ contract Strategy is BaseStrategy {
     }
 
     function _priceOracle() internal view returns (IPriceOracle) {
-        return AaveLenderBorrowerLib.priceOracle();
+        return priceOracle;
     }
 
-    function _incentivesController()
+    function _setAaveAddresses() internal {
+        lendingPool = AaveLenderBorrowerLib.lendingPool();
+        priceOracle = AaveLenderBorrowerLib.priceOracle();
+    }
+
+    function _calcMaxDebt(uint256 _acceptableCostsRay)
         internal
-        view
-        returns (IAaveIncentivesController)
+        returns (
+            uint256,
+            uint256,
+            uint256
+        )
     {
         return
-            AaveLenderBorrowerLib.incentivesController(
-                aToken,
-                variableDebtToken,
-                isWantIncentivised,
-                isInvestmentTokenIncentivised
+            AaveLenderBorrowerLib.calcMaxDebt(
+                lendingPool,
+                priceOracle,
+                address(investmentToken),
+                _acceptableCostsRay,
+                irsCache
             );
     }
 
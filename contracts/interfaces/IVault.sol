@@ -23,4 +23,12 @@ interface IVault is IERC20 {
     ) external returns (uint256);
 
     function availableDepositLimit() external view returns (uint256);
+
+    function totalAssets() external view returns (uint256);
+
+    function debtOutstanding(address strategy) external view returns (uint256);
+
+    function governance() external view returns (address);
+
+    function setDepositLimit(uint256 limit) external;
 }
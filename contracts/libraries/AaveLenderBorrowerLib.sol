@@ -37,6 +37,19 @@ library AaveLenderBorrowerLib {
         uint256 slope2;
     }
 
+    // Interest rate strategy parameters of a reserve, keyed by the address of
+    // the strategy they were read from. Aave's strategies are immutable (new
+    // parameters are deployed as a new strategy), so they only need to be read
+    // again when the reserve's interestRateStrategyAddress changes.
+    // Rates are rays, optimalRate <= 1 RAY
+    struct IrsCache {
+        address irs;
+        uint96 optimalRate;
+        uint128 baseRate;
+        uint128 slope1;
+        uint256 slope2;
+    }
+
     uint256 internal constant MAX_BPS = 10_000;
     IBaseFee internal constant baseFeeProvider =
         IBaseFee(0xf8d0Ec04e94296773cE20eFbeeA82e76220cD549);
@@ -72,13 +85,53 @@ library AaveLenderBorrowerLib {
         }
     }
 
+    // Claims the rewards of the incentivised positions to the strategy calling
+    // it (public, so it runs in the strategy's context)
+    function claimIncentives(
+        IAToken aToken,
+        IVariableDebtToken variableDebtToken,
+        bool isWantIncentivised,
+        bool isInvestmentTokenIncentivised
+    ) public {
+        // only add to assets those assets that are incentivised
+        address[] memory assets;
+        if (isInvestmentTokenIncentivised && isWantIncentivised) {
+            assets = new address[](2);
+            assets[0] = address(aToken);
+            assets[1] = address(variableDebtToken);
+        } else if (isInvestmentTokenIncentivised) {
+            assets = new address[](1);
+            assets[0] = address(variableDebtToken);
+        } else if (isWantIncentivised) {
+            assets = new address[](1);
+            assets[0] = address(aToken);
+        }
+
+        IAaveIncentivesController controller =
+            incentivesController(
+                aToken,
+                variableDebtToken,
+                isWantIncentivised,
+                isInvestmentTokenIncentivised
+            );
+        controller.claimRewards(assets, type(uint256).max, address(this));
+    }
+
     function toETH(uint256 _amount, address asset)
         public
         view
         returns (uint256)
     {
+        return toETH(_amount, asset, priceOracle());
+    }
+
+    function toETH(
+        uint256 _amount,
+        address asset,
+        IPriceOracle _priceOracle
+    ) public view returns (uint256) {
         return
-            _amount.mul(priceOracle().getAssetPrice(asset)).div(
+            _amount.mul(_priceOracle.getAssetPrice(asset)).div(
                 uint256(10)**uint256(IOptionalERC20(asset).decimals())
             );
     }
@@ -88,10 +141,18 @@ library AaveLenderBorrowerLib {
         view
         returns (uint256)
     {
+        return fromETH(_amount, asset, priceOracle());
+    }
+
+    function fromETH(
+        uint256 _amount,
+        address asset,
+        IPriceOracle _priceOracle
+    ) public view returns (uint256) {
         return
             _amount
                 .mul(uint256(10)**uint256(IOptionalERC20(asset).decimals()))
-                .div(priceOracle().getAssetPrice(asset));
+                .div(_priceOracle.getAssetPrice(asset));
     }
 
     function calcMaxDebt(address _investmentToken, uint256 _acceptableCostsRay)
@@ -102,6 +163,155 @@ library AaveLenderBorrowerLib {
             uint256 maxProtocolDebt,
             uint256 targetU
         )
+    {
+        return
+            calcMaxDebt(
+                lendingPool(),
+                priceOracle(),
+                _investmentToken,
+                _acceptableCostsRay
+            );
+    }
+
+    // same as above, with the lending pool and oracle already resolved
+    function calcMaxDebt(
+        ILendingPool _lendingPool,
+        IPriceOracle _priceOracle,
+        address _investmentToken,
+        uint256 _acceptableCostsRay
+    )
+        public
+        view
+        returns (
+            uint256 currentProtocolDebt,
+            uint256 maxProtocolDebt,
+            uint256 targetU
+        )
+    {
+        return
+            _calcMaxDebt(
+                _priceOracle,
+                _investmentToken,
+                _acceptableCostsRay,
+                _getIrsVars(
+                    _interestRateStrategy(_lendingPool, _investmentToken)
+                )
+            );
+    }
+
+    // same as above, reading the interest rate strategy parameters from
+    // _irsCache. The cache is refreshed first if Aave moved the reserve to a
+    // new interest rate strategy
+    function calcMaxDebt(
+        ILendingPool _lendingPool,
+        IPriceOracle _priceOracle,
+        address _investmentToken,
+        uint256 _acceptableCostsRay,
+        IrsCache storage _irsCache
+    )
+        public
+        returns (
+            uint256 currentProtocolDebt,
+            uint256 maxProtocolDebt,
+            uint256 targetU
+        )
+    {
+        address irs = _interestRateStrategy(_lendingPool, _investmentToken);
+        IrsVars memory irsVars;
+        if (irs == _irsCache.irs) {
+            irsVars = _loadIrsVars(_irsCache);
+        } else {
+            irsVars = _getIrsVars(irs);
+            _storeIrsVars(irs, irsVars, _irsCache);
+        }
+        return
+            _calcMaxDebt(
+                _priceOracle,
+                _investmentToken,
+                _acceptableCostsRay,
+                irsVars
+            );
+    }
+
+    function _interestRateStrategy(
+        ILendingPool _lendingPool,
+        address _investmentToken
+    ) internal view returns (address) {
+        return
+            _lendingPool
+                .getReserveData(_investmentToken)
+                .interestRateStrategyAddress;
+    }
+
+    function _getIrsVars(address _irs)
+        internal
+        view
+        returns (IrsVars memory irsVars)
+    {
+        // Aave's Interest Rate Strategy Parameters (see docs)
+        IReserveInterestRateStrategy irs = IReserveInterestRateStrategy(_irs);
+        irsVars.optimalRate = irs.OPTIMAL_UTILIZATION_RATE();
+        irsVars.baseRate = irs.baseVariableBorrowRate(); // minimum cost of capital with 0 % of utilisation rate
+        irsVars.slope1 = irs.variableRateSlope1(); // rate of increase of cost of debt up to Optimal Utilisation Rate
+        irsVars.slope2 = irs.variableRateSlope2(); // rate of increase of cost of debt above Optimal Utilisation Rate
+    }
+
+    // cached parameters if _irsCache was filled from _irs, live ones otherwise
+    function _getIrsVars(address _irs, IrsCache storage _irsCache)
+        internal
+        view
+        returns (IrsVars memory)
+    {
+        return
+            _irs == _irsCache.irs
+                ? _loadIrsVars(_irsCache)
+                : _getIrsVars(_irs);
+    }
+
+    function _loadIrsVars(IrsCache storage _irsCache)
+        internal
+        view
+        returns (IrsVars memory irsVars)
+    {
+        irsVars.optimalRate = _irsCache.optimalRate;
+        irsVars.baseRate = _irsCache.baseRate;
+        irsVars.slope1 = _irsCache.slope1;
+        irsVars.slope2 = _irsCache.slope2;
+    }
+
+    function _storeIrsVars(
+        address _irs,
+        IrsVars memory _irsVars,
+        IrsCache storage _irsCache
+    ) internal {
+        // parameters that do not fit are never cached and always read live
+        if (
+            _irsVars.optimalRate > type(uint96).max ||
+            _irsVars.baseRate > type(uint128).max ||
+            _irsVars.slope1 > type(uint128).max
+        ) {
+            return;
+        }
+        _irsCache.irs = _irs;
+        _irsCache.optimalRate = uint96(_irsVars.optimalRate);
+        _irsCache.baseRate = uint128(_irsVars.baseRate);
+        _irsCache.slope1 = uint128(_irsVars.slope1);
+        _irsCache.slope2 = _irsVars.slope2;
+    }
+
+    function _calcMaxDebt(
+        IPriceOracle _priceOracle,
+        address _investmentToken,
+        uint256 _acceptableCostsRay,
+        IrsVars memory irsVars
+    )
+        internal
+        view
+        returns (
+            uint256 currentProtocolDebt,
+            uint256 maxProtocolDebt,
+            uint256 targetU
+        )
     {
         // This function is used to calculate the maximum amount of debt that the protocol can take
         // to keep the cost of capital lower than the set acceptableCosts
@@ -110,13 +320,6 @@ library AaveLenderBorrowerLib {
 
         // Hack to avoid the stack too deep compiler error.
         CalcMaxDebtLocalVars memory vars;
-        DataTypes.ReserveData memory reserveData =
-            lendingPool().getReserveData(address(_investmentToken));
-        IReserveInterestRateStrategy irs =
-            IReserveInterestRateStrategy(
-                reserveData.interestRateStrategyAddress
-            );
-
         (
             vars.availableLiquidity, // = total supply - total stable debt - total variable debt
             vars.totalStableDebt, // total debt paying stable interest rates
@@ -136,13 +339,6 @@ library AaveLenderBorrowerLib {
             ? 0
             : vars.totalDebt.rayDiv(vars.totalLiquidity);
 
-        // Aave's Interest Rate Strategy Parameters (see docs)
-        IrsVars memory irsVars;
-        irsVars.optimalRate = irs.OPTIMAL_UTILIZATION_RATE();
-        irsVars.baseRate = irs.baseVariableBorrowRate(); // minimum cost of capital with 0 % of utilisation rate
-        irsVars.slope1 = irs.variableRateSlope1(); // rate of increase of cost of debt up to Optimal Utilisation Rate
-        irsVars.slope2 = irs.variableRateSlope2(); // rate of increase of cost of debt above Optimal Utilisation Rate
-
         // acceptableCosts should always be > baseVariableBorrowRate
         // If it's not this will revert since the strategist set the wrong
         // acceptableCosts value
@@ -161,7 +357,15 @@ library AaveLenderBorrowerLib {
             // Special case where protocol is above utilization rate but we want
             // a lower interest rate than (base + slope1)
             if (_acceptableCostsRay < irsVars.baseRate.add(irsVars.slope1)) {
-                return (toETH(vars.totalDebt, address(_investmentToken)), 0, 0);
+                return (
+                    toETH(
+                        vars.totalDebt,
+                        address(_investmentToken),
+                        _priceOracle
+                    ),
+                    0,
+                    0
+                );
             }
 
             // we solve Aave's Interest Rates equation for utilisation rates above optimal U
@@ -180,8 +384,12 @@ library AaveLenderBorrowerLib {
             .rayDiv(1e27);
 
         return (
-            toETH(vars.totalDebt, address(_investmentToken)),
-            toETH(vars.maxProtocolDebt, address(_investmentToken)),
+            toETH(vars.totalDebt, address(_investmentToken), _priceOracle),
+            toETH(
+                vars.maxProtocolDebt,
+                address(_investmentToken),
+                _priceOracle
+            ),
             vars.targetUtilizationRate
         );
     }
@@ -195,15 +403,61 @@ library AaveLenderBorrowerLib {
         address investmentToken,
         uint256 minThreshold
     ) public view returns (uint256) {
+        return
+            calculateAmountToRepay(
+                amountETH,
+                totalCollateralETH,
+                totalDebtETH,
+                warningLTV,
+                targetLTV,
+                investmentToken,
+                minThreshold,
+                priceOracle()
+            );
+    }
+
+    function calculateAmountToRepay(
+        uint256 amountETH,
+        uint256 totalCollateralETH,
+        uint256 totalDebtETH,
+        uint256 warningLTV,
+        uint256 targetLTV,
+        address investmentToken,
+        uint256 minThreshold,
+        IPriceOracle _priceOracle
+    ) public view returns (uint256) {
+        uint256 amountToRepayETH =
+            calculateAmountToRepayETH(
+                amountETH,
+                totalCollateralETH,
+                totalDebtETH,
+                warningLTV,
+                targetLTV,
+                minThreshold
+            );
+        if (amountToRepayETH == 0) {
+            return 0;
+        }
+        return fromETH(amountToRepayETH, investmentToken, _priceOracle);
+    }
+
+    // same as above, in ETH, for callers that already know the price
+    function calculateAmountToRepayETH(
+        uint256 amountETH,
+        uint256 totalCollateralETH,
+        uint256 totalDebtETH,
+        uint256 warningLTV,
+        uint256 targetLTV,
+        uint256 minThreshold
+    ) public pure returns (uint256) {
         if (amountETH == 0) {
             return 0;
         }
         // we check if the collateral that we are withdrawing leaves us in a risky range, we then take action
-        uint256 amountToWithdrawETH = amountETH;
         // calculate the collateral that we are leaving after withdrawing
         uint256 newCollateral =
-            totalCollateralETH > amountToWithdrawETH
-                ? totalCollateralETH.sub(amountToWithdrawETH)
+            totalCollateralETH > amountETH
+                ? totalCollateralETH.sub(amountETH)
                 : 0;
         uint256 ltvAfterWithdrawal =
             newCollateral > 0
@@ -217,7 +471,7 @@ library AaveLenderBorrowerLib {
             return 0;
         } else if (ltvAfterWithdrawal == type(uint256).max) {
             // we are withdrawing 100% of collateral so we need to repay full debt
-            return fromETH(totalDebtETH, address(investmentToken));
+            return totalDebtETH;
         }
         // WARNING: this only works for a single collateral asset, otherwise liquidationThreshold might change depending on the collateral being withdrawn
         // e.g. we have USDC + WBTC as collateral, end liquidationThreshold will be different depending on which asset we withdraw
@@ -227,12 +481,83 @@ library AaveLenderBorrowerLib {
             return 0;
         }
         return
-            fromETH(
-                totalDebtETH.sub(newTargetDebt) < minThreshold
-                    ? totalDebtETH
-                    : totalDebtETH.sub(newTargetDebt),
-                address(investmentToken)
-            );
+            totalDebtETH.sub(newTargetDebt) < minThreshold
+                ? totalDebtETH
+                : totalDebtETH.sub(newTargetDebt);
+    }
+
+    // Debt (in ETH) to repay with a flash loan so that withdrawing amountETH of
+    // collateral leaves the position at targetLTV. The loan and its premium are
+    // paid back with the investment (investmentETH) first and with collateral
+    // sold for the rest, so the amount F solves, with D debt and C collateral:
+    // D - F = targetLTV * (C - amountETH - max(F * (1 + premium) - investmentETH, 0))
+    function calcFlashLoanAmountETH(
+        uint256 amountETH,
+        uint256 totalCollateralETH,
+        uint256 totalDebtETH,
+        uint256 targetLTV,
+        uint256 investmentETH,
+        uint256 premiumBps
+    ) public pure returns (uint256) {
+        if (amountETH >= totalCollateralETH) {
+            return totalDebtETH;
+        }
+        uint256 collateralLeft = totalCollateralETH.sub(amountETH);
+        uint256 targetDebt = collateralLeft.mul(targetLTV).div(MAX_BPS);
+        if (targetDebt >= totalDebtETH) {
+            return 0;
+        }
+        uint256 amount = totalDebtETH.sub(targetDebt);
+        if (
+            amount.mul(MAX_BPS.add(premiumBps)).div(MAX_BPS) <= investmentETH
+        ) {
+            return amount;
+        }
+
+        // F = (D - targetLTV * (C - amountETH + investmentETH)) / (1 - targetLTV * (1 + premium))
+        targetDebt = collateralLeft.add(investmentETH).mul(targetLTV).div(
+            MAX_BPS
+        );
+        if (targetDebt >= totalDebtETH) {
+            return amount;
+        }
+        amount = totalDebtETH.sub(targetDebt).mul(MAX_BPS).mul(MAX_BPS).div(
+            MAX_BPS.mul(MAX_BPS).sub(targetLTV.mul(MAX_BPS.add(premiumBps)))
+        );
+        return amount < totalDebtETH ? amount : totalDebtETH;
+    }
+
+    // Flash loans `amount` of `asset` to the strategy calling it (public, so it
+    // runs in the strategy's context) with executeOperation as the callback.
+    // A loan or callback that reverts does not revert the caller, nothing is
+    // borrowed then and the revert data is returned
+    function flashLoan(
+        ILendingPool pool,
+        address asset,
+        uint256 amount,
+        bytes memory params,
+        uint16 referral
+    ) public returns (bool success, bytes memory reason) {
+        address[] memory assets = new address[](1);
+        assets[0] = asset;
+        uint256[] memory amounts = new uint256[](1);
+        amounts[0] = amount;
+        // mode 0: paid back in this transaction, no debt is opened
+        try
+            pool.flashLoan(
+                address(this),
+                assets,
+                amounts,
+                new uint256[](1),
+                address(this),
+                params,
+                referral
+            )
+        {
+            success = true;
+        } catch (bytes memory _reason) {
+            reason = _reason;
+        }
     }
 
     function checkCooldown(
@@ -264,10 +589,98 @@ library AaveLenderBorrowerLib {
         uint256 totalDebtETH,
         uint256 maxGasPriceToTend
     ) external view returns (bool) {
-        uint256 currentLTV = totalDebtETH.mul(MAX_BPS).div(totalCollateralETH);
+        return
+            shouldRebalance(
+                lendingPool(),
+                priceOracle(),
+                investmentToken,
+                acceptableCostsRay,
+                targetLTV,
+                warningLTV,
+                totalCollateralETH,
+                totalDebtETH,
+                maxGasPriceToTend
+            );
+    }
 
+    function shouldRebalance(
+        ILendingPool _lendingPool,
+        IPriceOracle _priceOracle,
+        address investmentToken,
+        uint256 acceptableCostsRay,
+        uint256 targetLTV,
+        uint256 warningLTV,
+        uint256 totalCollateralETH,
+        uint256 totalDebtETH,
+        uint256 maxGasPriceToTend
+    ) public view returns (bool) {
         (uint256 currentProtocolDebt, uint256 maxProtocolDebt, ) =
-            calcMaxDebt(investmentToken, acceptableCostsRay);
+            calcMaxDebt(
+                _lendingPool,
+                _priceOracle,
+                investmentToken,
+                acceptableCostsRay
+            );
+
+        return
+            _shouldRebalance(
+                currentProtocolDebt,
+                maxProtocolDebt,
+                targetLTV,
+                warningLTV,
+                totalCollateralETH,
+                totalDebtETH,
+                maxGasPriceToTend
+            );
+    }
+
+    // same as above, with the interest rate strategy parameters read from
+    // _irsCache while it is up to date (a view cannot refresh it)
+    function shouldRebalance(
+        ILendingPool _lendingPool,
+        IPriceOracle _priceOracle,
+        address investmentToken,
+        uint256 acceptableCostsRay,
+        uint256 targetLTV,
+        uint256 warningLTV,
+        uint256 totalCollateralETH,
+        uint256 totalDebtETH,
+        uint256 maxGasPriceToTend,
+        IrsCache storage _irsCache
+    ) public view returns (bool) {
+        (uint256 currentProtocolDebt, uint256 maxProtocolDebt, ) =
+            _calcMaxDebt(
+                _priceOracle,
+                investmentToken,
+                acceptableCostsRay,
+                _getIrsVars(
+                    _interestRateStrategy(_lendingPool, investmentToken),
+                    _irsCache
+                )
+            );
+
+        return
+            _shouldRebalance(
+                currentProtocolDebt,
+                maxProtocolDebt,
+                targetLTV,
+                warningLTV,
+                totalCollateralETH,
+                totalDebtETH,
+                maxGasPriceToTend
+            );
+    }
+
+    function _shouldRebalance(
+        uint256 currentProtocolDebt,
+        uint256 maxProtocolDebt,
+        uint256 targetLTV,
+        uint256 warningLTV,
+        uint256 totalCollateralETH,
+        uint256 totalDebtETH,
+        uint256 maxGasPriceToTend
+    ) internal view returns (bool) {
+        uint256 currentLTV = totalDebtETH.mul(MAX_BPS).div(totalCollateralETH);
 
         // If we are in danger zone then repay debt regardless of the current gas price
         if (currentLTV > warningLTV) {
@@ -0,0 +1,139 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/math/Math.sol";
+import {
+    SafeERC20,
+    IERC20
+} from "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+import "../WadRayMath.sol";
+import "../interfaces/aave/IAaveIncentivesController.sol";
+import "./MockERC20.sol";
+import "./MockLendingPool.sol";
+import "./MockIncentivesController.sol";
+
+// aToken with scaled balances: balanceOf grows with the reserve liquidity index
+contract MockAToken is MockTokenBase {
+    using SafeERC20 for IERC20;
+    using WadRayMath for uint256;
+
+    MockLendingPool public immutable POOL;
+    address public immutable UNDERLYING_ASSET_ADDRESS;
+    MockIncentivesController internal immutable incentivesController;
+
+    modifier onlyLendingPool() {
+        require(msg.sender == address(POOL)); // dev: !pool
+        _;
+    }
+
+    constructor(
+        MockLendingPool _pool,
+        address _underlyingAsset,
+        MockIncentivesController _incentivesController,
+        string memory _name,
+        string memory _symbol
+    ) public {
+        POOL = _pool;
+        UNDERLYING_ASSET_ADDRESS = _underlyingAsset;
+        incentivesController = _incentivesController;
+        _setupMetadata(
+            _name,
+            _symbol,
+            MockTokenBase(_underlyingAsset).decimals()
+        );
+    }
+
+    function getIncentivesController()
+        external
+        view
+        returns (IAaveIncentivesController)
+    {
+        return IAaveIncentivesController(address(incentivesController));
+    }
+
+    function balanceOf(address user) public view override returns (uint256) {
+        return
+            _balances[user].rayMul(
+                POOL.getReserveNormalizedIncome(UNDERLYING_ASSET_ADDRESS)
+            );
+    }
+
+    function totalSupply() public view override returns (uint256) {
+        return
+            _totalSupply.rayMul(
+                POOL.getReserveNormalizedIncome(UNDERLYING_ASSET_ADDRESS)
+            );
+    }
+
+    function scaledBalanceOf(address user) external view returns (uint256) {
+        return _balances[user];
+    }
+
+    function scaledTotalSupply() external view returns (uint256) {
+        return _totalSupply;
+    }
+
+    function mint(
+        address user,
+        uint256 amount,
+        uint256 index
+    ) external onlyLendingPool returns (bool) {
+        uint256 previousBalance = _balances[user];
+        _mint(user, amount.rayDiv(index));
+        return previousBalance == 0;
+    }
+
+    function burn(
+        address user,
+        address receiverOfUnderlying,
+        uint256 amount,
+        uint256 index
+    ) external onlyLendingPool {
+        // rounding can leave the scaled amount one unit above the balance
+        _burn(user, Math.min(amount.rayDiv(index), _balances[user]));
+        IERC20(UNDERLYING_ASSET_ADDRESS).safeTransfer(
+            receiverOfUnderlying,
+            amount
+        );
+    }
+
+    function transferUnderlyingTo(address target, uint256 amount)
+        external
+        onlyLendingPool
+        returns (uint256)
+    {
+        IERC20(UNDERLYING_ASSET_ADDRESS).safeTransfer(target, amount);
+        return amount;
+    }
+
+    function _transfer(
+        address from,
+        address to,
+        uint256 amount
+    ) internal override {
+        super._transfer(
+            from,
+            to,
+            amount.rayDiv(
+                POOL.getReserveNormalizedIncome(UNDERLYING_ASSET_ADDRESS)
+            )
+        );
+    }
+
+    function _beforeTokenTransfer(address from, address to) internal override {
+        if (address(incentivesController) == address(0)) {
+            return;
+        }
+        if (from != address(0)) {
+            incentivesController.handleAction(
+                from,
+                totalSupply(),
+                balanceOf(from)
+            );
+        }
+        if (to != address(0)) {
+            incentivesController.handleAction(to, totalSupply(), balanceOf(to));
+        }
+    }
+}
@@ -0,0 +1,12 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+// Base fee oracle with a settable value. Meant to be copied to the address
+// AaveLenderBorrowerLib reads the base fee from.
+contract MockBaseFee {
+    uint256 public basefee_global;
+
+    function setBaseFee(uint256 _baseFee) external {
+        basefee_global = _baseFee;
+    }
+}
@@ -0,0 +1,121 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+// Minimal ERC20 used as the base of every mock token.
+// Metadata lives in plain storage (no immutables) so the runtime code can be
+// copied to a hardcoded mainnet address and initialized afterwards.
+contract MockTokenBase {
+    using SafeMath for uint256;
+
+    string public name;
+    string public symbol;
+    uint8 public decimals;
+
+    uint256 internal _totalSupply;
+    mapping(address => uint256) internal _balances;
+    mapping(address => mapping(address => uint256)) public allowance;
+
+    event Transfer(address indexed from, address indexed to, uint256 value);
+    event Approval(
+        address indexed owner,
+        address indexed spender,
+        uint256 value
+    );
+
+    function _setupMetadata(
+        string memory _name,
+        string memory _symbol,
+        uint8 _decimals
+    ) internal {
+        require(bytes(symbol).length == 0); // dev: already initialized
+        name = _name;
+        symbol = _symbol;
+        decimals = _decimals;
+    }
+
+    function totalSupply() public view virtual returns (uint256) {
+        return _totalSupply;
+    }
+
+    function balanceOf(address account) public view virtual returns (uint256) {
+        return _balances[account];
+    }
+
+    function approve(address spender, uint256 amount) external returns (bool) {
+        allowance[msg.sender][spender] = amount;
+        emit Approval(msg.sender, spender, amount);
+        return true;
+    }
+
+    function transfer(address to, uint256 amount) external returns (bool) {
+        _transfer(msg.sender, to, amount);
+        return true;
+    }
+
+    function transferFrom(
+        address from,
+        address to,
+        uint256 amount
+    ) external returns (bool) {
+        if (allowance[from][msg.sender] != type(uint256).max) {
+            allowance[from][msg.sender] = allowance[from][msg.sender].sub(
+                amount
+            );
+        }
+        _transfer(from, to, amount);
+        return true;
+    }
+
+    function _beforeTokenTransfer(address from, address to) internal virtual {}
+
+    function _transfer(
+        address from,
+        address to,
+        uint256 amount
+    ) internal virtual {
+        _beforeTokenTransfer(from, to);
+        _balances[from] = _balances[from].sub(amount);
+        _balances[to] = _balances[to].add(amount);
+        emit Transfer(from, to, amount);
+    }
+
+    function _mint(address to, uint256 amount) internal virtual {
+        _beforeTokenTransfer(address(0), to);
+        _totalSupply = _totalSupply.add(amount);
+        _balances[to] = _balances[to].add(amount);
+        emit Transfer(address(0), to, amount);
+    }
+
+    function _burn(address from, uint256 amount) internal virtual {
+        _beforeTokenTransfer(from, address(0));
+        _balances[from] = _balances[from].sub(amount);
+        _totalSupply = _totalSupply.sub(amount);
+        emit Transfer(from, address(0), amount);
+    }
+}
+
+// Freely mintable token standing in for want, investment and reward tokens
+contract MockERC20 is MockTokenBase {
+    constructor(
+        string memory _name,
+        string memory _symbol,
+        uint8 _decimals
+    ) public {
+        _setupMetadata(_name, _symbol, _decimals);
+    }
+
+    // used when the runtime code has been copied to a fixed address
+    function initialize(
+        string memory _name,
+        string memory _symbol,
+        uint8 _decimals
+    ) external {
+        _setupMetadata(_name, _symbol, _decimals);
+    }
+
+    function mint(address to, uint256 amount) external {
+        _mint(to, amount);
+    }
+}
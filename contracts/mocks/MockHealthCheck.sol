@@ -0,0 +1,13 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+// Health check that accepts every report. Answers any call with `true`, so it
+// does not depend on the exact check() signature of the vaults package.
+contract MockHealthCheck {
+    fallback() external {
+        assembly {
+            mstore(0, 1)
+            return(0, 32)
+        }
+    }
+}
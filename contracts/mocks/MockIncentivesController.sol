@@ -0,0 +1,148 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/math/Math.sol";
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import {IERC20} from "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import "./MockStakedAave.sol";
+
+// Liquidity mining controller paying stkAAVE for holding aTokens and debt tokens.
+// Rewards accrue linearly: balance * emissionPerSecond * elapsed / 1e18
+contract MockIncentivesController {
+    using SafeMath for uint256;
+
+    MockStakedAave public immutable REWARD_TOKEN;
+
+    uint256 public getDistributionEnd = type(uint256).max;
+
+    // asset => rewards per second per 1e18 units of balance
+    mapping(address => uint256) public emissionPerSecond;
+    // asset => user => last time rewards were accrued
+    mapping(address => mapping(address => uint256)) internal lastUpdate;
+    mapping(address => uint256) public getUserUnclaimedRewards;
+
+    event RewardsAccrued(address indexed user, uint256 amount);
+    event RewardsClaimed(
+        address indexed user,
+        address indexed to,
+        address indexed claimer,
+        uint256 amount
+    );
+
+    constructor(MockStakedAave _rewardToken) public {
+        REWARD_TOKEN = _rewardToken;
+    }
+
+    function configureAsset(address asset, uint256 _emissionPerSecond)
+        external
+    {
+        emissionPerSecond[asset] = _emissionPerSecond;
+    }
+
+    function getAssetData(address asset)
+        external
+        view
+        returns (
+            uint256,
+            uint256,
+            uint256
+        )
+    {
+        return (0, emissionPerSecond[asset], 0);
+    }
+
+    // called by the incentivised tokens before every balance change
+    function handleAction(
+        address user,
+        uint256,
+        uint256 userBalance
+    ) external {
+        _accrue(msg.sender, user, userBalance);
+    }
+
+    function getRewardsBalance(address[] calldata assets, address user)
+        external
+        view
+        returns (uint256 rewards)
+    {
+        rewards = getUserUnclaimedRewards[user];
+        for (uint256 i = 0; i < assets.length; i++) {
+            rewards = rewards.add(
+                _pending(
+                    assets[i],
+                    user,
+                    IERC20(assets[i]).balanceOf(user)
+                )
+            );
+        }
+    }
+
+    function claimRewards(
+        address[] calldata assets,
+        uint256 amount,
+        address to
+    ) external returns (uint256) {
+        return _claimRewards(assets, amount, msg.sender, to);
+    }
+
+    function claimRewardsOnBehalf(
+        address[] calldata assets,
+        uint256 amount,
+        address user,
+        address to
+    ) external returns (uint256) {
+        return _claimRewards(assets, amount, user, to);
+    }
+
+    function _claimRewards(
+        address[] calldata assets,
+        uint256 amount,
+        address user,
+        address to
+    ) internal returns (uint256) {
+        for (uint256 i = 0; i < assets.length; i++) {
+            _accrue(assets[i], user, IERC20(assets[i]).balanceOf(user));
+        }
+        uint256 unclaimedRewards = getUserUnclaimedRewards[user];
+        uint256 amountToClaim = Math.min(amount, unclaimedRewards);
+        if (amountToClaim == 0) {
+            return 0;
+        }
+        getUserUnclaimedRewards[user] = unclaimedRewards.sub(amountToClaim);
+        REWARD_TOKEN.mint(to, amountToClaim);
+        emit RewardsClaimed(user, to, msg.sender, amountToClaim);
+        return amountToClaim;
+    }
+
+    function _accrue(
+        address asset,
+        address user,
+        uint256 userBalance
+    ) internal {
+        uint256 accrued = _pending(asset, user, userBalance);
+        lastUpdate[asset][user] = block.timestamp;
+        if (accrued > 0) {
+            getUserUnclaimedRewards[user] = getUserUnclaimedRewards[user].add(
+                accrued
+            );
+            emit RewardsAccrued(user, accrued);
+        }
+    }
+
+    function _pending(
+        address asset,
+        address user,
+        uint256 userBalance
+    ) internal view returns (uint256) {
+        uint256 last = lastUpdate[asset][user];
+        if (last == 0) {
+            return 0;
+        }
+        return
+            userBalance
+                .mul(emissionPerSecond[asset])
+                .mul(block.timestamp.sub(last))
+                .div(1e18);
+    }
+}
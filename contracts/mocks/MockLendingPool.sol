@@ -0,0 +1,548 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import {
+    SafeERC20,
+    IERC20
+} from "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+import "../WadRayMath.sol";
+import "../libraries/aave/DataTypes.sol";
+import "../interfaces/aave/IPriceOracle.sol";
+import "../interfaces/aave/ILendingPoolAddressesProvider.sol";
+import "../interfaces/aave/IReserveInterestRateStrategy.sol";
+import "../interfaces/aave/IFlashLoanReceiver.sol";
+import "./MockERC20.sol";
+import "./MockAToken.sol";
+import "./MockVariableDebtToken.sol";
+
+// Aave V2 LendingPool reduced to what the strategy uses: single-user deposits,
+// withdrawals, variable rate borrows/repays and flash loans repaid in the same
+// transaction. Interest accrues linearly on both indexes; rates come from each
+// reserve's interest rate strategy.
+contract MockLendingPool {
+    using SafeERC20 for IERC20;
+    using SafeMath for uint256;
+    using WadRayMath for uint256;
+
+    struct AccountDataLocalVars {
+        uint256 ltv;
+        uint256 liquidationThreshold;
+        uint256 unit;
+        uint256 price;
+        uint256 balance;
+        uint256 balanceETH;
+        uint256 sumLtv;
+        uint256 sumLiquidationThreshold;
+    }
+
+    uint256 internal constant SECONDS_PER_YEAR = 365 days;
+    uint256 internal constant MAX_BPS = 10_000;
+    uint256 internal constant VARIABLE_RATE_MODE = 2;
+    uint256 internal constant HEALTH_FACTOR_LIQUIDATION_THRESHOLD = 1e18;
+    uint256 public constant FLASHLOAN_PREMIUM_TOTAL = 9; // bps, as on mainnet
+
+    ILendingPoolAddressesProvider internal immutable addressesProvider;
+
+    mapping(address => DataTypes.ReserveData) internal _reserves;
+    address[] internal _reservesList;
+
+    event Deposit(
+        address indexed reserve,
+        address user,
+        address indexed onBehalfOf,
+        uint256 amount,
+        uint16 indexed referral
+    );
+    event Withdraw(
+        address indexed reserve,
+        address indexed user,
+        address indexed to,
+        uint256 amount
+    );
+    event Borrow(
+        address indexed reserve,
+        address user,
+        address indexed onBehalfOf,
+        uint256 amount,
+        uint256 borrowRateMode,
+        uint256 borrowRate,
+        uint16 indexed referral
+    );
+    event Repay(
+        address indexed reserve,
+        address indexed user,
+        address indexed repayer,
+        uint256 amount
+    );
+    event FlashLoan(
+        address indexed target,
+        address indexed initiator,
+        address indexed asset,
+        uint256 amount,
+        uint256 premium,
+        uint16 referralCode
+    );
+    event ReserveDataUpdated(
+        address indexed reserve,
+        uint256 liquidityRate,
+        uint256 stableBorrowRate,
+        uint256 variableBorrowRate,
+        uint256 liquidityIndex,
+        uint256 variableBorrowIndex
+    );
+
+    constructor(ILendingPoolAddressesProvider _addressesProvider) public {
+        addressesProvider = _addressesProvider;
+    }
+
+    // ----------------- RESERVE ADMIN -----------------
+
+    function initReserve(
+        address asset,
+        address aTokenAddress,
+        address variableDebtTokenAddress,
+        address interestRateStrategyAddress,
+        uint256 ltv,
+        uint256 liquidationThreshold
+    ) external {
+        DataTypes.ReserveData storage reserve = _reserves[asset];
+        require(reserve.aTokenAddress == address(0)); // dev: already initialized
+
+        reserve.liquidityIndex = uint128(WadRayMath.RAY);
+        reserve.variableBorrowIndex = uint128(WadRayMath.RAY);
+        reserve.lastUpdateTimestamp = uint40(block.timestamp);
+        reserve.aTokenAddress = aTokenAddress;
+        reserve.variableDebtTokenAddress = variableDebtTokenAddress;
+        reserve.interestRateStrategyAddress = interestRateStrategyAddress;
+        reserve.id = uint8(_reservesList.length);
+        _reservesList.push(asset);
+
+        setConfiguration(asset, ltv, liquidationThreshold);
+        _updateInterestRates(asset);
+    }
+
+    // LTV and liquidation threshold in bps, packed like ReserveConfiguration
+    function setConfiguration(
+        address asset,
+        uint256 ltv,
+        uint256 liquidationThreshold
+    ) public {
+        require(ltv <= liquidationThreshold && liquidationThreshold <= MAX_BPS);
+        _reserves[asset].configuration.data =
+            ltv |
+            (liquidationThreshold << 16) |
+            (10_500 << 32) | // liquidation bonus
+            (uint256(MockTokenBase(asset).decimals()) << 48) |
+            (1 << 56) | // active
+            (1 << 58); // borrowing enabled
+    }
+
+    // as Aave's pool does, only the address is stored: no event is emitted and
+    // rates move with the next action on the reserve (see updateReserve)
+    function setReserveInterestRateStrategyAddress(
+        address asset,
+        address rateStrategyAddress
+    ) external {
+        _reserves[asset].interestRateStrategyAddress = rateStrategyAddress;
+    }
+
+    // accrues interest and recomputes rates, e.g. after changing IRS params
+    function updateReserve(address asset) external {
+        _updateState(asset);
+        _updateInterestRates(asset);
+    }
+
+    // ----------------- VIEWS -----------------
+
+    function getAddressesProvider()
+        external
+        view
+        returns (ILendingPoolAddressesProvider)
+    {
+        return addressesProvider;
+    }
+
+    function getReservesList() external view returns (address[] memory) {
+        return _reservesList;
+    }
+
+    function getReserveData(address asset)
+        external
+        view
+        returns (DataTypes.ReserveData memory)
+    {
+        return _reserves[asset];
+    }
+
+    function getConfiguration(address asset)
+        external
+        view
+        returns (DataTypes.ReserveConfigurationMap memory)
+    {
+        return _reserves[asset].configuration;
+    }
+
+    function getReserveNormalizedIncome(address asset)
+        public
+        view
+        returns (uint256)
+    {
+        DataTypes.ReserveData storage reserve = _reserves[asset];
+        return
+            _cumulatedIndex(
+                reserve.liquidityIndex,
+                reserve.currentLiquidityRate,
+                reserve.lastUpdateTimestamp
+            );
+    }
+
+    function getReserveNormalizedVariableDebt(address asset)
+        public
+        view
+        returns (uint256)
+    {
+        DataTypes.ReserveData storage reserve = _reserves[asset];
+        return
+            _cumulatedIndex(
+                reserve.variableBorrowIndex,
+                reserve.currentVariableBorrowRate,
+                reserve.lastUpdateTimestamp
+            );
+    }
+
+    function getUserAccountData(address user)
+        public
+        view
+        returns (
+            uint256 totalCollateralETH,
+            uint256 totalDebtETH,
+            uint256 availableBorrowsETH,
+            uint256 currentLiquidationThreshold,
+            uint256 ltv,
+            uint256 healthFactor
+        )
+    {
+        AccountDataLocalVars memory vars;
+        IPriceOracle oracle = IPriceOracle(addressesProvider.getPriceOracle());
+
+        for (uint256 i = 0; i < _reservesList.length; i++) {
+            address asset = _reservesList[i];
+            DataTypes.ReserveData storage reserve = _reserves[asset];
+            uint256 data = reserve.configuration.data;
+            vars.ltv = data & 0xFFFF;
+            vars.liquidationThreshold = (data >> 16) & 0xFFFF;
+            vars.unit = 10**((data >> 48) & 0xFF);
+            vars.price = oracle.getAssetPrice(asset);
+
+            vars.balance = IERC20(reserve.aTokenAddress).balanceOf(user);
+            if (vars.balance > 0) {
+                vars.balanceETH = vars.balance.mul(vars.price).div(vars.unit);
+                totalCollateralETH = totalCollateralETH.add(vars.balanceETH);
+                vars.sumLtv = vars.sumLtv.add(vars.balanceETH.mul(vars.ltv));
+                vars.sumLiquidationThreshold = vars.sumLiquidationThreshold.add(
+                    vars.balanceETH.mul(vars.liquidationThreshold)
+                );
+            }
+
+            vars.balance = IERC20(reserve.variableDebtTokenAddress).balanceOf(
+                user
+            );
+            if (vars.balance > 0) {
+                totalDebtETH = totalDebtETH.add(
+                    vars.balance.mul(vars.price).div(vars.unit)
+                );
+            }
+        }
+
+        if (totalCollateralETH > 0) {
+            ltv = vars.sumLtv.div(totalCollateralETH);
+            currentLiquidationThreshold = vars.sumLiquidationThreshold.div(
+                totalCollateralETH
+            );
+        }
+
+        uint256 maxBorrowsETH = totalCollateralETH.mul(ltv).div(MAX_BPS);
+        availableBorrowsETH = maxBorrowsETH > totalDebtETH
+            ? maxBorrowsETH.sub(totalDebtETH)
+            : 0;
+
+        healthFactor = totalDebtETH == 0
+            ? type(uint256).max
+            : totalCollateralETH
+                .mul(currentLiquidationThreshold)
+                .div(MAX_BPS)
+                .wadDiv(totalDebtETH);
+    }
+
+    // ----------------- USER ACTIONS -----------------
+
+    function deposit(
+        address asset,
+        uint256 amount,
+        address onBehalfOf,
+        uint16 referralCode
+    ) external {
+        require(amount != 0, "INVALID_AMOUNT");
+        DataTypes.ReserveData storage reserve = _reserves[asset];
+        _updateState(asset);
+
+        IERC20(asset).safeTransferFrom(
+            msg.sender,
+            reserve.aTokenAddress,
+            amount
+        );
+        MockAToken(reserve.aTokenAddress).mint(
+            onBehalfOf,
+            amount,
+            reserve.liquidityIndex
+        );
+
+        _updateInterestRates(asset);
+        emit Deposit(asset, msg.sender, onBehalfOf, amount, referralCode);
+    }
+
+    function withdraw(
+        address asset,
+        uint256 amount,
+        address to
+    ) external returns (uint256) {
+        DataTypes.ReserveData storage reserve = _reserves[asset];
+        _updateState(asset);
+
+        uint256 userBalance =
+            IERC20(reserve.aTokenAddress).balanceOf(msg.sender);
+        uint256 amountToWithdraw =
+            amount == type(uint256).max ? userBalance : amount;
+        require(
+            amountToWithdraw != 0 && amountToWithdraw <= userBalance,
+            "NOT_ENOUGH_AVAILABLE_USER_BALANCE"
+        );
+
+        MockAToken(reserve.aTokenAddress).burn(
+            msg.sender,
+            to,
+            amountToWithdraw,
+            reserve.liquidityIndex
+        );
+
+        _updateInterestRates(asset);
+        require(
+            _healthFactor(msg.sender) >= HEALTH_FACTOR_LIQUIDATION_THRESHOLD,
+            "HEALTH_FACTOR_LOWER_THAN_LIQUIDATION_THRESHOLD"
+        );
+        emit Withdraw(asset, msg.sender, to, amountToWithdraw);
+        return amountToWithdraw;
+    }
+
+    function borrow(
+        address asset,
+        uint256 amount,
+        uint256 interestRateMode,
+        uint16 referralCode,
+        address onBehalfOf
+    ) external {
+        require(
+            interestRateMode == VARIABLE_RATE_MODE,
+            "INVALID_INTEREST_RATE_MODE_SELECTED"
+        );
+        require(onBehalfOf == msg.sender, "CREDIT_DELEGATION_NOT_SUPPORTED");
+        require(amount != 0, "INVALID_AMOUNT");
+        DataTypes.ReserveData storage reserve = _reserves[asset];
+        _updateState(asset);
+
+        (, , uint256 availableBorrowsETH, , , ) = getUserAccountData(onBehalfOf);
+        require(
+            _toETH(asset, amount) <= availableBorrowsETH,
+            "COLLATERAL_CANNOT_COVER_NEW_BORROW"
+        );
+
+        MockVariableDebtToken(reserve.variableDebtTokenAddress).mint(
+            msg.sender,
+            onBehalfOf,
+            amount,
+            reserve.variableBorrowIndex
+        );
+        MockAToken(reserve.aTokenAddress).transferUnderlyingTo(
+            msg.sender,
+            amount
+        );
+
+        _updateInterestRates(asset);
+        emit Borrow(
+            asset,
+            msg.sender,
+            onBehalfOf,
+            amount,
+            VARIABLE_RATE_MODE,
+            reserve.currentVariableBorrowRate,
+            referralCode
+        );
+    }
+
+    function repay(
+        address asset,
+        uint256 amount,
+        uint256 rateMode,
+        address onBehalfOf
+    ) external returns (uint256) {
+        require(
+            rateMode == VARIABLE_RATE_MODE,
+            "INVALID_INTEREST_RATE_MODE_SELECTED"
+        );
+        DataTypes.ReserveData storage reserve = _reserves[asset];
+        _updateState(asset);
+
+        uint256 variableDebt =
+            IERC20(reserve.variableDebtTokenAddress).balanceOf(onBehalfOf);
+        uint256 paybackAmount = amount < variableDebt ? amount : variableDebt;
+        require(paybackAmount != 0, "NO_DEBT_OF_SELECTED_TYPE");
+
+        MockVariableDebtToken(reserve.variableDebtTokenAddress).burn(
+            onBehalfOf,
+            paybackAmount,
+            reserve.variableBorrowIndex
+        );
+        IERC20(asset).safeTransferFrom(
+            msg.sender,
+            reserve.aTokenAddress,
+            paybackAmount
+        );
+
+        _updateInterestRates(asset);
+        emit Repay(asset, onBehalfOf, msg.sender, paybackAmount);
+        return paybackAmount;
+    }
+
+    // only mode 0 (no debt opened): the receiver must approve amount + premium
+    function flashLoan(
+        address receiverAddress,
+        address[] calldata assets,
+        uint256[] calldata amounts,
+        uint256[] calldata modes,
+        address,
+        bytes calldata params,
+        uint16 referralCode
+    ) external {
+        require(
+            assets.length == amounts.length && assets.length == modes.length,
+            "INCONSISTENT_FLASHLOAN_PARAMS"
+        );
+        uint256[] memory premiums = new uint256[](assets.length);
+        for (uint256 i = 0; i < assets.length; i++) {
+            require(modes[i] == 0, "FLASHLOAN_DEBT_NOT_SUPPORTED");
+            premiums[i] = amounts[i].mul(FLASHLOAN_PREMIUM_TOTAL).div(MAX_BPS);
+            MockAToken(_reserves[assets[i]].aTokenAddress)
+                .transferUnderlyingTo(receiverAddress, amounts[i]);
+        }
+
+        require(
+            IFlashLoanReceiver(receiverAddress).executeOperation(
+                assets,
+                amounts,
+                premiums,
+                msg.sender,
+                params
+            ),
+            "INVALID_FLASH_LOAN_EXECUTOR_RETURN"
+        );
+
+        for (uint256 i = 0; i < assets.length; i++) {
+            address asset = assets[i];
+            _updateState(asset);
+            // the premium stays in the reserve
+            IERC20(asset).safeTransferFrom(
+                receiverAddress,
+                _reserves[asset].aTokenAddress,
+                amounts[i].add(premiums[i])
+            );
+            _updateInterestRates(asset);
+            emit FlashLoan(
+                receiverAddress,
+                msg.sender,
+                asset,
+                amounts[i],
+                premiums[i],
+                referralCode
+            );
+        }
+    }
+
+    // ----------------- INTERNAL -----------------
+
+    function _healthFactor(address user) internal view returns (uint256) {
+        (, , , , , uint256 healthFactor) = getUserAccountData(user);
+        return healthFactor;
+    }
+
+    function _toETH(address asset, uint256 amount)
+        internal
+        view
+        returns (uint256)
+    {
+        return
+            amount
+                .mul(
+                IPriceOracle(addressesProvider.getPriceOracle()).getAssetPrice(
+                    asset
+                )
+            )
+                .div(10**uint256(MockTokenBase(asset).decimals()));
+    }
+
+    function _cumulatedIndex(
+        uint256 index,
+        uint256 rate,
+        uint40 lastUpdateTimestamp
+    ) internal view returns (uint256) {
+        uint256 timeDelta = block.timestamp.sub(uint256(lastUpdateTimestamp));
+        if (timeDelta == 0) {
+            return index;
+        }
+        return
+            index.rayMul(
+                rate.mul(timeDelta).div(SECONDS_PER_YEAR).add(WadRayMath.RAY)
+            );
+    }
+
+    function _updateState(address asset) internal {
+        DataTypes.ReserveData storage reserve = _reserves[asset];
+        require(reserve.aTokenAddress != address(0), "RESERVE_NOT_INITIALIZED");
+        reserve.liquidityIndex = uint128(getReserveNormalizedIncome(asset));
+        reserve.variableBorrowIndex = uint128(
+            getReserveNormalizedVariableDebt(asset)
+        );
+        reserve.lastUpdateTimestamp = uint40(block.timestamp);
+    }
+
+    function _updateInterestRates(address asset) internal {
+        DataTypes.ReserveData storage reserve = _reserves[asset];
+        uint256 totalVariableDebt =
+            MockVariableDebtToken(reserve.variableDebtTokenAddress)
+                .scaledTotalSupply()
+                .rayMul(reserve.variableBorrowIndex);
+
+        (uint256 liquidityRate, , uint256 variableBorrowRate) =
+            IReserveInterestRateStrategy(reserve.interestRateStrategyAddress)
+                .calculateInterestRates(
+                asset,
+                IERC20(asset).balanceOf(reserve.aTokenAddress),
+                0,
+                totalVariableDebt,
+                0,
+                0
+            );
+        reserve.currentLiquidityRate = uint128(liquidityRate);
+        reserve.currentVariableBorrowRate = uint128(variableBorrowRate);
+
+        emit ReserveDataUpdated(
+            asset,
+            liquidityRate,
+            0,
+            variableBorrowRate,
+            reserve.liquidityIndex,
+            reserve.variableBorrowIndex
+        );
+    }
+}
@@ -0,0 +1,22 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+// Registry of the mock market contracts. Addresses can be swapped at any time
+// to simulate Aave upgrading its lending pool or price oracle.
+contract MockLendingPoolAddressesProvider {
+    address public getLendingPool;
+    address public getPriceOracle;
+
+    event LendingPoolUpdated(address indexed newAddress);
+    event PriceOracleUpdated(address indexed newAddress);
+
+    function setLendingPoolImpl(address pool) external {
+        getLendingPool = pool;
+        emit LendingPoolUpdated(pool);
+    }
+
+    function setPriceOracle(address priceOracle) external {
+        getPriceOracle = priceOracle;
+        emit PriceOracleUpdated(priceOracle);
+    }
+}
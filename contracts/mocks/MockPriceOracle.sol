@@ -0,0 +1,37 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+// Aave price oracle with prices set by hand, quoted in ETH (18 decimals)
+contract MockPriceOracle {
+    mapping(address => uint256) internal prices;
+
+    event AssetPriceUpdated(address asset, uint256 price, uint256 timestamp);
+
+    function setAssetPrice(address asset, uint256 price) external {
+        prices[asset] = price;
+        emit AssetPriceUpdated(asset, price, block.timestamp);
+    }
+
+    function getAssetPrice(address asset) public view returns (uint256) {
+        return prices[asset];
+    }
+
+    function getAssetsPrices(address[] calldata assets)
+        external
+        view
+        returns (uint256[] memory _prices)
+    {
+        _prices = new uint256[](assets.length);
+        for (uint256 i = 0; i < assets.length; i++) {
+            _prices[i] = getAssetPrice(assets[i]);
+        }
+    }
+
+    function getSourceOfAsset(address) external pure returns (address) {
+        return address(0);
+    }
+
+    function getFallbackOracle() external pure returns (address) {
+        return address(0);
+    }
+}
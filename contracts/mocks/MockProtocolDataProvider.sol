@@ -0,0 +1,140 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import {IERC20} from "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import "../libraries/aave/DataTypes.sol";
+import "../interfaces/aave/ILendingPoolAddressesProvider.sol";
+import "./MockLendingPool.sol";
+import "./MockVariableDebtToken.sol";
+
+// AaveProtocolDataProvider reading from the mock lending pool.
+// Meant to be copied to the data provider address AaveLenderBorrowerLib uses.
+contract MockProtocolDataProvider {
+    ILendingPoolAddressesProvider public ADDRESSES_PROVIDER;
+
+    function initialize(ILendingPoolAddressesProvider _addressesProvider)
+        external
+    {
+        require(address(ADDRESSES_PROVIDER) == address(0)); // dev: already initialized
+        ADDRESSES_PROVIDER = _addressesProvider;
+    }
+
+    function _reserve(address asset)
+        internal
+        view
+        returns (DataTypes.ReserveData memory)
+    {
+        return
+            MockLendingPool(ADDRESSES_PROVIDER.getLendingPool()).getReserveData(
+                asset
+            );
+    }
+
+    function getReserveTokensAddresses(address asset)
+        external
+        view
+        returns (
+            address aTokenAddress,
+            address stableDebtTokenAddress,
+            address variableDebtTokenAddress
+        )
+    {
+        DataTypes.ReserveData memory reserve = _reserve(asset);
+        return (
+            reserve.aTokenAddress,
+            reserve.stableDebtTokenAddress,
+            reserve.variableDebtTokenAddress
+        );
+    }
+
+    function getReserveConfigurationData(address asset)
+        external
+        view
+        returns (
+            uint256 decimals,
+            uint256 ltv,
+            uint256 liquidationThreshold,
+            uint256 liquidationBonus,
+            uint256 reserveFactor,
+            bool usageAsCollateralEnabled,
+            bool borrowingEnabled,
+            bool stableBorrowRateEnabled,
+            bool isActive,
+            bool isFrozen
+        )
+    {
+        uint256 data = _reserve(asset).configuration.data;
+        ltv = data & 0xFFFF;
+        liquidationThreshold = (data >> 16) & 0xFFFF;
+        liquidationBonus = (data >> 32) & 0xFFFF;
+        decimals = (data >> 48) & 0xFF;
+        isActive = (data >> 56) & 1 != 0;
+        isFrozen = (data >> 57) & 1 != 0;
+        borrowingEnabled = (data >> 58) & 1 != 0;
+        stableBorrowRateEnabled = (data >> 59) & 1 != 0;
+        reserveFactor = (data >> 64) & 0xFFFF;
+        usageAsCollateralEnabled = liquidationThreshold != 0;
+    }
+
+    function getReserveData(address asset)
+        external
+        view
+        returns (
+            uint256 availableLiquidity,
+            uint256 totalStableDebt,
+            uint256 totalVariableDebt,
+            uint256 liquidityRate,
+            uint256 variableBorrowRate,
+            uint256 stableBorrowRate,
+            uint256 averageStableBorrowRate,
+            uint256 liquidityIndex,
+            uint256 variableBorrowIndex,
+            uint40 lastUpdateTimestamp
+        )
+    {
+        DataTypes.ReserveData memory reserve = _reserve(asset);
+        availableLiquidity = IERC20(asset).balanceOf(reserve.aTokenAddress);
+        totalVariableDebt = IERC20(reserve.variableDebtTokenAddress)
+            .totalSupply();
+        liquidityRate = reserve.currentLiquidityRate;
+        variableBorrowRate = reserve.currentVariableBorrowRate;
+        liquidityIndex = reserve.liquidityIndex;
+        variableBorrowIndex = reserve.variableBorrowIndex;
+        lastUpdateTimestamp = reserve.lastUpdateTimestamp;
+        // stable rate borrowing is not supported by the mock market
+        totalStableDebt = 0;
+        stableBorrowRate = 0;
+        averageStableBorrowRate = 0;
+    }
+
+    function getUserReserveData(address asset, address user)
+        external
+        view
+        returns (
+            uint256 currentATokenBalance,
+            uint256 currentStableDebt,
+            uint256 currentVariableDebt,
+            uint256 principalStableDebt,
+            uint256 scaledVariableDebt,
+            uint256 stableBorrowRate,
+            uint256 liquidityRate,
+            uint40 stableRateLastUpdated,
+            bool usageAsCollateralEnabled
+        )
+    {
+        DataTypes.ReserveData memory reserve = _reserve(asset);
+        currentATokenBalance = IERC20(reserve.aTokenAddress).balanceOf(user);
+        currentVariableDebt = IERC20(reserve.variableDebtTokenAddress)
+            .balanceOf(user);
+        scaledVariableDebt = MockVariableDebtToken(
+            reserve.variableDebtTokenAddress
+        ).scaledBalanceOf(user);
+        liquidityRate = reserve.currentLiquidityRate;
+        usageAsCollateralEnabled = currentATokenBalance > 0;
+        currentStableDebt = 0;
+        principalStableDebt = 0;
+        stableBorrowRate = 0;
+        stableRateLastUpdated = 0;
+    }
+}
@@ -0,0 +1,96 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "../WadRayMath.sol";
+
+// Aave V2 DefaultReserveInterestRateStrategy (variable rates only) with
+// parameters that can be changed after deployment
+contract MockReserveInterestRateStrategy {
+    using SafeMath for uint256;
+    using WadRayMath for uint256;
+
+    uint256 public OPTIMAL_UTILIZATION_RATE;
+    uint256 public baseVariableBorrowRate;
+    uint256 public variableRateSlope1;
+    uint256 public variableRateSlope2;
+
+    constructor(
+        uint256 _optimalUtilizationRate,
+        uint256 _baseVariableBorrowRate,
+        uint256 _variableRateSlope1,
+        uint256 _variableRateSlope2
+    ) public {
+        setParams(
+            _optimalUtilizationRate,
+            _baseVariableBorrowRate,
+            _variableRateSlope1,
+            _variableRateSlope2
+        );
+    }
+
+    function setParams(
+        uint256 _optimalUtilizationRate,
+        uint256 _baseVariableBorrowRate,
+        uint256 _variableRateSlope1,
+        uint256 _variableRateSlope2
+    ) public {
+        require(_optimalUtilizationRate <= WadRayMath.RAY);
+        OPTIMAL_UTILIZATION_RATE = _optimalUtilizationRate;
+        baseVariableBorrowRate = _baseVariableBorrowRate;
+        variableRateSlope1 = _variableRateSlope1;
+        variableRateSlope2 = _variableRateSlope2;
+    }
+
+    function EXCESS_UTILIZATION_RATE() public view returns (uint256) {
+        return WadRayMath.RAY.sub(OPTIMAL_UTILIZATION_RATE);
+    }
+
+    function getMaxVariableBorrowRate() external view returns (uint256) {
+        return
+            baseVariableBorrowRate.add(variableRateSlope1).add(
+                variableRateSlope2
+            );
+    }
+
+    function calculateInterestRates(
+        address,
+        uint256 availableLiquidity,
+        uint256 totalStableDebt,
+        uint256 totalVariableDebt,
+        uint256,
+        uint256
+    )
+        external
+        view
+        returns (
+            uint256 liquidityRate,
+            uint256 stableBorrowRate,
+            uint256 variableBorrowRate
+        )
+    {
+        uint256 totalDebt = totalStableDebt.add(totalVariableDebt);
+        uint256 utilizationRate =
+            totalDebt == 0
+                ? 0
+                : totalDebt.rayDiv(availableLiquidity.add(totalDebt));
+
+        if (utilizationRate > OPTIMAL_UTILIZATION_RATE) {
+            uint256 excessUtilizationRateRatio =
+                utilizationRate.sub(OPTIMAL_UTILIZATION_RATE).rayDiv(
+                    EXCESS_UTILIZATION_RATE()
+                );
+            variableBorrowRate = baseVariableBorrowRate
+                .add(variableRateSlope1)
+                .add(variableRateSlope2.rayMul(excessUtilizationRateRatio));
+        } else {
+            variableBorrowRate = baseVariableBorrowRate.add(
+                utilizationRate.rayMul(variableRateSlope1).rayDiv(
+                    OPTIMAL_UTILIZATION_RATE
+                )
+            );
+        }
+        liquidityRate = variableBorrowRate.rayMul(utilizationRate);
+        stableBorrowRate = 0;
+    }
+}
@@ -0,0 +1,111 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import {
+    SafeERC20,
+    IERC20
+} from "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+import "../interfaces/aave/IPriceOracle.sol";
+import "./MockERC20.sol";
+
+// Uniswap V2 style router that fills every swap at the oracle price by minting
+// the output token. Only the first and last hop of the path are used.
+// Meant to be copied to the router addresses and pointed at the oracle.
+contract MockRouter {
+    using SafeERC20 for IERC20;
+    using SafeMath for uint256;
+
+    IPriceOracle public priceOracle;
+
+    // same layout as UniswapV2Pair.Swap so tests can read amounts from it
+    event Swap(
+        address indexed sender,
+        uint256 amount0In,
+        uint256 amount1In,
+        uint256 amount0Out,
+        uint256 amount1Out,
+        address indexed to
+    );
+
+    function setPriceOracle(IPriceOracle _priceOracle) external {
+        priceOracle = _priceOracle;
+    }
+
+    function swapExactTokensForTokens(
+        uint256 amountIn,
+        uint256 amountOutMin,
+        address[] calldata path,
+        address to,
+        uint256
+    ) external returns (uint256[] memory amounts) {
+        amounts = getAmountsOut(amountIn, path);
+        uint256 amountOut = amounts[amounts.length - 1];
+        require(amountOut >= amountOutMin, "INSUFFICIENT_OUTPUT_AMOUNT");
+        _swap(amountIn, amountOut, path, to);
+    }
+
+    function swapTokensForExactTokens(
+        uint256 amountOut,
+        uint256 amountInMax,
+        address[] calldata path,
+        address to,
+        uint256
+    ) external returns (uint256[] memory amounts) {
+        amounts = getAmountsIn(amountOut, path);
+        uint256 amountIn = amounts[0];
+        require(amountIn <= amountInMax, "EXCESSIVE_INPUT_AMOUNT");
+        _swap(amountIn, amountOut, path, to);
+    }
+
+    function getAmountsOut(uint256 amountIn, address[] memory path)
+        public
+        view
+        returns (uint256[] memory amounts)
+    {
+        amounts = new uint256[](path.length);
+        amounts[0] = amountIn;
+        amounts[path.length - 1] = amountIn
+            .mul(priceOracle.getAssetPrice(path[0]))
+            .mul(_unit(path[path.length - 1]))
+            .div(
+            priceOracle.getAssetPrice(path[path.length - 1]).mul(
+                _unit(path[0])
+            )
+        );
+    }
+
+    function getAmountsIn(uint256 amountOut, address[] memory path)
+        public
+        view
+        returns (uint256[] memory amounts)
+    {
+        amounts = new uint256[](path.length);
+        amounts[path.length - 1] = amountOut;
+        // round up so the exact output is always covered
+        uint256 numerator =
+            amountOut
+                .mul(priceOracle.getAssetPrice(path[path.length - 1]))
+                .mul(_unit(path[0]));
+        uint256 denominator =
+            priceOracle.getAssetPrice(path[0]).mul(
+                _unit(path[path.length - 1])
+            );
+        amounts[0] = numerator.add(denominator).sub(1).div(denominator);
+    }
+
+    function _swap(
+        uint256 amountIn,
+        uint256 amountOut,
+        address[] calldata path,
+        address to
+    ) internal {
+        IERC20(path[0]).safeTransferFrom(msg.sender, address(this), amountIn);
+        MockERC20(path[path.length - 1]).mint(to, amountOut);
+        emit Swap(msg.sender, amountIn, 0, 0, amountOut, to);
+    }
+
+    function _unit(address asset) internal view returns (uint256) {
+        return 10**uint256(MockTokenBase(asset).decimals());
+    }
+}
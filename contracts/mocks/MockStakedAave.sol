@@ -0,0 +1,140 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/math/Math.sol";
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import {
+    SafeERC20,
+    IERC20
+} from "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+import "./MockERC20.sol";
+
+// stkAAVE with the mainnet cooldown rules. Staking rewards accrue linearly:
+// balance * emissionPerSecond * elapsed / 1e18, paid in freshly minted AAVE.
+// Meant to be copied to the stkAAVE address and initialized there.
+contract MockStakedAave is MockTokenBase {
+    using SafeERC20 for IERC20;
+    using SafeMath for uint256;
+
+    uint256 public constant COOLDOWN_SECONDS = 864000; // 10 days
+    uint256 public constant UNSTAKE_WINDOW = 172800; // 2 days
+
+    MockERC20 public STAKED_TOKEN;
+    uint256 public emissionPerSecond;
+
+    mapping(address => uint256) public stakersCooldowns;
+    mapping(address => uint256) internal stakerRewardsToClaim;
+    mapping(address => uint256) internal lastUpdate;
+
+    event Staked(
+        address indexed from,
+        address indexed onBehalfOf,
+        uint256 amount
+    );
+    event Redeem(address indexed from, address indexed to, uint256 amount);
+    event RewardsClaimed(
+        address indexed from,
+        address indexed to,
+        uint256 amount
+    );
+    event Cooldown(address indexed user);
+
+    function initialize(MockERC20 _stakedToken, uint256 _emissionPerSecond)
+        external
+    {
+        _setupMetadata("Staked Aave", "stkAAVE", 18);
+        STAKED_TOKEN = _stakedToken;
+        emissionPerSecond = _emissionPerSecond;
+    }
+
+    // the incentives controller pays liquidity mining rewards by minting
+    function mint(address to, uint256 amount) external {
+        _mint(to, amount);
+    }
+
+    function stake(address onBehalfOf, uint256 amount) external {
+        require(amount != 0, "INVALID_ZERO_AMOUNT");
+        IERC20(address(STAKED_TOKEN)).safeTransferFrom(
+            msg.sender,
+            address(this),
+            amount
+        );
+        _mint(onBehalfOf, amount);
+        emit Staked(msg.sender, onBehalfOf, amount);
+    }
+
+    function redeem(address to, uint256 amount) external {
+        require(amount != 0, "INVALID_ZERO_AMOUNT");
+        uint256 cooldownStartTimestamp = stakersCooldowns[msg.sender];
+        require(
+            block.timestamp > cooldownStartTimestamp.add(COOLDOWN_SECONDS),
+            "INSUFFICIENT_COOLDOWN"
+        );
+        require(
+            block.timestamp.sub(cooldownStartTimestamp.add(COOLDOWN_SECONDS)) <=
+                UNSTAKE_WINDOW,
+            "UNSTAKE_WINDOW_FINISHED"
+        );
+
+        uint256 amountToRedeem = Math.min(amount, _balances[msg.sender]);
+        _burn(msg.sender, amountToRedeem);
+        if (_balances[msg.sender] == 0) {
+            stakersCooldowns[msg.sender] = 0;
+        }
+        STAKED_TOKEN.mint(to, amountToRedeem);
+        emit Redeem(msg.sender, to, amountToRedeem);
+    }
+
+    function cooldown() external {
+        require(_balances[msg.sender] != 0, "INVALID_BALANCE_ON_COOLDOWN");
+        stakersCooldowns[msg.sender] = block.timestamp;
+        emit Cooldown(msg.sender);
+    }
+
+    function claimRewards(address to, uint256 amount) external {
+        _accrue(msg.sender);
+        uint256 amountToClaim =
+            Math.min(amount, stakerRewardsToClaim[msg.sender]);
+        stakerRewardsToClaim[msg.sender] = stakerRewardsToClaim[msg.sender].sub(
+            amountToClaim
+        );
+        STAKED_TOKEN.mint(to, amountToClaim);
+        emit RewardsClaimed(msg.sender, to, amountToClaim);
+    }
+
+    function getTotalRewardsBalance(address staker)
+        external
+        view
+        returns (uint256)
+    {
+        return stakerRewardsToClaim[staker].add(_pending(staker));
+    }
+
+    function _beforeTokenTransfer(address from, address to) internal override {
+        if (from != address(0)) {
+            _accrue(from);
+        }
+        if (to != address(0)) {
+            _accrue(to);
+        }
+    }
+
+    function _accrue(address staker) internal {
+        stakerRewardsToClaim[staker] = stakerRewardsToClaim[staker].add(
+            _pending(staker)
+        );
+        lastUpdate[staker] = block.timestamp;
+    }
+
+    function _pending(address staker) internal view returns (uint256) {
+        uint256 last = lastUpdate[staker];
+        if (last == 0) {
+            return 0;
+        }
+        return
+            _balances[staker]
+                .mul(emissionPerSecond)
+                .mul(block.timestamp.sub(last))
+                .div(1e18);
+    }
+}
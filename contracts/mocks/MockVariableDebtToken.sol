@@ -0,0 +1,107 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/math/Math.sol";
+import "../WadRayMath.sol";
+import "../interfaces/aave/IAaveIncentivesController.sol";
+import "./MockERC20.sol";
+import "./MockLendingPool.sol";
+import "./MockIncentivesController.sol";
+
+// Non-transferable debt token with scaled balances: balanceOf grows with the
+// reserve variable borrow index
+contract MockVariableDebtToken is MockTokenBase {
+    using WadRayMath for uint256;
+
+    MockLendingPool public immutable POOL;
+    address public immutable UNDERLYING_ASSET_ADDRESS;
+    MockIncentivesController internal immutable incentivesController;
+
+    modifier onlyLendingPool() {
+        require(msg.sender == address(POOL)); // dev: !pool
+        _;
+    }
+
+    constructor(
+        MockLendingPool _pool,
+        address _underlyingAsset,
+        MockIncentivesController _incentivesController,
+        string memory _name,
+        string memory _symbol
+    ) public {
+        POOL = _pool;
+        UNDERLYING_ASSET_ADDRESS = _underlyingAsset;
+        incentivesController = _incentivesController;
+        _setupMetadata(
+            _name,
+            _symbol,
+            MockTokenBase(_underlyingAsset).decimals()
+        );
+    }
+
+    function getIncentivesController()
+        external
+        view
+        returns (IAaveIncentivesController)
+    {
+        return IAaveIncentivesController(address(incentivesController));
+    }
+
+    function balanceOf(address user) public view override returns (uint256) {
+        return
+            _balances[user].rayMul(
+                POOL.getReserveNormalizedVariableDebt(UNDERLYING_ASSET_ADDRESS)
+            );
+    }
+
+    function totalSupply() public view override returns (uint256) {
+        return
+            _totalSupply.rayMul(
+                POOL.getReserveNormalizedVariableDebt(UNDERLYING_ASSET_ADDRESS)
+            );
+    }
+
+    function scaledBalanceOf(address user) external view returns (uint256) {
+        return _balances[user];
+    }
+
+    function scaledTotalSupply() external view returns (uint256) {
+        return _totalSupply;
+    }
+
+    function mint(
+        address,
+        address onBehalfOf,
+        uint256 amount,
+        uint256 index
+    ) external onlyLendingPool returns (bool) {
+        uint256 previousBalance = _balances[onBehalfOf];
+        _mint(onBehalfOf, amount.rayDiv(index));
+        return previousBalance == 0;
+    }
+
+    function burn(
+        address user,
+        uint256 amount,
+        uint256 index
+    ) external onlyLendingPool {
+        _burn(user, Math.min(amount.rayDiv(index), _balances[user]));
+    }
+
+    function _transfer(
+        address,
+        address,
+        uint256
+    ) internal override {
+        revert("TRANSFER_NOT_SUPPORTED");
+    }
+
+    function _beforeTokenTransfer(address from, address to) internal override {
+        if (address(incentivesController) == address(0)) {
+            return;
+        }
+        address user = from == address(0) ? to : from;
+        incentivesController.handleAction(user, totalSupply(), balanceOf(user));
+    }
+}
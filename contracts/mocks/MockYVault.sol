@@ -0,0 +1,107 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/math/Math.sol";
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import {
+    SafeERC20,
+    IERC20
+} from "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+import "./MockERC20.sol";
+
+// yVault holding its assets idle. Every token sent to it (including plain
+// transfers) counts as profit and raises pricePerShare.
+contract MockYVault is MockTokenBase {
+    using SafeERC20 for IERC20;
+    using SafeMath for uint256;
+
+    address public immutable token;
+    address public governance;
+    uint256 public depositLimit;
+
+    constructor(address _token, address _governance) public {
+        token = _token;
+        governance = _governance;
+        MockTokenBase _underlying = MockTokenBase(_token);
+        _setupMetadata(
+            string(abi.encodePacked(_underlying.symbol(), " yVault")),
+            string(abi.encodePacked("yv", _underlying.symbol())),
+            _underlying.decimals()
+        );
+    }
+
+    function setDepositLimit(uint256 limit) external {
+        require(msg.sender == governance); // dev: !governance
+        depositLimit = limit;
+    }
+
+    function totalAssets() public view returns (uint256) {
+        return IERC20(token).balanceOf(address(this));
+    }
+
+    function availableDepositLimit() public view returns (uint256) {
+        uint256 _totalAssets = totalAssets();
+        return depositLimit > _totalAssets ? depositLimit - _totalAssets : 0;
+    }
+
+    function pricePerShare() external view returns (uint256) {
+        return _shareValue(10**uint256(decimals));
+    }
+
+    function deposit() external returns (uint256) {
+        return
+            _deposit(
+                Math.min(
+                    IERC20(token).balanceOf(msg.sender),
+                    availableDepositLimit()
+                )
+            );
+    }
+
+    function deposit(uint256 amount) external returns (uint256) {
+        require(amount <= availableDepositLimit()); // dev: deposit limit
+        return _deposit(amount);
+    }
+
+    function withdraw() external returns (uint256) {
+        return _withdraw(_balances[msg.sender], msg.sender);
+    }
+
+    function withdraw(uint256 shares) external returns (uint256) {
+        return _withdraw(shares, msg.sender);
+    }
+
+    function withdraw(
+        uint256 shares,
+        address recipient,
+        uint256
+    ) external returns (uint256) {
+        return _withdraw(shares, recipient);
+    }
+
+    function _deposit(uint256 amount) internal returns (uint256 shares) {
+        uint256 _totalAssets = totalAssets();
+        shares = _totalSupply == 0 || _totalAssets == 0
+            ? amount
+            : amount.mul(_totalSupply).div(_totalAssets);
+        require(shares != 0); // dev: zero shares
+        IERC20(token).safeTransferFrom(msg.sender, address(this), amount);
+        _mint(msg.sender, shares);
+    }
+
+    function _withdraw(uint256 shares, address recipient)
+        internal
+        returns (uint256 value)
+    {
+        value = _shareValue(shares);
+        _burn(msg.sender, shares);
+        IERC20(token).safeTransfer(recipient, value);
+    }
+
+    function _shareValue(uint256 shares) internal view returns (uint256) {
+        if (_totalSupply == 0) {
+            return shares;
+        }
+        return shares.mul(totalAssets()).div(_totalSupply);
+    }
+}
@@ -0,0 +1,347 @@
+"""
+Python port of `AaveLenderBorrowerLib` for off-chain scenario evaluation.
+
+Every function reproduces the Solidity integer arithmetic bit for bit,
+including WadRayMath's half-up rounding and the conditions under which
+SafeMath/WadRayMath revert. Inputs may be Python ints or NumPy arrays; arrays
+are evaluated element-wise in a single call and broadcast against each other.
+Values are kept as Python ints inside object arrays, so nothing is truncated to
+64 bits.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+UINT256_MAX = 2 ** 256 - 1
+RAY = 10 ** 27
+HALF_RAY = RAY // 2
+MAX_BPS = 10_000
+
+
+class Revert(ArithmeticError):
+    """The Solidity code would have reverted for these inputs."""
+
+
+class MaxDebt(NamedTuple):
+    current_protocol_debt: np.ndarray
+    max_protocol_debt: np.ndarray
+    target_utilisation: np.ndarray
+    # True where the on-chain call reverts; the other fields are 0 there
+    reverted: np.ndarray
+
+
+def _uint(*values):
+    # python ints in object arrays of a common shape (at least 1-d, so results
+    # never decay to plain ints or bools)
+    return np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(value, dtype=object)) for value in values)
+    )
+
+
+def _safe(value, ok):
+    # replace operands of reverted lanes so later steps cannot raise
+    return np.where(ok, np.asarray(value, dtype=object), 1)
+
+
+# ----------------- SAFEMATH / WADRAYMATH -----------------
+# each helper returns (result, ok) where ok is False for lanes that revert
+
+
+def add(a, b):
+    result = a + b
+    return result, result <= UINT256_MAX
+
+
+def sub(a, b):
+    return np.where(b <= a, a - b, 0), b <= a
+
+
+def mul(a, b):
+    result = a * b
+    return result, result <= UINT256_MAX
+
+
+def div(a, b):
+    ok = b != 0
+    return a // _safe(b, ok), ok
+
+
+def ray_mul(a, b):
+    zero = (a == 0) | (b == 0)
+    ok = zero | (a <= (UINT256_MAX - HALF_RAY) // _safe(b, ~zero))
+    return np.where(zero, 0, (a * b + HALF_RAY) // RAY), ok
+
+
+def ray_div(a, b):
+    nonzero = b != 0
+    safe_b = _safe(b, nonzero)
+    half_b = safe_b // 2
+    ok = nonzero & (a <= (UINT256_MAX - half_b) // RAY)
+    return (a * RAY + half_b) // safe_b, ok
+
+
+def to_eth(amount, price, decimals):
+    """`AaveLenderBorrowerLib.toETH` with the oracle price given explicitly."""
+    value, ok = mul(amount, price)
+    return value // 10 ** decimals, ok
+
+
+def from_eth(amount, price, decimals):
+    """`AaveLenderBorrowerLib.fromETH` with the oracle price given explicitly."""
+    value, ok_mul = mul(amount, 10 ** decimals)
+    value, ok_div = div(value, price)
+    return value, ok_mul & ok_div
+
+
+# ----------------- LIBRARY FUNCTIONS -----------------
+
+
+def calc_max_debt_batch(
+    available_liquidity,
+    total_stable_debt,
+    total_variable_debt,
+    optimal_rate,
+    base_rate,
+    slope1,
+    slope2,
+    acceptable_costs_ray,
+    price=None,
+    decimals=None,
+):
+    """
+    Vectorized `AaveLenderBorrowerLib.calcMaxDebt`.
+
+    Takes the reserve data and interest rate strategy parameters the library
+    reads on-chain. Debts are returned in ETH when `price` (oracle price of the
+    investment token) and `decimals` are given, like the library does, and in
+    investment token units otherwise. Results are arrays of python ints of the
+    broadcast shape of the inputs (at least 1-d).
+    """
+    (
+        available_liquidity,
+        total_stable_debt,
+        total_variable_debt,
+        optimal_rate,
+        base_rate,
+        slope1,
+        slope2,
+        acceptable_costs_ray,
+    ) = _uint(
+        available_liquidity,
+        total_stable_debt,
+        total_variable_debt,
+        optimal_rate,
+        base_rate,
+        slope1,
+        slope2,
+        acceptable_costs_ray,
+    )
+
+    total_debt, ok = add(total_stable_debt, total_variable_debt)
+    total_liquidity, ok_ = add(available_liquidity, total_debt)
+    ok = ok & ok_
+
+    no_debt = total_debt == 0
+    utilization, ok_ = ray_div(total_debt, _safe(total_liquidity, ~no_debt))
+    utilization = np.where(no_debt, 0, utilization)
+    ok = ok & (no_debt | ok_)
+
+    base_plus_slope1, ok_ = add(base_rate, slope1)
+    ok = ok & ok_
+    below_first_kink = acceptable_costs_ray < base_plus_slope1
+    below_optimal = (utilization < optimal_rate) & below_first_kink
+    # above optimal utilization but asking for less than base + slope1
+    no_debt_acceptable = ~below_optimal & below_first_kink
+
+    # IR = BASERATE + SLOPE1 * U / OPTIMAL
+    target_low, ok_low = sub(acceptable_costs_ray, base_rate)
+    target_low, ok_ = ray_mul(target_low, optimal_rate)
+    ok_low = ok_low & ok_
+    target_low, ok_ = ray_div(target_low, slope1)
+    ok_low = ok_low & ok_
+
+    # IR = BASERATE + SLOPE1 + SLOPE2 * (U - OPTIMAL) / (1 - OPTIMAL)
+    target_high, ok_high = sub(acceptable_costs_ray, base_plus_slope1)
+    excess_rate, ok_ = sub(RAY, optimal_rate)
+    ok_high = ok_high & ok_
+    target_high, ok_ = ray_mul(target_high, excess_rate)
+    ok_high = ok_high & ok_
+    target_high, ok_ = ray_div(target_high, slope2)
+    ok_high = ok_high & ok_
+    target_high, ok_ = add(target_high, optimal_rate)
+    ok_high = ok_high & ok_
+
+    target_utilisation = np.where(below_optimal, target_low, target_high)
+    ok = ok & np.where(
+        below_optimal, ok_low, np.where(no_debt_acceptable, True, ok_high)
+    )
+
+    max_protocol_debt, ok_max = ray_mul(total_liquidity, target_utilisation)
+    max_protocol_debt, ok_ = ray_div(max_protocol_debt, RAY)
+    ok_max = ok_max & ok_
+
+    current_protocol_debt = total_debt
+    if price is not None:
+        current_protocol_debt, ok_ = to_eth(total_debt, price, decimals)
+        ok = ok & ok_
+        max_protocol_debt, ok_ = to_eth(max_protocol_debt, price, decimals)
+        ok_max = ok_max & ok_
+
+    ok = ok & (no_debt_acceptable | ok_max)
+    max_protocol_debt = np.where(no_debt_acceptable, 0, max_protocol_debt)
+    target_utilisation = np.where(no_debt_acceptable, 0, target_utilisation)
+
+    return MaxDebt(
+        np.where(ok, current_protocol_debt, 0),
+        np.where(ok, max_protocol_debt, 0),
+        np.where(ok, target_utilisation, 0),
+        ~ok,
+    )
+
+
+def calc_max_debt(*args, **kwargs):
+    """
+    Scalar `calcMaxDebt`, same arguments as `calc_max_debt_batch`.
+
+    Returns (currentProtocolDebt, maxProtocolDebt, targetUtilisation) as ints
+    and raises `Revert` where the library call would revert.
+    """
+    result = calc_max_debt_batch(*args, **kwargs)
+    if result.reverted.any():
+        raise Revert("calcMaxDebt")
+    return (
+        result.current_protocol_debt.item(),
+        result.max_protocol_debt.item(),
+        result.target_utilisation.item(),
+    )
+
+
+def _scalar(result, name):
+    # (result, ok) of a helper applied to ints, raising where it reverts
+    value, ok = result
+    if not np.all(ok):
+        raise Revert(name)
+    return np.asarray(value).item()
+
+
+def calculate_amount_to_repay(
+    amount_eth,
+    total_collateral_eth,
+    total_debt_eth,
+    warning_ltv,
+    target_ltv,
+    min_threshold,
+    price,
+    decimals,
+):
+    """
+    `AaveLenderBorrowerLib.calculateAmountToRepay`, scalar.
+
+    `price` and `decimals` are the investment token's oracle price and decimals.
+    Returns the investment token to repay so withdrawing `amount_eth` of
+    collateral leaves the position at target LTV. Raises `Revert` where the
+    library call reverts.
+    """
+    if amount_eth == 0:
+        return 0
+    new_collateral = (
+        total_collateral_eth - amount_eth if total_collateral_eth > amount_eth else 0
+    )
+    if new_collateral > 0:
+        if total_debt_eth * MAX_BPS > UINT256_MAX:
+            raise Revert("calculateAmountToRepay")
+        ltv_after_withdrawal = total_debt_eth * MAX_BPS // new_collateral
+    else:
+        ltv_after_withdrawal = UINT256_MAX
+
+    if ltv_after_withdrawal <= warning_ltv:
+        return 0
+    elif ltv_after_withdrawal == UINT256_MAX:
+        return _scalar(
+            from_eth(*_uint(total_debt_eth, price, decimals)), "calculateAmountToRepay"
+        )
+
+    if target_ltv * new_collateral > UINT256_MAX:
+        raise Revert("calculateAmountToRepay")
+    new_target_debt = target_ltv * new_collateral // MAX_BPS
+    if new_target_debt > total_debt_eth:
+        return 0
+    amount_to_repay_eth = total_debt_eth - new_target_debt
+    if amount_to_repay_eth < min_threshold:
+        amount_to_repay_eth = total_debt_eth
+    return _scalar(
+        from_eth(*_uint(amount_to_repay_eth, price, decimals)),
+        "calculateAmountToRepay",
+    )
+
+
+# what `shouldRebalance` asks for, before looking at the gas price
+NO_REBALANCE = 0
+REBALANCE = 1  # above warning LTV, regardless of the gas price
+REBALANCE_IF_GAS = 2  # take on more debt or repay expensive debt
+
+
+def rebalance_need(
+    current_protocol_debt,
+    max_protocol_debt,
+    target_ltv,
+    warning_ltv,
+    total_collateral_eth,
+    total_debt_eth,
+):
+    """
+    The part of `shouldRebalance` that does not depend on `basefee_global`.
+
+    Returns NO_REBALANCE, REBALANCE or REBALANCE_IF_GAS. Raises `Revert` where
+    the library call reverts.
+    """
+    if total_collateral_eth == 0 or total_debt_eth * MAX_BPS > UINT256_MAX:
+        raise Revert("shouldRebalance")
+    current_ltv = total_debt_eth * MAX_BPS // total_collateral_eth
+
+    # If we are in danger zone then repay debt regardless of the current gas price
+    if current_ltv > warning_ltv:
+        return REBALANCE
+
+    if (
+        current_ltv < target_ltv
+        and current_protocol_debt < max_protocol_debt
+        and target_ltv - current_ltv > 1000
+    ) or current_protocol_debt > max_protocol_debt:
+        return REBALANCE_IF_GAS
+
+    return NO_REBALANCE
+
+
+def gas_allows_rebalance(need, base_fee, max_gas_price_to_tend):
+    """Final step of `shouldRebalance`, given the result of `rebalance_need`."""
+    if need == REBALANCE_IF_GAS:
+        return base_fee <= max_gas_price_to_tend
+    return need == REBALANCE
+
+
+def should_rebalance(
+    current_protocol_debt,
+    max_protocol_debt,
+    target_ltv,
+    warning_ltv,
+    total_collateral_eth,
+    total_debt_eth,
+    base_fee,
+    max_gas_price_to_tend,
+):
+    """
+    `AaveLenderBorrowerLib.shouldRebalance`.
+
+    Takes the result of `calc_max_debt` and `basefee_global` in place of the
+    reads the library makes. Raises `Revert` where the library call reverts.
+    """
+    need = rebalance_need(
+        current_protocol_debt,
+        max_protocol_debt,
+        target_ltv,
+        warning_ltv,
+        total_collateral_eth,
+        total_debt_eth,
+    )
+    return gas_allows_rebalance(need, base_fee, max_gas_price_to_tend)
@@ -0,0 +1,336 @@
+"""
+Replay strategy configurations against recorded market data.
+
+Block data is streamed from CSV or Parquet files (one row per block, the
+columns of `strategy_model.Block`, integers as on-chain) through generators, so
+a year of blocks never sits in memory. Every configuration is stepped through
+the same pass over the data: interest accrues between rows at the recorded
+rates, Aave liquidates unhealthy positions, and a keeper tends whenever
+`tendTrigger` is true, paying `tend_gas` at the block's base fee. `calcMaxDebt`
+only depends on the market, so it is evaluated vectorized for chunks of rows and
+every acceptable cost in use.
+
+Rows are the blocks a keeper looks at: `sample` keeps one every N blocks, and
+since interest accrues over timestamps, a sampled history gives the same
+balances at a fraction of the work.
+
+    python -m scripts.backtest blocks-2021-*.parquet \\
+        --params 6000,8000,1e27,60e9 --params 5000,7000,5e25,60e9
+"""
+import argparse
+import csv
+from decimal import Decimal
+from itertools import chain, islice
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from scripts.aave_lender_borrower_lib import MAX_BPS, calc_max_debt_batch
+from scripts.strategy_model import Block, Market, Position, StrategyParams, from_eth
+
+COLUMNS = Block._fields
+
+# gas used by a tend that borrows or repays
+TEND_GAS = 1_000_000
+
+
+# ----------------- DATA PIPELINE -----------------
+
+
+def read_csv(path):
+    """Blocks from a CSV file with a header row naming the `Block` columns."""
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            yield Block(*(int(row[column]) for column in COLUMNS))
+
+
+def read_parquet(path, batch_size=65_536):
+    """Blocks from a Parquet file, read `batch_size` rows at a time."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("reading Parquet files needs `pyarrow` installed")
+
+    for batch in pq.ParquetFile(path).iter_batches(
+        batch_size=batch_size, columns=list(COLUMNS)
+    ):
+        # uint256 values do not fit int64, they may be stored as strings
+        columns = [batch.column(column).to_pylist() for column in COLUMNS]
+        for values in zip(*columns):
+            yield Block(*(int(value) for value in values))
+
+
+def read_blocks(*paths):
+    """Blocks from each file in turn, by extension."""
+    readers = {".csv": read_csv, ".parquet": read_parquet}
+    return chain.from_iterable(readers[Path(path).suffix](path) for path in paths)
+
+
+def sample(blocks, every):
+    """One block out of every `every`, e.g. how often a keeper checks."""
+    return islice(blocks, 0, None, every)
+
+
+def between(blocks, start=0, end=None):
+    """Blocks with `start <= block_number < end`."""
+    for block in blocks:
+        if block.block_number < start:
+            continue
+        if end is not None and block.block_number >= end:
+            return
+        yield block
+
+
+# ----------------- ENGINE -----------------
+
+
+class BacktestResult(NamedTuple):
+    params: StrategyParams
+    # in want
+    capital: int
+    final_assets: int
+    # withdrawn by the vault along the way
+    withdrawn: int
+    # final assets + withdrawn - capital - gas spent tending
+    pnl: int
+    borrow_cost: int
+    liquidation_loss: int
+    withdrawal_loss: int
+    gas_spent_want: int
+    # in ETH (wei)
+    gas_spent: int
+    tends: int
+    liquidations: int
+    # highest LTV the position reached, in bps
+    max_ltv: int
+    blocks: int
+
+
+class _Run:
+    def __init__(self, params, market, capital):
+        self.position = Position(params, market, want=capital)
+        self.borrow_cost = 0
+        self.liquidation_loss = 0
+        self.withdrawn = 0
+        self.withdrawal_loss = 0
+        self.gas_spent = 0
+        self.gas_spent_want = 0
+        self.tends = 0
+        self.liquidations = 0
+        self.max_ltv = 0
+
+
+class Backtest:
+    def __init__(
+        self,
+        params,
+        market=Market(),
+        capital=None,
+        tend_gas=TEND_GAS,
+        chunk_size=4_096,
+        withdraw_every=None,
+        withdraw_bps=0,
+    ):
+        self.params = list(params)
+        self.market = market
+        self.capital = (
+            capital if capital is not None else 1_000_000 * 10 ** market.want_decimals
+        )
+        self.tend_gas = tend_gas
+        # blocks read ahead to evaluate calcMaxDebt for all of them at once
+        self.chunk_size = chunk_size
+        # the vault withdraws `withdraw_bps` of the strategy's assets every
+        # `withdraw_every` rows, through liquidatePosition
+        self.withdraw_every = withdraw_every
+        self.withdraw_bps = withdraw_bps
+
+    def run(self, blocks):
+        """Step every configuration through `blocks`, one `BacktestResult` each."""
+        runs = [_Run(params, self.market, self.capital) for params in self.params]
+        acceptable_costs = sorted(
+            {params.acceptable_costs_ray for params in self.params}
+        )
+        column = {acceptable: i for i, acceptable in enumerate(acceptable_costs)}
+        previous = None
+        count = 0
+
+        for chunk in _chunks(blocks, self.chunk_size):
+            max_debts = self._max_debts(chunk, acceptable_costs)
+            for block, row in zip(chunk, max_debts):
+                count += 1
+                for run in runs:
+                    position = run.position
+                    max_debt = row[column[position.params.acceptable_costs_ray]]
+                    if previous is None:
+                        # first harvest deposits the capital and takes on debt
+                        if max_debt is not None:
+                            position.adjust_position(block, max_debt)
+                        continue
+                    self._step(run, block, previous, max_debt)
+                    if self.withdraw_every and count % self.withdraw_every == 0:
+                        self._withdraw(run, block)
+                previous = block
+
+        results = []
+        for run in runs:
+            final_assets = 0
+            if previous is not None:
+                # unwind the whole position like liquidateAllPositions does
+                position = run.position
+                final_assets, _ = position.liquidate_position(
+                    position.estimated_total_assets(previous), previous
+                )
+            results.append(
+                BacktestResult(
+                    run.position.params,
+                    self.capital,
+                    final_assets,
+                    run.withdrawn,
+                    final_assets + run.withdrawn - self.capital - run.gas_spent_want,
+                    run.borrow_cost,
+                    run.liquidation_loss,
+                    run.withdrawal_loss,
+                    run.gas_spent_want,
+                    run.gas_spent,
+                    run.tends,
+                    run.liquidations,
+                    run.max_ltv,
+                    count,
+                )
+            )
+        return results
+
+    def _step(self, run, block, previous, max_debt):
+        position = run.position
+        accrued = position.accrue(block, block.timestamp - previous.timestamp)
+        run.borrow_cost += position.investment_token_to_want(accrued, block)
+        seized = position.liquidate_if_unhealthy(block)
+        if seized:
+            run.liquidations += 1
+            run.liquidation_loss += seized
+
+        if max_debt is not None and position.should_rebalance(block, max_debt):
+            position.adjust_position(block, max_debt)
+            gas = self.tend_gas * block.base_fee
+            run.tends += 1
+            run.gas_spent += gas
+            run.gas_spent_want += from_eth(
+                gas, block.want_price, self.market.want_decimals
+            )
+
+        collateral_eth, debt_eth, _ = position.account_data(block)
+        if collateral_eth > 0:
+            run.max_ltv = max(run.max_ltv, debt_eth * MAX_BPS // collateral_eth)
+
+    def _withdraw(self, run, block):
+        position = run.position
+        amount = position.estimated_total_assets(block) * self.withdraw_bps // MAX_BPS
+        liquidated, loss = position.liquidate_position(amount, block)
+        position.want -= liquidated
+        run.withdrawn += liquidated
+        run.withdrawal_loss += loss
+
+    def _max_debts(self, chunk, acceptable_costs):
+        # calcMaxDebt for every block of the chunk (rows) and acceptable cost
+        # (columns) in one vectorized call, None where it reverts
+        def reserve(field):
+            return np.array(
+                [getattr(block, field) for block in chunk], dtype=object
+            ).reshape(-1, 1)
+
+        result = calc_max_debt_batch(
+            reserve("available_liquidity"),
+            reserve("total_stable_debt"),
+            reserve("total_variable_debt"),
+            reserve("optimal_rate"),
+            reserve("base_rate"),
+            reserve("slope1"),
+            reserve("slope2"),
+            np.array(acceptable_costs, dtype=object).reshape(1, -1),
+            price=reserve("investment_token_price"),
+            decimals=self.market.investment_token_decimals,
+        )
+        current, maximum, target, reverted = (field.tolist() for field in result)
+        return [
+            [None if r else (c, m, t) for c, m, t, r in zip(*row)]
+            for row in zip(current, maximum, target, reverted)
+        ]
+
+
+def _chunks(blocks, size):
+    blocks = iter(blocks)
+    while True:
+        chunk = list(islice(blocks, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def backtest(blocks, params, **kwargs):
+    """`Backtest(params, **kwargs).run(blocks)`."""
+    return Backtest(params, **kwargs).run(blocks)
+
+
+# ----------------- CLI -----------------
+
+
+def _int(value):
+    # accepts 1e27, 60e9...
+    return int(Decimal(value))
+
+
+def _params(value):
+    target, warning, acceptable_costs, max_gas_price = value.split(",")
+    return StrategyParams(
+        target_ltv_multiplier=_int(target),
+        warning_ltv_multiplier=_int(warning),
+        acceptable_costs_ray=_int(acceptable_costs),
+        max_gas_price_to_tend=_int(max_gas_price),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("paths", nargs="+", help="CSV or Parquet block data")
+    parser.add_argument(
+        "--params",
+        type=_params,
+        action="append",
+        required=True,
+        help="target LTV multiplier,warning LTV multiplier,acceptable costs "
+        "(ray),max gas price to tend (wei)",
+    )
+    parser.add_argument("--capital", type=_int, help="want deposited, in wei")
+    parser.add_argument("--every", type=int, default=1, help="blocks between rows")
+    parser.add_argument("--tend-gas", type=int, default=TEND_GAS)
+    for field, default in Market._field_defaults.items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=int, default=default)
+    args = parser.parse_args(argv)
+
+    market = Market(*(getattr(args, field) for field in Market._fields))
+    results = backtest(
+        sample(read_blocks(*args.paths), args.every),
+        args.params,
+        market=market,
+        capital=args.capital,
+        tend_gas=args.tend_gas,
+    )
+    unit = 10 ** market.want_decimals
+    for result in results:
+        params = result.params
+        print(
+            f"target {params.target_ltv_multiplier} "
+            f"warning {params.warning_ltv_multiplier} "
+            f"costs {params.acceptable_costs_ray / 1e27:.2%} "
+            f"gas {params.max_gas_price_to_tend / 1e9:g} gwei: "
+            f"pnl {result.pnl / unit:,.2f} "
+            f"borrow cost {result.borrow_cost / unit:,.2f} "
+            f"tends {result.tends} "
+            f"gas {result.gas_spent / 1e18:,.4f} ETH "
+            f"liquidations {result.liquidations}"
+        )
+
+
+if __name__ == "__main__":
+    main()
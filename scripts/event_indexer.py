@@ -0,0 +1,347 @@
+"""
+Index the events of a cloner's strategies into SQLite, so their history can be
+queried without scanning the chain again.
+
+Indexed events:
+
+- `Deployed` and `Cloned` from the `AaveLenderBorrowerCloner`,
+- `Harvested`, `RepayDebt` and the decision events (`Borrowed`, `Repaid`,
+  `Held`, `Unwound`, `FlashLoanUnwound`, `FlashLoanFailed`, `SoldAave`,
+  `StartedCooldown`) from the original strategy and every clone,
+- `StrategyReported` from their vaults, for those strategies only.
+
+Logs are pulled in block ranges that shrink when the node refuses a range or
+returns too many logs, and grow again when it answers with few. Every range is
+written in one SQLite transaction together with the checkpoint, so a stopped
+indexer resumes where it stopped. The hashes of the last `MAX_REORG_DEPTH`
+blocks before the head are kept, however large the range that indexed them,
+and the hash of the last block of every range. Before a sync the newest kept hashes are compared with the chain; after
+a reorg, everything from the first block that changed is deleted and indexed
+again. Events are stored with their arguments as JSON and indexed on
+(strategy, block) and (event, block):
+
+    brownie run event_indexer main <cloner> events.db --network mainnet
+"""
+import json
+import sqlite3
+from typing import NamedTuple
+
+from brownie import AaveLenderBorrowerCloner, Strategy, web3
+from requests.exceptions import RequestException
+
+# blocks asked per eth_getLogs, adjusted to what the node accepts
+INITIAL_CHUNK = 2_000
+MAX_CHUNK = 100_000
+# above it, the next range is halved
+TARGET_LOGS = 2_000
+# how deep a reorg can go, older block hashes are forgotten
+MAX_REORG_DEPTH = 128
+
+VAULT_EVENTS_ABI = [
+    {
+        "name": "StrategyReported",
+        "type": "event",
+        "anonymous": False,
+        "inputs": [
+            {"name": "strategy", "type": "address", "indexed": True},
+            {"name": "gain", "type": "uint256", "indexed": False},
+            {"name": "loss", "type": "uint256", "indexed": False},
+            {"name": "debtPaid", "type": "uint256", "indexed": False},
+            {"name": "totalGain", "type": "uint256", "indexed": False},
+            {"name": "totalLoss", "type": "uint256", "indexed": False},
+            {"name": "totalDebt", "type": "uint256", "indexed": False},
+            {"name": "debtAdded", "type": "uint256", "indexed": False},
+            {"name": "debtRatio", "type": "uint256", "indexed": False},
+        ],
+    }
+]
+
+CLONER_EVENTS = ("Deployed", "Cloned")
+STRATEGY_EVENTS = (
+    "Harvested",
+    "RepayDebt",
+    "Borrowed",
+    "Repaid",
+    "Held",
+    "Unwound",
+    "FlashLoanUnwound",
+    "FlashLoanFailed",
+    "SoldAave",
+    "StartedCooldown",
+)
+VAULT_EVENTS = ("StrategyReported",)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    transaction_hash TEXT NOT NULL,
+    address TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    event TEXT NOT NULL,
+    args TEXT NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_strategy ON events (strategy, block_number);
+CREATE INDEX IF NOT EXISTS events_event ON events (event, block_number);
+CREATE TABLE IF NOT EXISTS contracts (
+    address TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    block_number INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    number INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoint (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    cloner TEXT NOT NULL,
+    next_block INTEGER NOT NULL
+);
+"""
+
+
+class ReorgTooDeep(Exception):
+    pass
+
+
+class Event(NamedTuple):
+    block_number: int
+    log_index: int
+    transaction_hash: str
+    address: str
+    strategy: str
+    event: str
+    args: dict
+
+
+def _event_abis(abi, names):
+    return [
+        entry for entry in abi if entry["type"] == "event" and entry["name"] in names
+    ]
+
+
+class EventIndexer:
+    def __init__(
+        self,
+        path,
+        cloner,
+        from_block=0,
+        confirmations=0,
+        chunk_size=INITIAL_CHUNK,
+        max_chunk=MAX_CHUNK,
+    ):
+        self.cloner = AaveLenderBorrowerCloner.at(cloner)
+        self.confirmations = confirmations
+        self.chunk_size = chunk_size
+        self.max_chunk = max_chunk
+
+        abi = (
+            _event_abis(AaveLenderBorrowerCloner.abi, CLONER_EVENTS)
+            + _event_abis(Strategy.abi, STRATEGY_EVENTS)
+            + VAULT_EVENTS_ABI
+        )
+        self._events = web3.eth.contract(abi=abi).events
+        self._topics = {
+            web3.keccak(
+                text=f"{entry['name']}({','.join(i['type'] for i in entry['inputs'])})"
+            ).hex(): entry["name"]
+            for entry in abi
+        }
+
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        row = self.db.execute("SELECT cloner, next_block FROM checkpoint").fetchone()
+        if row is None:
+            original = Strategy.at(self.cloner.original())
+            with self.db:
+                self.db.execute(
+                    "INSERT INTO checkpoint VALUES (0, ?, ?)",
+                    (self.cloner.address, from_block),
+                )
+                # known before `from_block`, never rolled back
+                self.db.executemany(
+                    "INSERT INTO contracts VALUES (?, ?, -1)",
+                    [(original.address, "strategy"), (original.vault(), "vault")],
+                )
+        elif row[0] != self.cloner.address:
+            raise ValueError(f"{path} indexes the cloner {row[0]}")
+
+    @property
+    def next_block(self):
+        return self.db.execute("SELECT next_block FROM checkpoint").fetchone()[0]
+
+    def contracts(self, kind):
+        rows = self.db.execute(
+            "SELECT address FROM contracts WHERE kind = ? ORDER BY rowid", (kind,)
+        )
+        return [address for address, in rows]
+
+    def sync(self, to_block=None):
+        """Index up to `to_block` (the head less `confirmations` by default)."""
+        self._rollback_reorg()
+        head = web3.eth.block_number
+        if to_block is None:
+            to_block = head - self.confirmations
+
+        start = self.next_block
+        while start <= to_block:
+            end = min(start + self.chunk_size - 1, to_block)
+            try:
+                count = self._index_range(start, end, head)
+            except (ValueError, RequestException):
+                # range too large for the node, or too slow to answer
+                if end == start:
+                    raise
+                self.chunk_size = max(1, (end - start + 1) // 2)
+                continue
+
+            if count > TARGET_LOGS:
+                self.chunk_size = max(1, self.chunk_size // 2)
+            elif count < TARGET_LOGS // 4:
+                self.chunk_size = min(self.max_chunk, self.chunk_size * 2)
+            start = end + 1
+
+    def _get_logs(self, addresses, names, start, end):
+        if not addresses:
+            return []
+        topics = [topic for topic, name in self._topics.items() if name in names]
+        return web3.eth.get_logs(
+            {
+                "fromBlock": start,
+                "toBlock": end,
+                "address": addresses,
+                "topics": [topics],
+            }
+        )
+
+    def _decode(self, log):
+        name = self._topics[log["topics"][0].hex()]
+        event = self._events[name]().processLog(log)
+        # bytes arguments (the revert data of FlashLoanFailed) are kept as hex
+        args = {
+            key: "0x" + bytes(value).hex() if isinstance(value, bytes) else value
+            for key, value in event.args.items()
+        }
+        if name == "Deployed":
+            strategy = args["original"]
+        elif name == "Cloned":
+            strategy = args["clone"]
+        elif name == "StrategyReported":
+            strategy = args["strategy"]
+        else:
+            strategy = log["address"]
+        return Event(
+            log["blockNumber"],
+            log["logIndex"],
+            log["transactionHash"].hex(),
+            log["address"],
+            strategy,
+            name,
+            args,
+        )
+
+    def _index_range(self, start, end, head):
+        # strategies first, so the logs of a clone made in the range are found
+        found = [
+            self._decode(log)
+            for log in self._get_logs([self.cloner.address], CLONER_EVENTS, start, end)
+        ]
+        strategies = self.contracts("strategy")
+        vaults = self.contracts("vault")
+        new_contracts = []
+        for event in found:
+            if event.strategy not in strategies:
+                strategies.append(event.strategy)
+                new_contracts.append((event.strategy, "strategy", event.block_number))
+                vault = Strategy.at(event.strategy).vault()
+                if vault not in vaults:
+                    vaults.append(vault)
+                    new_contracts.append((vault, "vault", event.block_number))
+
+        for log in self._get_logs(strategies, STRATEGY_EVENTS, start, end):
+            found.append(self._decode(log))
+        for log in self._get_logs(vaults, VAULT_EVENTS, start, end):
+            event = self._decode(log)
+            # vaults report for strategies of other kinds too
+            if event.strategy in strategies:
+                found.append(event)
+
+        # blocks that can still be reorged, a range near the head can end
+        # anywhere in them
+        hashes = [
+            (number, web3.eth.get_block(number)["hash"].hex())
+            for number in range(max(start, head - MAX_REORG_DEPTH + 1), end)
+        ]
+        hashes.append((end, web3.eth.get_block(end)["hash"].hex()))
+        with self.db:
+            self.db.executemany("INSERT INTO contracts VALUES (?, ?, ?)", new_contracts)
+            self.db.executemany(
+                "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [event[:-1] + (json.dumps(event.args),) for event in found],
+            )
+            self.db.executemany("INSERT OR REPLACE INTO blocks VALUES (?, ?)", hashes)
+            self.db.execute(
+                "DELETE FROM blocks WHERE number < ?", (end - MAX_REORG_DEPTH,)
+            )
+            self.db.execute("UPDATE checkpoint SET next_block = ?", (end + 1,))
+        return len(found)
+
+    def _rollback_reorg(self):
+        head = web3.eth.block_number
+        kept = self.db.execute(
+            "SELECT number, hash FROM blocks ORDER BY number DESC"
+        ).fetchall()
+        for i, (number, block_hash) in enumerate(kept):
+            if (
+                number <= head
+                and web3.eth.get_block(number)["hash"].hex() == block_hash
+            ):
+                break
+        else:
+            if kept:
+                raise ReorgTooDeep(
+                    f"none of the last {MAX_REORG_DEPTH} indexed blocks is on the "
+                    "chain anymore, delete the database to index from scratch"
+                )
+            return
+        if i == 0:
+            return
+
+        # the newest indexed block still on the chain, everything after it is
+        # indexed again
+        start = number + 1
+        with self.db:
+            for table, column in (
+                ("events", "block_number"),
+                ("contracts", "block_number"),
+                ("blocks", "number"),
+            ):
+                self.db.execute(f"DELETE FROM {table} WHERE {column} >= ?", (start,))
+            self.db.execute("UPDATE checkpoint SET next_block = ?", (start,))
+
+    def events(self, strategy=None, event=None, from_block=0, to_block=None):
+        """Indexed events, oldest first, filtered on any of the arguments."""
+        query = "SELECT * FROM events WHERE block_number >= ?"
+        params = [from_block]
+        if to_block is not None:
+            query += " AND block_number <= ?"
+            params.append(to_block)
+        if strategy is not None:
+            query += " AND strategy = ?"
+            params.append(str(strategy))
+        if event is not None:
+            query += " AND event = ?"
+            params.append(event)
+        rows = self.db.execute(query + " ORDER BY block_number, log_index", params)
+        return [Event(*row[:-1], json.loads(row[-1])) for row in rows]
+
+    def close(self):
+        self.db.close()
+
+
+def main(cloner, path="events.db"):
+    indexer = EventIndexer(path, cloner)
+    indexer.sync()
+    for event in indexer.events():
+        print(f"{event.block_number} {event.strategy} {event.event} {event.args}")
@@ -0,0 +1,124 @@
+"""
+Evaluate `tendTrigger` and `harvestTrigger` for every strategy deployed by an
+`AaveLenderBorrowerCloner`.
+
+Clones are discovered from the cloner's `Cloned` events, read from the block
+the cloner was deployed at. Strategies are split in chunks that are evaluated
+concurrently by a pool of `concurrency` worker threads. The threads share
+brownie's web3 provider: the pool bounds the requests in flight, not the
+connections the provider opens. Each chunk costs two round trips: a
+`Snapshotter` multicall, where reads shared by strategies with the same
+investment token (reserve data, interest rate strategy, prices) are made once
+and from which `tendTrigger` is evaluated off-chain, and a multicall of the
+strategies' `harvestTrigger`.
+
+    brownie run keeper_scan main <cloner> <deployment block> --network mainnet
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+from brownie import AaveLenderBorrowerCloner, multicall, web3
+
+from scripts.aave_lender_borrower_lib import Revert
+from scripts.strategy_snapshot import Snapshotter
+
+# gas used by a harvest, to price the call in harvestTrigger
+HARVEST_GAS = 1_500_000
+
+
+class TriggerResult(NamedTuple):
+    strategy: str
+    investment_token: str
+    tend: Optional[bool]
+    harvest: Optional[bool]
+    # set when a trigger could not be evaluated (the call reverts)
+    error: Optional[str]
+
+
+class FleetScanner:
+    def __init__(
+        self, cloner, from_block, concurrency=8, chunk_size=50, harvest_gas=HARVEST_GAS,
+    ):
+        self.cloner = AaveLenderBorrowerCloner.at(cloner)
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.harvest_gas = harvest_gas
+        self.snapshotter = Snapshotter()
+        self._strategies = [self.cloner.original()]
+        self._next_block = from_block
+
+    def strategies(self):
+        """The original strategy and every clone, picking up new `Cloned` events."""
+        head = web3.eth.block_number
+        if head >= self._next_block:
+            events = self.cloner.events.get_sequence(
+                self._next_block, head, event_type="Cloned"
+            )
+            self._strategies += [event.args.clone for event in events]
+            self._next_block = head + 1
+        return list(self._strategies)
+
+    async def scan(self, block=None):
+        """Evaluate both triggers for every strategy, all at the same block."""
+        strategies = self.strategies()
+        if block is None:
+            block = web3.eth.block_number
+
+        chunks = [
+            strategies[i : i + self.chunk_size]
+            for i in range(0, len(strategies), self.chunk_size)
+        ]
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            results = await asyncio.gather(
+                *(
+                    loop.run_in_executor(pool, self._scan_chunk, chunk, block)
+                    for chunk in chunks
+                )
+            )
+        return [result for chunk in results for result in chunk]
+
+    def _scan_chunk(self, strategies, block):
+        snapshots = self.snapshotter.snapshot_many(strategies, block)
+
+        with multicall(block_identifier=block):
+            harvest = []
+            for snapshot in snapshots:
+                address = snapshot.markets.strategy
+                strategy = self.snapshotter.contract("Strategy", address)
+                call_cost = self.harvest_gas * snapshot.base_fee
+                harvest.append(strategy.harvestTrigger(call_cost))
+
+        results = []
+        for snapshot, harvest_trigger in zip(snapshots, harvest):
+            harvest_trigger = getattr(harvest_trigger, "__wrapped__", harvest_trigger)
+            errors = []
+            try:
+                tend_trigger = snapshot.tend_trigger()
+            except Revert:
+                tend_trigger = None
+                errors.append("tendTrigger reverted")
+            if harvest_trigger is None:
+                errors.append("harvestTrigger reverted")
+            results.append(
+                TriggerResult(
+                    snapshot.markets.strategy,
+                    snapshot.markets.investment_token,
+                    tend_trigger,
+                    harvest_trigger,
+                    ", ".join(errors) or None,
+                )
+            )
+        return results
+
+
+def main(cloner, from_block):
+    # no clone is older than the cloner, and scanning its `Cloned` events from
+    # block 0 would cover the whole chain
+    results = asyncio.run(FleetScanner(cloner, int(from_block)).scan())
+    for result in results:
+        print(
+            f"{result.strategy} tend={result.tend} harvest={result.harvest}"
+            + (f" ({result.error})" if result.error else "")
+        )
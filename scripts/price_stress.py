@@ -0,0 +1,269 @@
+"""
+Monte Carlo odds that price moves take a strategy past warning LTV, or to
+liquidation, before its next tend.
+
+Want and investment token prices (in ETH) follow correlated geometric Brownian
+motions, optionally with Student-t shocks for fat tails; the debt grows at the
+borrow rate. LTV is checked every `check_every` seconds, when a keeper looks at
+`tendTrigger`:
+
+- while LTV is under warning, the strategy is only tended once the base fee is
+  at most `maxGasPriceToTend`. Each check passes with the share of base fees in
+  recorded history under it, so the time to the next tend is geometric;
+- at or above warning LTV `tendTrigger` fires whatever the gas price, so a path
+  is only liquidated if LTV reaches the liquidation threshold by the first check
+  it is at or above warning (it jumped past warning between two checks).
+
+Paths are simulated in chunks of `chunk_size` as (paths, checks, 2) arrays, so
+memory does not grow with the number of paths; a million paths over a day of
+hourly checks takes a few seconds on one core.
+
+    python -m scripts.price_stress --collateral-eth 1000e18 --debt-eth 400e18 \\
+        --liquidation-threshold 8250 --warning-multiplier 8000 \\
+        --vol-want 0.9 --vol-investment 0.05 --correlation 0.1 \\
+        --max-gas-price 60e9 --base-fees blocks-2021-*.parquet --every 300
+"""
+import argparse
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from scripts.aave_lender_borrower_lib import MAX_BPS
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+
+class StressInputs(NamedTuple):
+    total_collateral_eth: int
+    total_debt_eth: int
+    # bps, getUserAccountData
+    current_liquidation_threshold: int
+    warning_ltv_multiplier: int
+    # share of keeper checks where the base fee allows a tend
+    tend_probability: float = 1.0
+
+    @classmethod
+    def from_snapshot(cls, snapshot, tend_probability=1.0):
+        return cls(
+            snapshot.total_collateral_eth,
+            snapshot.total_debt_eth,
+            snapshot.current_liquidation_threshold,
+            snapshot.warning_ltv_multiplier,
+            tend_probability,
+        )
+
+    @property
+    def ltv(self):
+        return self.total_debt_eth / self.total_collateral_eth
+
+    @property
+    def warning_ltv(self):
+        return (
+            self.current_liquidation_threshold
+            * self.warning_ltv_multiplier
+            / MAX_BPS ** 2
+        )
+
+    @property
+    def liquidation_ltv(self):
+        return self.current_liquidation_threshold / MAX_BPS
+
+
+class PriceModel(NamedTuple):
+    """Annualized volatilities and drifts of prices in ETH."""
+
+    vol_want: float
+    vol_investment_token: float
+    correlation: float = 0.0
+    drift_want: float = 0.0
+    drift_investment_token: float = 0.0
+    # annual variable borrow rate, debt compounds at it
+    borrow_rate: float = 0.0
+    # degrees of freedom of Student-t shocks, Gaussian if None
+    tail_df: Optional[float] = None
+
+
+class StressResult(NamedTuple):
+    paths: int
+    # LTV at or above warning at a check before the next tend
+    warning: float
+    # LTV at or above the liquidation threshold before a tend could bring it down
+    liquidation: float
+    # mean checks to the next tend, paths cut at `max_checks` count it
+    mean_checks_to_tend: float
+    # share of paths still waiting for a tend after `max_checks`
+    truncated: float
+
+    def stderr(self, p):
+        return (p * (1 - p) / self.paths) ** 0.5
+
+
+def tend_probability(base_fees, max_gas_price_to_tend):
+    """Share of `base_fees` at which `tendTrigger` lets a borrow or repay through."""
+    base_fees = np.fromiter(base_fees, dtype=float)
+    if base_fees.size == 0:
+        raise ValueError("no base fees to estimate the tend cadence from")
+    return float(np.mean(base_fees <= max_gas_price_to_tend))
+
+
+def _log_returns(rng, model, n, checks, dt):
+    shocks = rng.standard_normal((n, checks, 2))
+    if model.tail_df is not None:
+        df = model.tail_df
+        # one t scale per check for both tokens, variance back to 1
+        shocks *= np.sqrt((df - 2) / rng.chisquare(df, (n, checks, 1)))
+
+    correlation = model.correlation
+    want = shocks[..., 0]
+    investment_token = shocks[..., 1]
+    investment_token *= np.sqrt(1 - correlation ** 2)
+    investment_token += correlation * want
+
+    for shock, vol, drift in (
+        (want, model.vol_want, model.drift_want),
+        (investment_token, model.vol_investment_token, model.drift_investment_token),
+    ):
+        shock *= vol * np.sqrt(dt)
+        shock += (drift - vol ** 2 / 2) * dt
+    return want, investment_token
+
+
+def simulate(
+    inputs,
+    model,
+    check_every=3_600,
+    max_checks=24,
+    paths=1_000_000,
+    chunk_size=65_536,
+    seed=None,
+):
+    """Run `paths` price paths of up to `max_checks` keeper checks each."""
+    if inputs.total_collateral_eth == 0 or inputs.total_debt_eth == 0:
+        return StressResult(paths, 0.0, 0.0, 0.0, 0.0)
+    if not 0 < inputs.tend_probability <= 1:
+        raise ValueError("the base fee never allows a tend, LTV is never restored")
+
+    rng = np.random.default_rng(seed)
+    dt = check_every / SECONDS_PER_YEAR
+    log_warning = np.log(inputs.warning_ltv / inputs.ltv)
+    log_liquidation = np.log(inputs.liquidation_ltv / inputs.ltv)
+    checks_index = np.arange(max_checks)
+
+    warning = liquidation = truncated = 0
+    checks_to_tend = 0
+    done = 0
+    while done < paths:
+        n = min(chunk_size, paths - done)
+        want, investment_token = _log_returns(rng, model, n, max_checks, dt)
+        # log(LTV / LTV now) at every check
+        investment_token -= want
+        investment_token += model.borrow_rate * dt
+        log_ltv = np.cumsum(investment_token, axis=1)
+
+        # checks up to and including the one the strategy is tended at
+        horizon = rng.geometric(inputs.tend_probability, n)
+        waiting = checks_index < horizon[:, None]
+        at_warning = (log_ltv >= log_warning) & waiting
+        warned = at_warning.any(axis=1)
+        # tendTrigger fires at the first check at or above warning
+        first = at_warning.argmax(axis=1)
+        liquidated = warned & (log_ltv[np.arange(n), first] >= log_liquidation)
+
+        warning += int(warned.sum())
+        liquidation += int(liquidated.sum())
+        truncated += int((horizon > max_checks).sum())
+        checks_to_tend += int(np.minimum(horizon, max_checks).sum())
+        done += n
+
+    return StressResult(
+        paths,
+        warning / paths,
+        liquidation / paths,
+        checks_to_tend / paths,
+        truncated / paths,
+    )
+
+
+# ----------------- CLI -----------------
+
+
+def _int(value):
+    # accepts 1e27, 60e9...
+    return int(Decimal(value))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--collateral-eth", type=_int, required=True)
+    parser.add_argument("--debt-eth", type=_int, required=True)
+    parser.add_argument("--liquidation-threshold", type=int, required=True)
+    parser.add_argument("--warning-multiplier", type=int, default=8_000)
+    parser.add_argument("--vol-want", type=float, required=True, help="annualized")
+    parser.add_argument("--vol-investment", type=float, required=True)
+    parser.add_argument("--correlation", type=float, default=0.0)
+    parser.add_argument("--borrow-rate", type=float, default=0.0, help="annual")
+    parser.add_argument("--tail-df", type=float, help="Student-t shocks")
+    parser.add_argument("--max-gas-price", type=_int, help="maxGasPriceToTend")
+    parser.add_argument(
+        "--base-fees", nargs="*", default=[], help="CSV or Parquet block data"
+    )
+    parser.add_argument(
+        "--every", type=int, default=1, help="blocks between base fee samples"
+    )
+    parser.add_argument(
+        "--check-every", type=int, default=3_600, help="seconds between checks"
+    )
+    parser.add_argument("--max-checks", type=int, default=24)
+    parser.add_argument("--paths", type=_int, default=1_000_000)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    probability = 1.0
+    if args.max_gas_price is not None and args.base_fees:
+        from scripts.backtest import read_blocks, sample
+
+        blocks = sample(read_blocks(*args.base_fees), args.every)
+        probability = tend_probability(
+            (block.base_fee for block in blocks), args.max_gas_price
+        )
+
+    inputs = StressInputs(
+        args.collateral_eth,
+        args.debt_eth,
+        args.liquidation_threshold,
+        args.warning_multiplier,
+        probability,
+    )
+    model = PriceModel(
+        args.vol_want,
+        args.vol_investment,
+        args.correlation,
+        borrow_rate=args.borrow_rate,
+        tail_df=args.tail_df,
+    )
+    result = simulate(
+        inputs,
+        model,
+        check_every=args.check_every,
+        max_checks=args.max_checks,
+        paths=args.paths,
+        seed=args.seed,
+    )
+    print(
+        f"LTV {inputs.ltv:.2%} warning {inputs.warning_ltv:.2%} "
+        f"liquidation {inputs.liquidation_ltv:.2%}, "
+        f"tend allowed at {probability:.1%} of checks"
+    )
+    print(
+        f"{result.paths:,} paths: warning {result.warning:.4%} "
+        f"(±{result.stderr(result.warning):.4%}), "
+        f"liquidation {result.liquidation:.4%} "
+        f"(±{result.stderr(result.liquidation):.4%}), "
+        f"{result.mean_checks_to_tend:.1f} checks to the next tend, "
+        f"{result.truncated:.2%} still waiting after {args.max_checks}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Off-chain `AaveLenderBorrowerLib.shouldRebalance` with a reserve state cache.
+
+`shouldRebalance` reads the whole reserve and interest rate strategy through
+`calcMaxDebt` every time. Here the reserve state of each investment token is
+read once (one multicall) and reused for later blocks until the lending pool
+emits `ReserveDataUpdated` for that reserve, which every deposit, withdrawal,
+borrow, repay and liquidation does. Interest rate strategies are immutable, so
+their parameters are cached by address. Governance can move a reserve to
+another strategy without the pool emitting anything, so the reserve's strategy
+address is read again at every new block, and a new one re-reads the reserve.
+A decision is split into what it needs (`rebalance_need`) and the
+`basefee_global` gate, so between blocks a keeper can re-check the gas price
+alone with `recheck`.
+
+Between events the cached state ignores interest accrued on the reserve's
+debt and oracle price moves. Neither changes the decision except at the exact
+boundary (the price scales both sides of the protocol debt comparison alike);
+pass `max_age` to also re-read reserves after that many blocks.
+"""
+from typing import NamedTuple
+
+from brownie import interface, multicall, web3
+from eth_utils import to_checksum_address
+
+from scripts.aave_lender_borrower_lib import (
+    calc_max_debt,
+    gas_allows_rebalance,
+    rebalance_need,
+)
+from scripts.strategy_snapshot import BASE_FEE_PROVIDER, PROTOCOL_DATA_PROVIDER
+
+
+class ReserveState(NamedTuple):
+    block_number: int
+    available_liquidity: int
+    total_stable_debt: int
+    total_variable_debt: int
+    optimal_rate: int
+    base_rate: int
+    slope1: int
+    slope2: int
+    price: int
+    decimals: int
+    interest_rate_strategy: str
+
+    def calc_max_debt(self, acceptable_costs_ray):
+        return calc_max_debt(
+            self.available_liquidity,
+            self.total_stable_debt,
+            self.total_variable_debt,
+            self.optimal_rate,
+            self.base_rate,
+            self.slope1,
+            self.slope2,
+            acceptable_costs_ray,
+            price=self.price,
+            decimals=self.decimals,
+        )
+
+
+class Decision(NamedTuple):
+    block_number: int
+    need: int  # NO_REBALANCE, REBALANCE or REBALANCE_IF_GAS
+    max_gas_price_to_tend: int
+
+    def should_rebalance(self, base_fee):
+        return gas_allows_rebalance(self.need, base_fee, self.max_gas_price_to_tend)
+
+
+def _value(result):
+    # multicall hands out lazy proxies, resolved once the batch is flushed
+    return getattr(result, "__wrapped__", result)
+
+
+class RebalanceEvaluator:
+    def __init__(self, max_age=None):
+        self.max_age = max_age
+        data_provider = interface.IProtocolDataProvider(PROTOCOL_DATA_PROVIDER)
+        provider = interface.ILendingPoolAddressesProvider(
+            data_provider.ADDRESSES_PROVIDER()
+        )
+        self.data_provider = data_provider
+        self.lending_pool = interface.ILendingPool(provider.getLendingPool())
+        self.price_oracle = interface.IPriceOracle(provider.getPriceOracle())
+        self.base_fee_provider = interface.IBaseFee(BASE_FEE_PROVIDER)
+        self._reserves = {}
+        self._irs_params = {}
+        self._decimals = {}
+        # last block each reserve's interest rate strategy was checked at
+        self._irs_checked = {}
+        self._synced_block = web3.eth.block_number
+
+    def reserve(self, token, block=None):
+        """State of `token`'s reserve, cached until the reserve is updated."""
+        if block is None:
+            block = web3.eth.block_number
+        token = to_checksum_address(str(token))
+        if block < self._synced_block:
+            # a past block: read it, but do not let it replace newer state
+            return self._read(token, block)
+
+        self._sync(block)
+        state = self._reserves.get(token)
+        if (
+            state is None
+            or (self.max_age is not None and block - state.block_number >= self.max_age)
+            or self._irs_changed(token, state, block)
+        ):
+            state = self._reserves[token] = self._read(token, block)
+        return state
+
+    def evaluate(
+        self,
+        investment_token,
+        acceptable_costs_ray,
+        target_ltv,
+        warning_ltv,
+        total_collateral_eth,
+        total_debt_eth,
+        max_gas_price_to_tend,
+        block=None,
+    ):
+        """Everything `shouldRebalance` decides before looking at the gas price."""
+        state = self.reserve(investment_token, block)
+        current_protocol_debt, max_protocol_debt, _ = state.calc_max_debt(
+            acceptable_costs_ray
+        )
+        need = rebalance_need(
+            current_protocol_debt,
+            max_protocol_debt,
+            target_ltv,
+            warning_ltv,
+            total_collateral_eth,
+            total_debt_eth,
+        )
+        return Decision(
+            block if block is not None else self._synced_block,
+            need,
+            max_gas_price_to_tend,
+        )
+
+    def recheck(self, decision, block=None):
+        """Re-evaluate `decision` against the base fee at `block`, one call."""
+        block_identifier = "latest" if block is None else block
+        base_fee = self.base_fee_provider.basefee_global(
+            block_identifier=block_identifier
+        )
+        return decision.should_rebalance(base_fee)
+
+    def should_rebalance(self, *args, block=None):
+        """`shouldRebalance`, same arguments as `evaluate`."""
+        return self.recheck(self.evaluate(*args, block=block), block)
+
+    def _sync(self, block):
+        # drop reserves the lending pool updated since the last sync
+        if block <= self._synced_block or not self._reserves:
+            self._synced_block = max(block, self._synced_block)
+            return
+        events = self.lending_pool.events.get_sequence(
+            self._synced_block + 1, block, event_type="ReserveDataUpdated"
+        )
+        for event in events:
+            self._reserves.pop(event.args.reserve, None)
+        self._synced_block = block
+
+    def _irs_changed(self, token, state, block):
+        # once per block, the same check strategy_snapshot makes on its markets
+        if max(state.block_number, self._irs_checked.get(token, 0)) >= block:
+            return False
+        self._irs_checked[token] = block
+        reserve_data = self.lending_pool.getReserveData(token, block_identifier=block)
+        irs_address = reserve_data.dict()["interestRateStrategyAddress"]
+        return irs_address != state.interest_rate_strategy
+
+    def _read(self, token, block):
+        with multicall(block_identifier=block):
+            reserve_data = self.data_provider.getReserveData(token)
+            pool_reserve_data = self.lending_pool.getReserveData(token)
+            price = self.price_oracle.getAssetPrice(token)
+        liquidity, stable_debt, variable_debt, *_ = _value(reserve_data)
+        pool_reserve_data = _value(pool_reserve_data).dict()
+        irs_address = pool_reserve_data["interestRateStrategyAddress"]
+
+        if token not in self._decimals:
+            self._decimals[token] = interface.IOptionalERC20(token).decimals()
+        if irs_address not in self._irs_params:
+            irs = interface.IReserveInterestRateStrategy(irs_address)
+            with multicall:
+                params = (
+                    irs.OPTIMAL_UTILIZATION_RATE(),
+                    irs.baseVariableBorrowRate(),
+                    irs.variableRateSlope1(),
+                    irs.variableRateSlope2(),
+                )
+            self._irs_params[irs_address] = tuple(_value(p) for p in params)
+
+        return ReserveState(
+            block,
+            liquidity,
+            stable_debt,
+            variable_debt,
+            *self._irs_params[irs_address],
+            _value(price),
+            self._decimals[token],
+            irs_address,
+        )
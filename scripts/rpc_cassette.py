@@ -0,0 +1,294 @@
+"""
+Record the remote state a forked test run reads, then replay it offline.
+
+`CassetteProxy` is a JSON-RPC server the forking node (ganache, hardhat, anvil)
+forks from instead of the archive node. When recording, it forwards every
+request it has no answer for to the upstream RPC and stores the answer (storage
+slots, code, balances, nonces, blocks). When replaying, it only serves stored
+answers. Anything else gets a `CassetteMiss` error right away, so a test that
+reads new state fails instead of waiting on the network. The node pins the fork
+to the block of the first `eth_blockNumber`, which is recorded too, so later
+runs read exactly the same state.
+
+The ABIs and sources brownie fetches from Etherscan (`autofetch_sources`) go
+through `Cassette.patch_requests`, so they are recorded and replayed the same
+way. Cassettes are gzipped JSON, keyed by method and params, with API keys
+stripped. `brownie test --cassette <file>` starts the proxy and forks from it:
+
+    brownie test tests/integration_dai_susd --cassette tests/cassettes/dai.json.gz \\
+        --cassette-record
+    brownie test tests/integration_dai_susd --cassette tests/cassettes/dai.json.gz
+
+The proxy can also run on its own, for a node started by hand:
+
+    python -m scripts.rpc_cassette tests/cassettes/dai.json.gz --record \\
+        --upstream https://mainnet.infura.io/v3/$WEB3_INFURA_PROJECT_ID
+"""
+import argparse
+import fcntl
+import gzip
+import json
+import os
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from urllib.request import Request, urlopen
+
+VERSION = 1
+# JSON-RPC error code of answers the cassette does not have
+MISS_CODE = -32099
+# upstream errors that depend on the moment (rate limits), never recorded
+TRANSIENT_CODES = {-32005, 429}
+EXPLORER_HOSTS = ("api.etherscan.io",)
+# query params kept out of explorer keys, so cassettes hold no API keys
+SECRET_PARAMS = ("apikey",)
+
+
+class CassetteMiss(Exception):
+    pass
+
+
+def _normalize(value):
+    # nodes are not consistent about the case of addresses and hex quantities
+    if isinstance(value, str):
+        return value.lower()
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    return value
+
+
+def rpc_key(method, params):
+    params = json.dumps(_normalize(params), separators=(",", ":"), sort_keys=True)
+    return f"{method}:{params}"
+
+
+def explorer_key(url, params):
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query.update(params or {})
+    for secret in SECRET_PARAMS:
+        query.pop(secret, None)
+    return f"{parts.hostname}{parts.path}?{urlencode(sorted(query.items()))}"
+
+
+def default_upstream():
+    project_id = os.environ.get("WEB3_INFURA_PROJECT_ID")
+    return project_id and f"https://mainnet.infura.io/v3/{project_id}"
+
+
+class Cassette:
+    def __init__(self, path, record=False, upstream=None, timeout=60):
+        self.path = Path(path)
+        self.record = record
+        self.upstream = upstream
+        self.timeout = timeout
+        self.rpc = {}
+        self.explorer = {}
+        # keys asked for and not found, in order
+        self.misses = []
+        self._lock = threading.Lock()
+
+        if self.path.exists():
+            self.rpc, self.explorer = self._read(self.path)
+        elif not record:
+            raise FileNotFoundError(f"no cassette at {self.path}, record one first")
+        if record and not upstream:
+            raise ValueError("recording needs an upstream RPC")
+
+    @staticmethod
+    def _read(f):
+        if isinstance(f, Path):
+            with gzip.open(f, "rt") as stream:
+                data = json.load(stream)
+        else:
+            data = json.loads(gzip.decompress(f.read()).decode())
+        if data["version"] != VERSION:
+            raise ValueError(f"cassette version {data['version']}, expected {VERSION}")
+        return data["rpc"], data["explorer"]
+
+    def save(self):
+        """Merge what was recorded into the file (workers of one run can share it)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            rpc, explorer = ({}, {})
+            if f.read(1):
+                f.seek(0)
+                rpc, explorer = self._read(f)
+            with self._lock:
+                rpc.update(self.rpc)
+                explorer.update(self.explorer)
+            data = {"version": VERSION, "rpc": rpc, "explorer": explorer}
+            f.seek(0)
+            f.truncate()
+            f.write(
+                gzip.compress(
+                    json.dumps(data, separators=(",", ":"), sort_keys=True).encode()
+                )
+            )
+
+    def _miss(self, key):
+        with self._lock:
+            self.misses.append(key)
+        raise CassetteMiss(
+            f"{key} is not in the cassette {self.path}, record it again to add it"
+        )
+
+    def call(self, method, params):
+        """The `{"result": ...}` or `{"error": ...}` answer to a JSON-RPC call."""
+        key = rpc_key(method, params)
+        with self._lock:
+            if key in self.rpc:
+                return self.rpc[key]
+        if not self.record:
+            self._miss(key)
+
+        request = Request(
+            self.upstream,
+            json.dumps(
+                {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+            ).encode(),
+            {"Content-Type": "application/json"},
+        )
+        with urlopen(request, timeout=self.timeout) as response:
+            body = json.load(response)
+        answer = (
+            {"error": body["error"]} if "error" in body else {"result": body["result"]}
+        )
+        if answer.get("error", {}).get("code") not in TRANSIENT_CODES:
+            with self._lock:
+                self.rpc[key] = answer
+        return answer
+
+    @contextmanager
+    def patch_requests(self, hosts=EXPLORER_HOSTS):
+        """Serve `requests` GETs to `hosts` (brownie's explorer calls) from here."""
+        import requests
+
+        original = requests.sessions.Session.request
+        cassette = self
+
+        def request(session, method, url, params=None, **kwargs):
+            if method.upper() != "GET" or urlsplit(url).hostname not in hosts:
+                return original(session, method, url, params=params, **kwargs)
+
+            key = explorer_key(url, params)
+            with cassette._lock:
+                body = cassette.explorer.get(key)
+            if body is not None:
+                response = requests.Response()
+                response.status_code = 200
+                response._content = body.encode()
+                response.encoding = "utf-8"
+                response.headers["Content-Type"] = "application/json"
+                response.url = url
+                return response
+            if not cassette.record:
+                cassette._miss(key)
+
+            response = original(session, method, url, params=params, **kwargs)
+            # etherscan answers rate limits and errors with status "0"
+            if response.ok and response.json().get("status") == "1":
+                with cassette._lock:
+                    cassette.explorer[key] = response.text
+            return response
+
+        requests.sessions.Session.request = request
+        try:
+            yield
+        finally:
+            requests.sessions.Session.request = original
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if isinstance(body, list):
+            response = [self._answer(request) for request in body]
+        else:
+            response = self._answer(body)
+
+        data = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _answer(self, request):
+        try:
+            answer = self.server.cassette.call(
+                request["method"], request.get("params", [])
+            )
+        except CassetteMiss as e:
+            answer = {"error": {"code": MISS_CODE, "message": str(e)}}
+        except OSError as e:
+            answer = {"error": {"code": -32603, "message": f"upstream: {e}"}}
+        return {"jsonrpc": "2.0", "id": request.get("id"), **answer}
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CassetteProxy:
+    """JSON-RPC server answering from `cassette`, port 0 picks a free one."""
+
+    def __init__(self, cassette, host="127.0.0.1", port=0):
+        self.cassette = cassette
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.cassette = cassette
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.cassette.record:
+            self.cassette.save()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("cassette")
+    parser.add_argument("--record", action="store_true")
+    parser.add_argument(
+        "--upstream", default=default_upstream(), help="archive RPC to record from"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8546)
+    args = parser.parse_args(argv)
+
+    cassette = Cassette(args.cassette, args.record, args.upstream)
+    with CassetteProxy(cassette, args.host, args.port) as proxy:
+        mode = "recording" if args.record else "replaying"
+        print(f"{mode} {args.cassette} on {proxy.url}, ctrl-c to stop")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+    for key in cassette.misses:
+        print(f"miss: {key}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+"""
+Offline model of the strategy's position management.
+
+`adjust_position` ports the decision tree of `Strategy.adjustPosition`
+(borrow up to target LTV within the acceptable cost of capital, repay when
+above warning LTV or when borrowing got too expensive) and `Position` moves
+balances the way the strategy moves them: want is supplied to Aave, borrowed
+investment token is deposited into the yVault and withdrawn from it to repay.
+Together with the ports in `aave_lender_borrower_lib` this replays the
+strategy over recorded market data without a node (see `scripts/backtest.py`).
+
+What the model leaves out: the yVault withdraws without loss at
+`price_per_share`, swaps of want for investment token fill at oracle prices,
+only the want reserve is used as collateral and the want reserve always has
+the liquidity to withdraw.
+"""
+from typing import NamedTuple, Optional
+
+from scripts.aave_lender_borrower_lib import (
+    MAX_BPS,
+    RAY,
+    UINT256_MAX,
+    Revert,
+    calc_max_debt,
+    calculate_amount_to_repay,
+    gas_allows_rebalance,
+    rebalance_need,
+)
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+
+class Block(NamedTuple):
+    """Market state the strategy reads at one block."""
+
+    block_number: int
+    timestamp: int
+    base_fee: int
+    # investment token reserve (ProtocolDataProvider.getReserveData)
+    available_liquidity: int
+    total_stable_debt: int
+    total_variable_debt: int
+    variable_borrow_rate: int
+    # investment token interest rate strategy
+    optimal_rate: int
+    base_rate: int
+    slope1: int
+    slope2: int
+    # want reserve supply rate
+    want_liquidity_rate: int
+    # oracle prices in ETH and the yVault's pricePerShare
+    want_price: int
+    investment_token_price: int
+    price_per_share: int
+
+    def calc_max_debt(self, acceptable_costs_ray, decimals):
+        return calc_max_debt(
+            self.available_liquidity,
+            self.total_stable_debt,
+            self.total_variable_debt,
+            self.optimal_rate,
+            self.base_rate,
+            self.slope1,
+            self.slope2,
+            acceptable_costs_ray,
+            price=self.investment_token_price,
+            decimals=decimals,
+        )
+
+
+class Market(NamedTuple):
+    """Reserve configuration of want and token decimals (yVault = its token)."""
+
+    want_decimals: int = 18
+    investment_token_decimals: int = 18
+    ltv: int = 7_500
+    liquidation_threshold: int = 8_000
+    liquidation_bonus: int = 10_500
+    # Aave's close factor, the share of the debt a liquidation repays
+    close_factor: int = 5_000
+
+
+class StrategyParams(NamedTuple):
+    """What `setStrategyParams` sets, Strategy defaults otherwise."""
+
+    target_ltv_multiplier: int = 6_000
+    warning_ltv_multiplier: int = 8_000
+    acceptable_costs_ray: int = RAY
+    max_gas_price_to_tend: int = 0
+    max_total_borrow_it: int = UINT256_MAX
+    # 1% of an investment token, as set at initialization, if None
+    min_threshold: Optional[int] = None
+    leave_debt_behind: bool = False
+
+
+class Adjustment(NamedTuple):
+    """What `adjustPosition` does, in ETH."""
+
+    borrow: int
+    repay: int
+
+
+def to_eth(amount, price, decimals):
+    """`Strategy._toETH` (0 and max pass through)."""
+    if amount == 0 or amount == UINT256_MAX:
+        return amount
+    return amount * price // 10 ** decimals
+
+
+def from_eth(amount, price, decimals):
+    """`Strategy._fromETH` (0 and max pass through)."""
+    if amount == 0 or amount == UINT256_MAX:
+        return amount
+    return amount * 10 ** decimals // price
+
+
+def ray_mul(a, b):
+    return (a * b + RAY // 2) // RAY
+
+
+def linear_interest(rate, seconds):
+    """Aave's `MathUtils.calculateLinearInterest`, used for supply balances."""
+    return RAY + rate * seconds // SECONDS_PER_YEAR
+
+
+def compounded_interest(rate, seconds):
+    """Aave's `MathUtils.calculateCompoundedInterest`, used for variable debt."""
+    if seconds == 0:
+        return RAY
+    rate_per_second = rate // SECONDS_PER_YEAR
+    base_power_two = ray_mul(rate_per_second, rate_per_second)
+    base_power_three = ray_mul(base_power_two, rate_per_second)
+    second_term = seconds * (seconds - 1) * base_power_two // 2
+    third_term = seconds * (seconds - 1) * max(seconds - 2, 0) * base_power_three // 6
+    return RAY + rate_per_second * seconds + second_term + third_term
+
+
+def adjust_position(
+    total_collateral_eth,
+    total_debt_eth,
+    available_borrows_eth,
+    liquidation_threshold,
+    target_ltv_multiplier,
+    warning_ltv_multiplier,
+    max_debt,
+    max_total_borrow_eth=UINT256_MAX,
+):
+    """
+    Decision tree of `Strategy.adjustPosition`.
+
+    `max_debt` is the result of `calcMaxDebt` and `max_total_borrow_eth` is
+    `maxTotalBorrowIT` in ETH. Returns the debt to take or repay in ETH, as the
+    strategy computes it before converting to investment token.
+    """
+    if total_collateral_eth == 0:
+        return Adjustment(0, 0)
+
+    current_ltv = total_debt_eth * MAX_BPS // total_collateral_eth
+    target_ltv = liquidation_threshold * target_ltv_multiplier // MAX_BPS
+    warning_ltv = liquidation_threshold * warning_ltv_multiplier // MAX_BPS
+    current_protocol_debt, max_protocol_debt, target_utilisation = max_debt
+
+    if target_ltv > current_ltv and current_protocol_debt < max_protocol_debt:
+        # SUBOPTIMAL RATIO: take on more debt
+        target_debt_eth = total_collateral_eth * target_ltv // MAX_BPS
+        amount = min(available_borrows_eth, target_debt_eth - total_debt_eth)
+        if current_protocol_debt + amount > max_protocol_debt:
+            amount = max_protocol_debt - current_protocol_debt
+        if total_debt_eth + amount > max_total_borrow_eth:
+            amount = max(max_total_borrow_eth - total_debt_eth, 0)
+        return Adjustment(amount, 0)
+
+    if current_ltv > warning_ltv or current_protocol_debt > max_protocol_debt:
+        # UNHEALTHY RATIO: repay down to target LTV, or to where costs are acceptable
+        target_debt_eth = target_ltv * total_collateral_eth // MAX_BPS
+        amount = max(total_debt_eth - target_debt_eth, 0)
+        if max_protocol_debt == 0:
+            amount = total_debt_eth
+        elif current_protocol_debt > max_protocol_debt:
+            if target_utilisation >= RAY:
+                raise Revert("adjustPosition")
+            iterative_amount = (
+                (current_protocol_debt - max_protocol_debt)
+                * RAY
+                // (RAY - target_utilisation)
+            )
+            amount = max(amount, iterative_amount)
+        return Adjustment(0, amount)
+
+    return Adjustment(0, 0)
+
+
+class Position:
+    """
+    Balances of one strategy, moved like the strategy moves them.
+
+    Amounts are in token units: `want` is loose want, `collateral` the aToken
+    balance, `investment_token` the loose investment token, `debt` the
+    variable debt and `shares` the yVault balance.
+    """
+
+    def __init__(self, params, market, want=0):
+        self.params = params
+        self.market = market
+        self.min_threshold = (
+            params.min_threshold
+            if params.min_threshold is not None
+            else 10 ** market.investment_token_decimals // 100
+        )
+        self.want = want
+        self.collateral = 0
+        self.investment_token = 0
+        self.debt = 0
+        self.shares = 0
+
+    # ----------------- VIEWS -----------------
+
+    def account_data(self, block):
+        """(totalCollateralETH, totalDebtETH, availableBorrowsETH) from Aave."""
+        collateral_eth = (
+            self.collateral * block.want_price // 10 ** self.market.want_decimals
+        )
+        debt_eth = (
+            self.debt
+            * block.investment_token_price
+            // 10 ** self.market.investment_token_decimals
+        )
+        available = max(collateral_eth * self.market.ltv // MAX_BPS - debt_eth, 0)
+        return collateral_eth, debt_eth, available
+
+    def value_of_investment(self, block):
+        return (
+            self.shares
+            * block.price_per_share
+            // 10 ** self.market.investment_token_decimals
+        )
+
+    def investment_token_to_want(self, amount, block):
+        return from_eth(
+            to_eth(
+                amount,
+                block.investment_token_price,
+                self.market.investment_token_decimals,
+            ),
+            block.want_price,
+            self.market.want_decimals,
+        )
+
+    def estimated_total_assets(self, block):
+        """`Strategy.estimatedTotalAssets`."""
+        return (
+            self.want
+            + self.collateral
+            + self.investment_token_to_want(self.value_of_investment(block), block)
+            - self.investment_token_to_want(self.debt, block)
+        )
+
+    def max_debt(self, block):
+        return block.calc_max_debt(
+            self.params.acceptable_costs_ray, self.market.investment_token_decimals
+        )
+
+    def should_rebalance(self, block, max_debt=None):
+        """`Strategy.tendTrigger`, False where the call reverts."""
+        collateral_eth, debt_eth, _ = self.account_data(block)
+        if collateral_eth == 0:
+            return False
+        try:
+            current_protocol_debt, max_protocol_debt, _ = max_debt or (
+                self.max_debt(block)
+            )
+        except Revert:
+            return False
+        lt = self.market.liquidation_threshold
+        need = rebalance_need(
+            current_protocol_debt,
+            max_protocol_debt,
+            lt * self.params.target_ltv_multiplier // MAX_BPS,
+            lt * self.params.warning_ltv_multiplier // MAX_BPS,
+            collateral_eth,
+            debt_eth,
+        )
+        return gas_allows_rebalance(
+            need, block.base_fee, self.params.max_gas_price_to_tend
+        )
+
+    # ----------------- STRATEGY -----------------
+
+    def adjust_position(self, block, max_debt=None, debt_outstanding=0):
+        """
+        `Strategy.adjustPosition`, what harvest and tend run.
+
+        Returns the `Adjustment` made. Raises `Revert` where `calcMaxDebt`
+        reverts, like the strategy does.
+        """
+        if self.want > debt_outstanding:
+            self.collateral += self.want - debt_outstanding
+            self.want = debt_outstanding
+
+        collateral_eth, debt_eth, available_borrows_eth = self.account_data(block)
+        adjustment = Adjustment(0, 0)
+        if collateral_eth > 0:
+            decimals = self.market.investment_token_decimals
+            price = block.investment_token_price
+            adjustment = adjust_position(
+                collateral_eth,
+                debt_eth,
+                available_borrows_eth,
+                self.market.liquidation_threshold,
+                self.params.target_ltv_multiplier,
+                self.params.warning_ltv_multiplier,
+                max_debt or self.max_debt(block),
+                to_eth(self.params.max_total_borrow_it, price, decimals),
+            )
+            borrow = from_eth(adjustment.borrow, price, decimals)
+            self.debt += borrow
+            self.investment_token += borrow
+            if adjustment.repay:
+                repay = from_eth(adjustment.repay, price, decimals)
+                self._repay_debt(self._withdraw_from_yvault(repay, block))
+
+        # loose investment token goes back into the yVault
+        if self.investment_token > 0:
+            self.shares += (
+                self.investment_token
+                * 10 ** self.market.investment_token_decimals
+                // block.price_per_share
+            )
+            self.investment_token = 0
+        return adjustment
+
+    def liquidate_position(self, amount_needed, block):
+        """`Strategy.liquidatePosition`, returns (liquidatedAmount, loss)."""
+        if self.want >= amount_needed:
+            return amount_needed, 0
+
+        repay = self._calculate_amount_to_repay(amount_needed, block)
+        self._repay_debt(self._withdraw_from_yvault(repay, block))
+        self._withdraw_want_from_aave(amount_needed, block)
+
+        if (
+            amount_needed > self.want
+            and self.debt > 0
+            and self.investment_token + self.value_of_investment(block) == 0
+            and not self.params.leave_debt_behind
+        ):
+            # sell want for investment token to unlock the collateral, at a loss
+            remaining = amount_needed - self.want
+            repay = self._calculate_amount_to_repay(remaining, block)
+            cost = min(self.investment_token_to_want(repay, block), self.want)
+            self.want -= cost
+            self.investment_token += repay
+            self._repay_debt(repay)
+            self._withdraw_want_from_aave(remaining, block)
+
+        if amount_needed > self.want:
+            return self.want, amount_needed - self.want
+        return amount_needed, 0
+
+    def accrue(self, block, seconds):
+        """Interest over `seconds` at the rates of `block`. Returns debt accrued."""
+        self.collateral = ray_mul(
+            self.collateral, linear_interest(block.want_liquidity_rate, seconds)
+        )
+        debt = ray_mul(
+            self.debt, compounded_interest(block.variable_borrow_rate, seconds)
+        )
+        accrued, self.debt = debt - self.debt, debt
+        return accrued
+
+    def liquidate_if_unhealthy(self, block):
+        """
+        Aave liquidation once the health factor drops below 1.
+
+        A liquidator repays `close_factor` of the debt and takes collateral
+        worth the repaid debt plus the liquidation bonus. Returns the
+        collateral lost, in want.
+        """
+        collateral_eth, debt_eth, _ = self.account_data(block)
+        if (
+            debt_eth == 0
+            or debt_eth * MAX_BPS <= collateral_eth * self.market.liquidation_threshold
+        ):
+            return 0
+        repaid = self.debt * self.market.close_factor // MAX_BPS
+        seized_eth = (
+            to_eth(
+                repaid,
+                block.investment_token_price,
+                self.market.investment_token_decimals,
+            )
+            * self.market.liquidation_bonus
+            // MAX_BPS
+        )
+        seized = min(
+            from_eth(seized_eth, block.want_price, self.market.want_decimals),
+            self.collateral,
+        )
+        self.debt -= repaid
+        self.collateral -= seized
+        return seized
+
+    # ----------------- INTERNAL -----------------
+
+    def _calculate_amount_to_repay(self, amount, block):
+        if amount == 0:
+            return 0
+        collateral_eth, debt_eth, _ = self.account_data(block)
+        lt = self.market.liquidation_threshold
+        return calculate_amount_to_repay(
+            to_eth(amount, block.want_price, self.market.want_decimals),
+            collateral_eth,
+            debt_eth,
+            lt * self.params.warning_ltv_multiplier // MAX_BPS,
+            lt * self.params.target_ltv_multiplier // MAX_BPS,
+            self.min_threshold,
+            block.investment_token_price,
+            self.market.investment_token_decimals,
+        )
+
+    def _withdraw_from_yvault(self, amount, block):
+        if amount == 0:
+            return 0
+        unit = 10 ** self.market.investment_token_decimals
+        shares = min(amount * unit // block.price_per_share, self.shares)
+        withdrawn = shares * block.price_per_share // unit
+        self.shares -= shares
+        self.investment_token += withdrawn
+        return withdrawn
+
+    def _repay_debt(self, amount):
+        amount = min(amount, self.investment_token, self.debt)
+        self.investment_token -= amount
+        self.debt -= amount
+
+    def _withdraw_want_from_aave(self, amount, block):
+        amount = min(amount, self.collateral)
+        collateral_eth, debt_eth, _ = self.account_data(block)
+        min_collateral_eth = (
+            debt_eth * MAX_BPS // self.market.ltv
+            if self.market.ltv > 0
+            else collateral_eth
+        )
+        if min_collateral_eth > collateral_eth:
+            return
+        max_withdrawal = from_eth(
+            collateral_eth - min_collateral_eth,
+            block.want_price,
+            self.market.want_decimals,
+        )
+        amount = min(amount, max_withdrawal)
+        self.collateral -= amount
+        self.want += amount
@@ -0,0 +1,350 @@
+"""
+Everything a strategy decision reads from the chain, fetched in one multicall.
+
+`Snapshotter.snapshot` returns an immutable `StrategySnapshot` of the Aave
+account data, the `calcMaxDebt` inputs, oracle prices, yVault share price,
+balances and the base fee at a block. Addresses that do not change between
+blocks (lending pool, oracle, a/debt tokens, decimals) are resolved once per
+strategy; the per block state of any number of strategies is then read with a
+single aggregated call, and identical reads shared by strategies (reserve data,
+interest rate strategy, prices) are only made once. Snapshots are cached per
+block number.
+"""
+from collections import OrderedDict
+from threading import Lock
+from typing import NamedTuple
+
+from brownie import Contract, Strategy, interface, multicall, web3
+
+from scripts.aave_lender_borrower_lib import MAX_BPS, calc_max_debt, should_rebalance
+
+PROTOCOL_DATA_PROVIDER = "0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d"
+BASE_FEE_PROVIDER = "0xf8d0Ec04e94296773cE20eFbeeA82e76220cD549"
+
+ERC20_ABI = [
+    {
+        "name": "balanceOf",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [{"name": "account", "type": "address"}],
+        "outputs": [{"name": "", "type": "uint256"}],
+    },
+    {
+        "name": "decimals",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [],
+        "outputs": [{"name": "", "type": "uint8"}],
+    },
+]
+
+
+class StrategyMarkets(NamedTuple):
+    """Addresses and decimals a strategy reads through, stable across blocks."""
+
+    strategy: str
+    want: str
+    investment_token: str
+    yvault: str
+    lending_pool: str
+    price_oracle: str
+    a_token: str
+    variable_debt_token: str
+    interest_rate_strategy: str
+    want_decimals: int
+    investment_token_decimals: int
+    yvault_decimals: int
+
+
+class StrategySnapshot(NamedTuple):
+    block_number: int
+    markets: StrategyMarkets
+    # lendingPool.getUserAccountData(strategy)
+    total_collateral_eth: int
+    total_debt_eth: int
+    available_borrows_eth: int
+    current_liquidation_threshold: int
+    ltv: int
+    health_factor: int
+    # calcMaxDebt inputs for the investment token reserve
+    available_liquidity: int
+    total_stable_debt: int
+    total_variable_debt: int
+    optimal_rate: int
+    base_rate: int
+    slope1: int
+    slope2: int
+    # oracle prices in ETH
+    want_price: int
+    investment_token_price: int
+    # yVault
+    price_per_share: int
+    yvault_shares: int
+    # strategy balances
+    want_balance: int
+    investment_token_balance: int
+    a_token_balance: int
+    debt_balance: int
+    # strategy parameters
+    acceptable_costs_ray: int
+    target_ltv_multiplier: int
+    warning_ltv_multiplier: int
+    max_total_borrow_it: int
+    max_gas_price_to_tend: int
+    base_fee: int
+
+    @property
+    def target_ltv(self):
+        return (
+            self.current_liquidation_threshold * self.target_ltv_multiplier // MAX_BPS
+        )
+
+    @property
+    def warning_ltv(self):
+        return (
+            self.current_liquidation_threshold * self.warning_ltv_multiplier // MAX_BPS
+        )
+
+    def calc_max_debt(self, acceptable_costs_ray=None):
+        """`AaveLenderBorrowerLib.calcMaxDebt` evaluated on this snapshot."""
+        if acceptable_costs_ray is None:
+            acceptable_costs_ray = self.acceptable_costs_ray
+        return calc_max_debt(
+            self.available_liquidity,
+            self.total_stable_debt,
+            self.total_variable_debt,
+            self.optimal_rate,
+            self.base_rate,
+            self.slope1,
+            self.slope2,
+            acceptable_costs_ray,
+            price=self.investment_token_price,
+            decimals=self.markets.investment_token_decimals,
+        )
+
+    def tend_trigger(self):
+        """`Strategy.tendTrigger` evaluated on this snapshot."""
+        # Nothing to rebalance if we do not have collateral locked
+        if self.total_collateral_eth == 0:
+            return False
+        current_protocol_debt, max_protocol_debt, _ = self.calc_max_debt()
+        return should_rebalance(
+            current_protocol_debt,
+            max_protocol_debt,
+            self.target_ltv,
+            self.warning_ltv,
+            self.total_collateral_eth,
+            self.total_debt_eth,
+            self.base_fee,
+            self.max_gas_price_to_tend,
+        )
+
+
+def _value(result):
+    # multicall hands out lazy proxies, resolved once the batch is flushed
+    return getattr(result, "__wrapped__", result)
+
+
+class _Batch:
+    """Collects calls for one multicall, making each distinct call only once."""
+
+    def __init__(self):
+        self._results = {}
+
+    def __call__(self, contract, method, *args):
+        key = (contract.address, method, args)
+        if key not in self._results:
+            self._results[key] = getattr(contract, method)(*args)
+        return key
+
+    def __getitem__(self, key):
+        return _value(self._results[key])
+
+
+class Snapshotter:
+    def __init__(self, cache_blocks=8):
+        self.cache_blocks = cache_blocks
+        self._markets = {}
+        self._snapshots = OrderedDict()
+        self._contracts = {}
+        self._lock = Lock()
+
+    def contract(self, kind, address):
+        # contract objects are reused so a snapshot makes no calls of its own
+        key = (kind, str(address))
+        if key not in self._contracts:
+            if kind == "Strategy":
+                self._contracts[key] = Strategy.at(address)
+            elif kind == "ERC20":
+                self._contracts[key] = Contract.from_abi("ERC20", address, ERC20_ABI)
+            else:
+                self._contracts[key] = getattr(interface, kind)(address)
+        return self._contracts[key]
+
+    def markets(self, strategy):
+        """Resolve (once) the addresses and decimals `strategy` reads through."""
+        strategy = str(strategy)
+        with self._lock:
+            if strategy not in self._markets:
+                self._markets.update(self._resolve_markets([strategy]))
+            return self._markets[strategy]
+
+    def snapshot(self, strategy, block=None):
+        return self.snapshot_many([strategy], block)[0]
+
+    def snapshot_many(self, strategies, block=None):
+        """Snapshot every strategy in `strategies` at `block` with one multicall."""
+        if block is None:
+            block = web3.eth.block_number
+        strategies = [str(s) for s in strategies]
+
+        with self._lock:
+            if block not in self._snapshots:
+                self._snapshots[block] = {}
+                while len(self._snapshots) > self.cache_blocks:
+                    self._snapshots.popitem(last=False)
+            cached = self._snapshots[block]
+            missing = [s for s in dict.fromkeys(strategies) if s not in cached]
+            unresolved = [s for s in missing if s not in self._markets]
+            if unresolved:
+                self._markets.update(self._resolve_markets(unresolved))
+
+        # reads for different strategies may run concurrently from threads
+        if missing:
+            for snapshot in self._read(missing, block):
+                cached[snapshot.markets.strategy] = snapshot
+        return [cached[s] for s in strategies]
+
+    def _resolve_markets(self, strategies):
+        data_provider = self.contract("IProtocolDataProvider", PROTOCOL_DATA_PROVIDER)
+        provider = self.contract(
+            "ILendingPoolAddressesProvider", data_provider.ADDRESSES_PROVIDER()
+        )
+
+        batch = _Batch()
+        with multicall:
+            lending_pool_key = batch(provider, "getLendingPool")
+            oracle_key = batch(provider, "getPriceOracle")
+            keys = {}
+            for address in strategies:
+                strategy = self.contract("Strategy", address)
+                keys[address] = (batch(strategy, "want"), batch(strategy, "yVault"))
+
+        lending_pool = self.contract("ILendingPool", batch[lending_pool_key])
+        tokens = {}
+        with multicall:
+            for address, (want_key, yvault_key) in keys.items():
+                want = self.contract("ERC20", batch[want_key])
+                yvault = self.contract("IVault", batch[yvault_key])
+                tokens[address] = (
+                    want.address,
+                    yvault.address,
+                    batch(yvault, "token"),
+                    batch(want, "decimals"),
+                    batch(yvault, "decimals"),
+                    batch(lending_pool, "getReserveData", want.address),
+                )
+
+        with multicall:
+            for address, (want, yvault, it_key, *_) in tokens.items():
+                investment_token = self.contract("ERC20", batch[it_key])
+                tokens[address] += (
+                    batch(investment_token, "decimals"),
+                    batch(lending_pool, "getReserveData", investment_token.address),
+                )
+
+        markets = {}
+        for address, values in tokens.items():
+            want, yvault, it_key, want_dec, yv_dec, want_res, it_dec, it_res = values
+            it_reserve = batch[it_res].dict()
+            markets[address] = StrategyMarkets(
+                strategy=address,
+                want=want,
+                investment_token=batch[it_key],
+                yvault=yvault,
+                lending_pool=lending_pool.address,
+                price_oracle=batch[oracle_key],
+                a_token=batch[want_res].dict()["aTokenAddress"],
+                variable_debt_token=it_reserve["variableDebtTokenAddress"],
+                interest_rate_strategy=it_reserve["interestRateStrategyAddress"],
+                want_decimals=batch[want_dec],
+                investment_token_decimals=batch[it_dec],
+                yvault_decimals=batch[yv_dec],
+            )
+        return markets
+
+    def _read(self, strategies, block):
+        base_fee = self.contract("IBaseFee", BASE_FEE_PROVIDER)
+        data_provider = self.contract("IProtocolDataProvider", PROTOCOL_DATA_PROVIDER)
+        batch = _Batch()
+        keys = {}
+        with multicall(block_identifier=block):
+            base_fee_key = batch(base_fee, "basefee_global")
+            for address in strategies:
+                m = self._markets[address]
+                strategy = self.contract("Strategy", address)
+                lending_pool = self.contract("ILendingPool", m.lending_pool)
+                irs = self.contract(
+                    "IReserveInterestRateStrategy", m.interest_rate_strategy
+                )
+                oracle = self.contract("IPriceOracle", m.price_oracle)
+                yvault = self.contract("IVault", m.yvault)
+                want = self.contract("ERC20", m.want)
+                investment_token = self.contract("ERC20", m.investment_token)
+                a_token = self.contract("IAToken", m.a_token)
+                debt_token = self.contract("IVariableDebtToken", m.variable_debt_token)
+                keys[address] = (
+                    batch(lending_pool, "getUserAccountData", address),
+                    batch(lending_pool, "getReserveData", m.investment_token),
+                    batch(data_provider, "getReserveData", m.investment_token),
+                    batch(irs, "OPTIMAL_UTILIZATION_RATE"),
+                    batch(irs, "baseVariableBorrowRate"),
+                    batch(irs, "variableRateSlope1"),
+                    batch(irs, "variableRateSlope2"),
+                    batch(oracle, "getAssetsPrices", (m.want, m.investment_token)),
+                    batch(yvault, "pricePerShare"),
+                    batch(yvault, "balanceOf", address),
+                    batch(want, "balanceOf", address),
+                    batch(investment_token, "balanceOf", address),
+                    batch(a_token, "balanceOf", address),
+                    batch(debt_token, "balanceOf", address),
+                    batch(strategy, "acceptableCostsRay"),
+                    batch(strategy, "targetLTVMultiplier"),
+                    batch(strategy, "warningLTVMultiplier"),
+                    batch(strategy, "maxTotalBorrowIT"),
+                    batch(strategy, "maxGasPriceToTend"),
+                )
+
+        snapshots = []
+        stale = []
+        for address, (account, reserve, reserve_data, *rest) in keys.items():
+            m = self._markets[address]
+            irs = batch[reserve].dict()["interestRateStrategyAddress"]
+            if irs != m.interest_rate_strategy:
+                # governance replaced the interest rate strategy
+                stale.append(address)
+                continue
+
+            values = [batch[key] for key in rest]
+            optimal, base, slope1, slope2, prices, *balances_and_params = values
+            snapshots.append(
+                StrategySnapshot(
+                    block,
+                    m,
+                    *batch[account],
+                    *batch[reserve_data][:3],
+                    optimal,
+                    base,
+                    slope1,
+                    slope2,
+                    *prices,
+                    *balances_and_params,
+                    batch[base_fee_key],
+                )
+            )
+
+        if stale:
+            with self._lock:
+                self._markets.update(self._resolve_markets(stale))
+            snapshots += self._read(stale, block)
+        return snapshots
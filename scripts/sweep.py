@@ -0,0 +1,236 @@
+"""
+Sweep strategy parameters over recorded market data on every CPU core.
+
+The grid (target LTV multiplier, warning LTV multiplier, acceptable costs, min
+threshold, max gas price to tend) is split in batches run by a process pool.
+Every worker streams the block files itself, so nothing but parameters and
+results crosses process boundaries and the sweep scales with the number of
+cores. Batches group parameters sharing an acceptable cost, which is what
+`calcMaxDebt` is vectorized over. Each point is a `backtest.Backtest` run:
+`adjustPosition` on every tend and, with `--withdraw-every`, the vault pulling
+funds through `liquidatePosition`.
+
+Results are written to a Parquet (needs `pyarrow`) or CSV file, one column per
+field, and the Pareto-optimal settings are printed: no other setting has a
+higher PnL with the same or lower peak LTV and tend count.
+
+    python -m scripts.sweep blocks-2021-*.parquet --every 25 \\
+        --target 4000,5000,6000,7000 --warning 7000,8000,9000 \\
+        --acceptable-costs 3e25,5e25,1e26 --max-gas-price 30e9,60e9,100e9 \\
+        --output sweep.parquet
+"""
+import argparse
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from itertools import product
+from pathlib import Path
+
+from scripts.aave_lender_borrower_lib import RAY
+from scripts.backtest import TEND_GAS, Backtest, read_blocks, sample
+from scripts.strategy_model import Market, StrategyParams
+
+# setStrategyParams reverts above it
+MAX_MULTIPLIER = 9_000
+
+
+def grid(
+    target_ltv_multipliers,
+    warning_ltv_multipliers,
+    acceptable_costs,
+    min_thresholds=(None,),
+    max_gas_prices=(0,),
+):
+    """Every combination `setStrategyParams` accepts."""
+    return [
+        StrategyParams(
+            target_ltv_multiplier=target,
+            warning_ltv_multiplier=warning,
+            acceptable_costs_ray=acceptable,
+            max_gas_price_to_tend=max_gas_price,
+            min_threshold=min_threshold,
+        )
+        for target, warning, acceptable, min_threshold, max_gas_price in product(
+            target_ltv_multipliers,
+            warning_ltv_multipliers,
+            acceptable_costs,
+            min_thresholds,
+            max_gas_prices,
+        )
+        if target <= warning <= MAX_MULTIPLIER
+    ]
+
+
+def _run_batch(paths, every, params, backtest_kwargs):
+    blocks = sample(read_blocks(*paths), every)
+    return Backtest(params, **backtest_kwargs).run(blocks)
+
+
+def sweep(paths, params, every=1, workers=None, batch_size=None, **backtest_kwargs):
+    """
+    `Backtest` every parameter set in `params` over the block files in `paths`.
+
+    Batches of `batch_size` parameter sets (by default enough for 4 batches per
+    worker) run on `workers` processes (all cores by default). Results come
+    back in the order of `params`.
+    """
+    workers = workers or os.cpu_count()
+    order = sorted(range(len(params)), key=lambda i: params[i].acceptable_costs_ray)
+    if batch_size is None:
+        batch_size = max(-(-len(params) // (workers * 4)), 1)
+    batches = [order[i : i + batch_size] for i in range(0, len(order), batch_size)]
+
+    results = [None] * len(params)
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [
+            pool.submit(
+                _run_batch,
+                list(paths),
+                every,
+                [params[i] for i in batch],
+                backtest_kwargs,
+            )
+            for batch in batches
+        ]
+        for batch, future in zip(batches, futures):
+            for i, result in zip(batch, future.result()):
+                results[i] = result
+    return results
+
+
+def pareto_front(results):
+    """Results no other result beats on PnL without a higher peak LTV or more tends."""
+    ranked = sorted(results, key=lambda r: (-r.pnl, r.max_ltv, r.tends))
+    front = []
+    for result in ranked:
+        if not any(
+            best.max_ltv <= result.max_ltv and best.tends <= result.tends
+            for best in front
+        ):
+            front.append(result)
+    return front
+
+
+def to_columns(results, market=Market()):
+    """Results as columns, amounts in want (or ETH) units as floats."""
+    want_unit = 10 ** market.want_decimals
+    columns = {
+        "target_ltv_multiplier": [r.params.target_ltv_multiplier for r in results],
+        "warning_ltv_multiplier": [r.params.warning_ltv_multiplier for r in results],
+        "acceptable_costs": [r.params.acceptable_costs_ray / RAY for r in results],
+        "min_threshold": [
+            (
+                r.params.min_threshold
+                if r.params.min_threshold is not None
+                else 10 ** market.investment_token_decimals // 100
+            )
+            / 10 ** market.investment_token_decimals
+            for r in results
+        ],
+        "max_gas_price_to_tend": [r.params.max_gas_price_to_tend for r in results],
+    }
+    for field in (
+        "pnl",
+        "borrow_cost",
+        "liquidation_loss",
+        "withdrawal_loss",
+        "gas_spent_want",
+    ):
+        columns[field] = [getattr(r, field) / want_unit for r in results]
+    columns["gas_spent"] = [r.gas_spent / 10 ** 18 for r in results]
+    for field in ("tends", "liquidations", "max_ltv", "blocks"):
+        columns[field] = [getattr(r, field) for r in results]
+    return columns
+
+
+def write_results(results, path, market=Market()):
+    """Write `to_columns(results)` to a Parquet or CSV file, by extension."""
+    columns = to_columns(results, market)
+    if Path(path).suffix == ".parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("writing Parquet files needs `pyarrow` installed")
+        pq.write_table(pa.table(columns), path)
+        return
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(zip(*columns.values()))
+
+
+def _int(value):
+    # accepts 1e27, 60e9...
+    return int(Decimal(value))
+
+
+def _ints(value):
+    return [_int(item) for item in value.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("paths", nargs="+", help="CSV or Parquet block data")
+    parser.add_argument("--target", type=_ints, required=True)
+    parser.add_argument("--warning", type=_ints, required=True)
+    parser.add_argument(
+        "--acceptable-costs", type=_ints, required=True, help="ray, e.g. 5e25"
+    )
+    parser.add_argument("--min-threshold", type=_ints, help="investment token, in wei")
+    parser.add_argument("--max-gas-price", type=_ints, default=[0], help="wei")
+    parser.add_argument("--every", type=int, default=1, help="blocks between rows")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--capital", type=_int, help="want deposited, in wei")
+    parser.add_argument("--tend-gas", type=int, default=TEND_GAS)
+    parser.add_argument("--withdraw-every", type=int, help="rows between withdrawals")
+    parser.add_argument("--withdraw-bps", type=int, default=0)
+    parser.add_argument("--output", default="sweep.csv")
+    for field, default in Market._field_defaults.items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=int, default=default)
+    args = parser.parse_args(argv)
+
+    market = Market(*(getattr(args, field) for field in Market._fields))
+    params = grid(
+        args.target,
+        args.warning,
+        args.acceptable_costs,
+        args.min_threshold or [None],
+        args.max_gas_price,
+    )
+    results = sweep(
+        args.paths,
+        params,
+        every=args.every,
+        workers=args.workers,
+        market=market,
+        capital=args.capital,
+        tend_gas=args.tend_gas,
+        withdraw_every=args.withdraw_every,
+        withdraw_bps=args.withdraw_bps,
+    )
+    write_results(results, args.output, market)
+
+    unit = 10 ** market.want_decimals
+    print(f"{len(results)} settings written to {args.output}, Pareto-optimal:")
+    for result in pareto_front(results):
+        params = result.params
+        min_threshold = (
+            "default" if params.min_threshold is None else params.min_threshold
+        )
+        print(
+            f"target {params.target_ltv_multiplier} "
+            f"warning {params.warning_ltv_multiplier} "
+            f"costs {params.acceptable_costs_ray / RAY:.2%} "
+            f"min threshold {min_threshold} "
+            f"gas {params.max_gas_price_to_tend / 1e9:g} gwei: "
+            f"pnl {result.pnl / unit:,.2f} "
+            f"max LTV {result.max_ltv / 100:.2f}% "
+            f"tends {result.tends}"
+        )
+
+
+if __name__ == "__main__":
+    main()
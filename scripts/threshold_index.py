@@ -0,0 +1,175 @@
+"""
+Which strategies an oracle price move pushes across target LTV, warning LTV or
+the liquidation threshold, without reading every strategy's account data.
+
+A strategy's LTV only depends on prices through the ratio of the want price to
+the investment token price:
+
+    LTV = debt * p_it / 10**it_decimals / (collateral * p_want / 10**want_decimals)
+
+so each level (`_getTargetLTV`, `_getWarningLTV`, `currentLiquidationThreshold`)
+is crossed at one ratio, and LTV is at or above the level for every ratio at or
+below it. `ThresholdIndex` keeps those ratios sorted per
+(want, investment token) pair and level. When a price changes, the strategies
+whose level ratio lies between the old and the new ratio are found by bisection,
+in O(log n + k) for k strategies crossing.
+
+Ratios are exact fractions of the balances, so they match Aave's account data
+up to its rounding of amounts to ETH. They are only valid for the balances they
+were computed from: refresh a strategy after every tend and harvest (or any
+other change to its collateral or debt), e.g. with the strategies a batch keeper
+just executed.
+"""
+from bisect import bisect_left, insort
+from fractions import Fraction
+from typing import NamedTuple
+
+MAX_BPS = 10_000
+
+LEVELS = ("target", "warning", "liquidation")
+
+
+class Position(NamedTuple):
+    strategy: str
+    want: str
+    investment_token: str
+    # aToken balance, in want
+    collateral: int
+    want_decimals: int
+    # variable debt token balance, in investment token
+    debt: int
+    investment_token_decimals: int
+    # in bps, as the strategy computes them
+    target_ltv: int
+    warning_ltv: int
+    liquidation_threshold: int
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        markets = snapshot.markets
+        return cls(
+            markets.strategy,
+            markets.want,
+            markets.investment_token,
+            snapshot.a_token_balance,
+            markets.want_decimals,
+            snapshot.debt_balance,
+            markets.investment_token_decimals,
+            snapshot.target_ltv,
+            snapshot.warning_ltv,
+            snapshot.current_liquidation_threshold,
+        )
+
+    def level_ratio(self, level):
+        """Want / investment token price ratio at which LTV reaches `level`."""
+        ltv = {
+            "target": self.target_ltv,
+            "warning": self.warning_ltv,
+            "liquidation": self.liquidation_threshold,
+        }[level]
+        if self.debt == 0 or self.collateral == 0 or ltv == 0:
+            return None
+        return Fraction(
+            self.debt * 10 ** self.want_decimals * MAX_BPS,
+            self.collateral * 10 ** self.investment_token_decimals * ltv,
+        )
+
+
+class Crossing(NamedTuple):
+    strategy: str
+    level: str
+    # True when the LTV went from below the level to at or above it
+    rising: bool
+
+
+class ThresholdIndex:
+    def __init__(self):
+        # (want, investment token, level) -> sorted [(ratio, strategy)]
+        self._levels = {}
+        # strategy -> (pair, {level: ratio})
+        self._positions = {}
+        # asset -> pairs it is part of
+        self._pairs = {}
+        # asset -> latest oracle price
+        self._prices = {}
+
+    def __len__(self):
+        return len(self._positions)
+
+    def update(self, position):
+        """Index `position`, replacing what was indexed for its strategy."""
+        strategy = str(position.strategy)
+        self.remove(strategy)
+        pair = (str(position.want), str(position.investment_token))
+        for asset in pair:
+            self._pairs.setdefault(asset, set()).add(pair)
+        ratios = {}
+        for level in LEVELS:
+            ratio = position.level_ratio(level)
+            if ratio is not None:
+                ratios[level] = ratio
+                insort(
+                    self._levels.setdefault(pair + (level,), []), (ratio, strategy),
+                )
+        self._positions[strategy] = (pair, ratios)
+
+    def remove(self, strategy):
+        strategy = str(strategy)
+        if strategy not in self._positions:
+            return
+        pair, ratios = self._positions.pop(strategy)
+        for level, ratio in ratios.items():
+            entries = self._levels[pair + (level,)]
+            del entries[bisect_left(entries, (ratio, strategy))]
+
+    def refresh(self, snapshotter, strategies, block=None):
+        """Re-index `strategies` from one multicall, and take their prices."""
+        for snapshot in snapshotter.snapshot_many(strategies, block):
+            self.update(Position.from_snapshot(snapshot))
+            self._prices[snapshot.markets.want] = snapshot.want_price
+            self._prices[
+                snapshot.markets.investment_token
+            ] = snapshot.investment_token_price
+
+    def thresholds(self, strategy):
+        """The ratio of each level for `strategy`, levels without debt left out."""
+        return dict(self._positions[str(strategy)][1])
+
+    def ratio(self, want, investment_token):
+        prices = self._prices.get(str(want)), self._prices.get(str(investment_token))
+        if None in prices or prices[1] == 0:
+            return None
+        return Fraction(*prices)
+
+    def beyond(self, want, investment_token, level):
+        """Strategies of the pair whose LTV is at or above `level` now."""
+        ratio = self.ratio(want, investment_token)
+        entries = self._levels.get((str(want), str(investment_token), level), [])
+        if ratio is None:
+            return []
+        return [
+            strategy for _, strategy in entries[bisect_left(entries, (ratio, "")) :]
+        ]
+
+    def set_price(self, asset, price):
+        """Record a new oracle price, return the strategies it made cross a level."""
+        asset = str(asset)
+        pairs = self._pairs.get(asset, ())
+        old = {pair: self.ratio(*pair) for pair in pairs}
+        self._prices[asset] = price
+
+        crossings = []
+        for pair in pairs:
+            before, after = old[pair], self.ratio(*pair)
+            if before is None or after is None or before == after:
+                continue
+            low, high = min(before, after), max(before, after)
+            for level in LEVELS:
+                entries = self._levels.get(pair + (level,), [])
+                start = bisect_left(entries, (low, ""))
+                end = bisect_left(entries, (high, ""), start)
+                crossings += [
+                    Crossing(strategy, level, after < before)
+                    for _, strategy in entries[start:end]
+                ]
+        return crossings
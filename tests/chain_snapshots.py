@@ -0,0 +1,107 @@
+"""
+Named chain snapshots, so tests start from a pre-built position with one revert
+instead of replaying the transactions that lead to it.
+
+Snapshots are kept as a stack, oldest first: reverting to one discards every
+snapshot taken after it, which is how `evm_revert` works on ganache, hardhat and
+anvil. A position is built on top of its parent the first time a test asks for
+it and is reused until a test asks for a sibling, or a session fixture deploys
+something new on top of the base.
+
+brownie's `chain` holds a single snapshot id, in the private `_snapshot_id`.
+`chain.snapshot()` stores the id `evm_snapshot` returned there, and
+`chain.revert()` reverts to it, takes a new snapshot and stores its id. Both
+also reset brownie's own state (contracts deployed since, transaction history,
+time offset), so snapshots go through them and only the id is swapped to one
+of ours, an id the node still holds. This holds for eth-brownie 1.16 to 1.22;
+requirements-dev.txt pins 1.18 (the first to run ganache 7) to 1.22.
+"""
+from contextlib import contextmanager
+
+from brownie import chain
+
+BASE = ("base", None)
+
+
+class ChainSnapshots:
+    def __init__(self):
+        # [(key, snapshot id)], every entry built on top of the previous one
+        self._stack = []
+        # chain height when the chain was last left at the top of the stack
+        self._height = None
+
+    @property
+    def keys(self):
+        return [key for key, _ in self._stack]
+
+    def _clean(self):
+        return chain.height == self._height
+
+    def _take(self, key):
+        # brownie's chain only keeps one snapshot, read its id and keep our own
+        # (see the module docstring)
+        chain.snapshot()
+        self._stack.append((key, chain._snapshot_id))
+        self._height = chain.height
+
+    def _revert(self, index):
+        key, snapshot_id = self._stack[index]
+        del self._stack[index:]
+        # the node forgets a snapshot once reverted to, chain.revert takes it again
+        chain._snapshot_id = snapshot_id
+        chain.revert()
+        self._stack.append((key, chain._snapshot_id))
+        self._height = chain.height
+
+    def restore(self, path):
+        """
+        Bring the chain to the state `path` leads to.
+
+        `path` lists `(key, build)` pairs from `BASE` to the position. The
+        deepest one already taken is reverted to, the ones after it are built
+        (`build()` sends the transactions) and taken.
+        """
+        if self._stack and not self._clean():
+            # a module or class fixture sent transactions since the last test,
+            # they are part of the base from now on
+            self._stack.clear()
+
+        keys = self.keys
+        depth = 0
+        while depth < min(len(path), len(keys)) and keys[depth] == path[depth][0]:
+            depth += 1
+        if depth and (depth < len(keys) or not self._clean()):
+            self._revert(depth - 1)
+
+        for key, build in path[depth:]:
+            if build is not None:
+                build()
+            self._take(key)
+
+    def revert(self):
+        """Back to the top of the stack, where the current test started."""
+        if self._stack:
+            self._revert(len(self._stack) - 1)
+
+    def unwind(self):
+        """
+        Back to the base and forget it, for session fixtures that deploy on
+        top of it. Positions are dropped as they were built without the new
+        contracts.
+        """
+        if len(self._stack) > 1 and self._clean():
+            self._revert(0)
+        self._stack.clear()
+
+    @contextmanager
+    def checkpoint(self):
+        """Undo everything sent inside the block when it exits."""
+        key = object()
+        self._take(key)
+        try:
+            yield
+        finally:
+            self._revert(self.keys.index(key))
+            self._stack.pop()
+            # not at the top of the stack anymore
+            self._height = None
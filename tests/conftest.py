@@ -1,108 +1,316 @@
 import pytest
-from brownie import config, chain, Wei
+from brownie import config, chain, network, Wei
 from brownie import Contract
 
+import contract_registry
+import mock_aave
+from chain_snapshots import BASE, ChainSnapshots
+from scripts.rpc_cassette import Cassette, CassetteProxy, default_upstream
+
+# value in ETH of the want the whale deposits in the pre-built positions
+DEPOSIT_ETH = 200 * 10 ** 18
+
+# function fixtures restoring a pre-built position, see `isolation`
+POSITIONS = ("deposited", "levered", "past_warning", "costs_above_acceptable")
+
+# the (want, yVault) pairs run on a fork. Tests still deposit and borrow whole
+# token amounts that only these pairs' mainnet whales hold; the full matrix
+# runs on the mock market, where the whale holds every token
+FORK_PAIRS = {("DAI", "yvSUSD")}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--update-gas-baseline",
+        action="store_true",
+        help="record the gas used in tests/gas as the new baseline",
+    )
+    parser.addoption(
+        "--gas-tolerance",
+        type=float,
+        default=2.0,
+        help="percentage over the baseline gas tests/gas accepts (default 2)",
+    )
+    parser.addoption(
+        "--cassette",
+        help="fork from the RPC answers and explorer sources recorded in this file",
+    )
+    parser.addoption(
+        "--cassette-record",
+        action="store_true",
+        help="add what the run reads from --cassette-upstream to the cassette",
+    )
+    parser.addoption(
+        "--cassette-upstream",
+        default=default_upstream(),
+        help="archive RPC to record from (default Infura, $WEB3_INFURA_PROJECT_ID)",
+    )
 
-@pytest.fixture(autouse=True)
-def isolation(fn_isolation):
-    pass
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "xdist_group(name): run on the worker that runs the group"
+    )
+    if config.getoption("--cassette"):
+        start_cassette(config)
+
+
+def start_cassette(config):
+    # The forking node reads remote state itself, so it forks from a local proxy
+    # serving the cassette. This runs before brownie launches the node.
+    from brownie._config import CONFIG
+
+    cassette = Cassette(
+        config.getoption("--cassette"),
+        record=config.getoption("--cassette-record"),
+        upstream=config.getoption("--cassette-upstream"),
+    )
+    proxy = CassetteProxy(cassette).start()
+    for settings in CONFIG.networks.values():
+        if "fork" in settings.get("cmd_settings", {}):
+            settings["cmd_settings"]["fork"] = proxy.url
+    patch = cassette.patch_requests()
+    patch.__enter__()
+    config._cassette = (proxy, patch)
+
+
+def pytest_unconfigure(config):
+    if hasattr(config, "_cassette"):
+        proxy, patch = config._cassette
+        patch.__exit__(None, None, None)
+        proxy.stop()
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not hasattr(config, "_cassette"):
+        return
+    cassette = config._cassette[0].cassette
+    if cassette.misses:
+        terminalreporter.section("cassette misses")
+        for key in cassette.misses:
+            terminalreporter.write_line(key)
+        terminalreporter.write_line(
+            f"{len(cassette.misses)} reads not in {cassette.path}, "
+            "run again with --cassette-record to add them"
+        )
+
+
+def pytest_collection_modifyitems(config, items):
+    # Every token x yVault pair is its own group, so with `-n N --dist loadgroup`
+    # a worker deploys the session fixtures of the pairs it runs, and only once.
+    for item in items:
+        params = getattr(getattr(item, "callspec", None), "params", {})
+        if "token" not in params or "yvault" not in params:
+            continue
+        want = params["token"]
+        investment_token = mock_aave.YVAULTS[params["yvault"]]
+        if mock_aave.RESERVES[want][2] == 0:
+            item.add_marker(pytest.mark.skip(f"{want} cannot be used as collateral"))
+        elif want == investment_token:
+            item.add_marker(pytest.mark.skip("want and investment token are the same"))
+        else:
+            item.add_marker(pytest.mark.xdist_group(f"{want}-{params['yvault']}"))
+
+
+def pytest_runtest_setup(item):
+    # the network is only connected once collection is done, so not filtered there
+    params = getattr(getattr(item, "callspec", None), "params", {})
+    if "token" not in params or "yvault" not in params:
+        return
+    if (
+        "fork" in network.show_active()
+        and (params["token"], params["yvault"]) not in FORK_PAIRS
+    ):
+        pytest.skip("only the mock market runs the full token matrix")
+
+
+@pytest.fixture(scope="session")
+def snapshots():
+    yield ChainSnapshots()
 
 
 @pytest.fixture(autouse=True)
-def AaveLibrary(gov, AaveLenderBorrowerLib):
+def isolation(request, snapshots):
+    # Deployments are session fixtures, made once. Every test starts from the
+    # base snapshot taken after them, or from the position it asks for, and is
+    # reverted at the end. Positions are restored here, before any other
+    # function fixture sends a transaction.
+    positions = [name for name in POSITIONS if name in request.fixturenames]
+    assert len(positions) <= 1, f"a test starts from one position, not {positions}"
+    if positions:
+        request.getfixturevalue(positions[0])
+    else:
+        snapshots.restore([BASE])
+    yield
+    snapshots.revert()
+
+
+@pytest.fixture(scope="session")
+def aave_mock(snapshots, accounts):
+    # on a fork we use the live Aave market, on a plain local chain a mock one
+    if "fork" in network.show_active():
+        yield None
+    else:
+        snapshots.unwind()
+        yield mock_aave.deploy(accounts[8], accounts[7])
+
+
+@pytest.fixture(scope="session", autouse=True)
+def AaveLibrary(snapshots, gov, AaveLenderBorrowerLib):
+    snapshots.unwind()
     yield AaveLenderBorrowerLib.deploy({"from": gov})
 
 
-@pytest.fixture
-def gov(accounts):
-    yield accounts.at("0xFEB4acf3df3cDEA7399794D0869ef76A6EfAff52", force=True)
+@pytest.fixture(scope="session")
+def gov(accounts, aave_mock):
+    if aave_mock:
+        yield accounts[6]
+    else:
+        yield accounts.at("0xFEB4acf3df3cDEA7399794D0869ef76A6EfAff52", force=True)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def user(accounts):
     yield accounts[0]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def rewards(accounts):
     yield accounts[1]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def guardian(accounts):
     yield accounts[2]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def management(accounts):
     yield accounts[3]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def strategist(accounts):
     yield accounts[4]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def keeper(accounts):
     yield accounts[5]
 
 
 @pytest.fixture
-def amount(accounts, token, user):
+def amount(accounts, token, user, aave_mock):
     amount = 10_000 * 10 ** token.decimals()
-    # In order to get some funds for the token you are about to use,
-    # it impersonate an exchange address to use it's funds.
-    reserve = accounts.at("0xd551234ae421e3bcba99a0da6d736074f22192ff", force=True)
-    token.transfer(user, amount, {"from": reserve})
+    if aave_mock:
+        token.mint(user, amount, {"from": user})
+    else:
+        # In order to get some funds for the token you are about to use,
+        # it impersonate an exchange address to use it's funds.
+        reserve = accounts.at("0xd551234ae421e3bcba99a0da6d736074f22192ff", force=True)
+        token.transfer(user, amount, {"from": reserve})
     yield amount
 
 
-@pytest.fixture
-def weth():
-    yield Contract("0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2")
+@pytest.fixture(scope="session")
+def weth(aave_mock):
+    if aave_mock:
+        yield aave_mock.tokens["WETH"]
+    else:
+        yield contract_registry.contract("0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2")
 
 
-@pytest.fixture
-def vdweth():
-    yield Contract("0xF63B34710400CAd3e044cFfDcAb00a0f32E33eCf")
+@pytest.fixture(scope="session")
+def vdweth(aave_mock):
+    if aave_mock:
+        yield aave_mock.variable_debt_tokens["WETH"]
+    else:
+        yield contract_registry.contract("0xF63B34710400CAd3e044cFfDcAb00a0f32E33eCf")
 
 
-@pytest.fixture
-def wbtc():
-    yield Contract("0x2260FAC5E5542a773Aa44fBCfeDf7C193bc2C599")
+@pytest.fixture(scope="session")
+def wbtc(aave_mock):
+    if aave_mock:
+        yield aave_mock.tokens["WBTC"]
+    else:
+        yield contract_registry.contract("0x2260FAC5E5542a773Aa44fBCfeDf7C193bc2C599")
 
 
-@pytest.fixture
-def lendingPool():
-    yield Contract("0x7d2768de32b0b80b7a3454c06bdac94a69ddc7a9")
+@pytest.fixture(scope="session")
+def lendingPool(aave_mock):
+    if aave_mock:
+        yield aave_mock.lending_pool
+    else:
+        yield contract_registry.contract("0x7d2768de32b0b80b7a3454c06bdac94a69ddc7a9")
 
 
-@pytest.fixture
-def aToken(token, lendingPool):
-    yield Contract(lendingPool.getReserveData(token).dict()["aTokenAddress"])
+@pytest.fixture(scope="session")
+def aToken(token, lendingPool, aave_mock):
+    address = lendingPool.getReserveData(token).dict()["aTokenAddress"]
+    if aave_mock:
+        yield aave_mock.contract(address)
+    else:
+        yield contract_registry.contract(address, "AToken")
 
 
-@pytest.fixture
-def vdToken(borrow_token, lendingPool):
-    yield Contract(
-        lendingPool.getReserveData(borrow_token).dict()["variableDebtTokenAddress"]
-    )
+@pytest.fixture(scope="session")
+def vdToken(borrow_token, lendingPool, aave_mock):
+    address = lendingPool.getReserveData(borrow_token).dict()[
+        "variableDebtTokenAddress"
+    ]
+    if aave_mock:
+        yield aave_mock.contract(address)
+    else:
+        yield contract_registry.contract(address, "VariableDebtToken")
 
 
-@pytest.fixture
-def awbtc():
-    yield Contract("0x9ff58f4fFB29fA2266Ab25e75e2A8b3503311656")
+@pytest.fixture(scope="session")
+def awbtc(aave_mock):
+    if aave_mock:
+        yield aave_mock.a_tokens["WBTC"]
+    else:
+        yield contract_registry.contract("0x9ff58f4fFB29fA2266Ab25e75e2A8b3503311656")
 
 
-@pytest.fixture
-def wbtc_whale(accounts):
-    yield accounts.at("0x40ec5B33f54e0E8A33A975908C5BA1c14e5BbbDf", force=True)
+@pytest.fixture(scope="session")
+def wbtc_whale(accounts, aave_mock):
+    if aave_mock:
+        yield aave_mock.whale
+    else:
+        yield accounts.at("0x40ec5B33f54e0E8A33A975908C5BA1c14e5BbbDf", force=True)
 
 
-@pytest.fixture
-def weth_whale(accounts):
-    yield accounts.at("0x2F0b23f53734252Bda2277357e97e1517d6B042A", force=True)
+@pytest.fixture(scope="session")
+def weth_whale(accounts, aave_mock):
+    if aave_mock:
+        yield aave_mock.whale
+    else:
+        yield accounts.at("0x2F0b23f53734252Bda2277357e97e1517d6B042A", force=True)
+
+
+@pytest.fixture(scope="session")
+def stkAave(aave_mock):
+    if aave_mock:
+        yield aave_mock.stkaave
+    else:
+        yield contract_registry.contract(mock_aave.STKAAVE)
+
+
+@pytest.fixture(scope="session")
+def incentivesController(
+    aToken, vdToken, token_incentivised, borrow_incentivised, aave_mock
+):
+    if token_incentivised:
+        address = aToken.getIncentivesController()
+    elif borrow_incentivised:
+        address = vdToken.getIncentivesController()
+    else:
+        yield None
+        return
+    if aave_mock:
+        yield aave_mock.contract(address)
+    else:
+        yield contract_registry.contract(address, "IncentivesController")
 
 
 addresses = {
@@ -117,30 +325,41 @@ addresses = {
 
 
 @pytest.fixture(
+    scope="session",
     params=[
-        # 'WBTC', # WBTC
-        # "YFI",  # YFI
-        # "WETH",  # WETH
-        # 'LINK', # LINK
-        # 'USDT', # USDT
-        "DAI"
-    ]
+        "WBTC",  # WBTC
+        "YFI",  # YFI
+        "WETH",  # WETH
+        "LINK",  # LINK
+        "USDT",  # USDT
+        "DAI",  # DAI
+    ],
 )
-def token(request):
-    yield Contract(addresses[request.param])
+def token(request, aave_mock):
+    if aave_mock:
+        yield aave_mock.tokens[request.param]
+    else:
+        yield contract_registry.contract(addresses[request.param])
 
 
 @pytest.fixture(
+    scope="session",
     params=[
-        # "yvWBTC", # yvWBTC
-        # "yvWETH", # yvWETH
-        # "yvUSDT",  # yvUSDT
-        # "yvUSDC", # yvUSDC
-        # "yvDAI" # yvDAI
-        "yvSUSD"
+        "yvWBTC",  # yvWBTC
+        "yvWETH",  # yvWETH
+        "yvUSDT",  # yvUSDT
+        "yvUSDC",  # yvUSDC
+        "yvDAI",  # yvDAI
+        "yvSUSD",  # yvSUSD
     ],
 )
-def yvault(request):
+def yvault(request, aave_mock, snapshots):
+    if aave_mock:
+        yield aave_mock.yvaults[request.param]
+        return
+
+    snapshots.unwind()
+
     addresses = {
         "yvWBTC": "0xA696a63cc78DfFa1a63E9E50587C197387FF6C7E",  # yvWBTC
         "yvWETH": "0xa258C4606Ca8206D8aA700cE2143D7db854D168c",  # yvWETH
@@ -149,16 +368,43 @@ def yvault(request):
         "yvDAI": "0x19D3364A399d251E894aC732651be8B0E4e85001",  # yvDAI
         "yvSUSD": "0xa5cA62D95D24A4a350983D5B8ac4EB8638887396",
     }
-    vault = Contract(addresses[request.param])
+    vault = contract_registry.contract(addresses[request.param])
     vault.setDepositLimit(
         2 ** 256 - 1, {"from": vault.governance()}
     )  # testing during war room
     yield vault
 
 
-@pytest.fixture
-def borrow_token(yvault):
-    yield Contract(yvault.token())
+@pytest.fixture(scope="session")
+def borrow_token(yvault, aave_mock):
+    if aave_mock:
+        yield aave_mock.contract(yvault.token())
+    else:
+        yield contract_registry.contract(yvault.token(), "ERC20")
+
+
+@pytest.fixture(scope="session")
+def snx_yvault(aave_mock):
+    if aave_mock:
+        yield aave_mock.yvaults["yvSNX"]
+    else:
+        yield contract_registry.contract("0xF29AE508698bDeF169B89834F76704C3B205aedf")
+
+
+@pytest.fixture(scope="session")
+def snx(snx_yvault, aave_mock):
+    if aave_mock:
+        yield aave_mock.contract(snx_yvault.token())
+    else:
+        yield contract_registry.contract(snx_yvault.token(), "ERC20")
+
+
+@pytest.fixture(scope="session")
+def snx_whale(aave_mock):
+    if aave_mock:
+        yield aave_mock.whale
+    else:
+        yield "0xA1d7b2d891e3A1f9ef4bBC5be20630C2FEB1c470"
 
 
 whales = {
@@ -173,17 +419,17 @@ whales = {
 }
 
 
-@pytest.fixture
-def borrow_whale(borrow_token):
-    yield whales[borrow_token.symbol()]
+@pytest.fixture(scope="session")
+def borrow_whale(borrow_token, aave_mock):
+    yield aave_mock.whale if aave_mock else whales[borrow_token.symbol()]
 
 
-@pytest.fixture
-def token_whale(token):
-    yield whales[token.symbol()]
+@pytest.fixture(scope="session")
+def token_whale(token, aave_mock):
+    yield aave_mock.whale if aave_mock else whales[token.symbol()]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def token_symbol(token):
     yield token.symbol()
 
@@ -195,18 +441,19 @@ def weth_amout(user, weth):
     yield weth_amout
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def registry():
     yield Contract("0x50c1a2eA0a861A967D9d0FFE2AE4012c2E053804")
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def live_vault(registry, token):
     yield registry.latestVault(token)
 
 
-@pytest.fixture
-def vault(pm, gov, rewards, guardian, management, token):
+@pytest.fixture(scope="session")
+def vault(snapshots, pm, gov, rewards, guardian, management, token):
+    snapshots.unwind()
     Vault = pm(config["dependencies"][0]).Vault
     vault = guardian.deploy(Vault)
     vault.initialize(token, gov, rewards, "", "", guardian, management, {"from": gov})
@@ -217,43 +464,73 @@ def vault(pm, gov, rewards, guardian, management, token):
     yield vault
 
 
+# keyed by symbol so the same table serves mainnet and mock tokens
 incentivised = {
-    "0x2260FAC5E5542a773Aa44fBCfeDf7C193bc2C599": True,  # WBTC
-    "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2": True,  # WETH
-    "0x0bc529c00C6401aEF6D220BE8C6Ea1667F6Ad93e": False,  # YFI
-    "0x514910771AF9Ca656af840dff83E8264EcF986CA": False,  # LINK
-    "0x6B175474E89094C44Da98b954EedeAC495271d0F": True,  # DAI
-    "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48": True,  # USDC
-    "0xdAC17F958D2ee523a2206206994597C13D831ec7": True,  # USDT
-    "0x57Ab1ec28D129707052df4dF418D58a2D46d5f51": True,  # SUSD
+    "WBTC": True,
+    "WETH": True,
+    "YFI": False,
+    "LINK": False,
+    "DAI": True,
+    "USDC": True,
+    "USDT": True,
+    "sUSD": True,
+    "SNX": False,
 }
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def token_incentivised(token):
-    yield incentivised[token.address]
+    yield incentivised[token.symbol()]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def borrow_incentivised(borrow_token):
-    yield incentivised[borrow_token.address]
+    yield incentivised[borrow_token.symbol()]
 
 
-@pytest.fixture
-def strategy(vault, Strategy, gov, cloner):
+@pytest.fixture(scope="session")
+def strategy(snapshots, vault, Strategy, gov, cloner):
+    snapshots.unwind()
     strategy = Strategy.at(cloner.original())
     vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
     chain.mine()
     yield strategy
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
+def set_strategy_params(gov):
+    # setStrategyParams from gov, with the given fields (named after the
+    # strategy's getters) changed and the others kept. The referral code has
+    # no getter and is set to 0 unless given
+    def set_params(strategy, **params):
+        strategy.setStrategyParams(
+            params.get("targetLTVMultiplier", strategy.targetLTVMultiplier()),
+            params.get("warningLTVMultiplier", strategy.warningLTVMultiplier()),
+            params.get("acceptableCostsRay", strategy.acceptableCostsRay()),
+            params.get("referral", 0),
+            params.get("maxTotalBorrowIT", strategy.maxTotalBorrowIT()),
+            params.get("isWantIncentivised", strategy.isWantIncentivised()),
+            params.get(
+                "isInvestmentTokenIncentivised",
+                strategy.isInvestmentTokenIncentivised(),
+            ),
+            params.get("leaveDebtBehind", strategy.leaveDebtBehind()),
+            params.get("maxLoss", strategy.maxLoss()),
+            params.get("maxGasPriceToTend", strategy.maxGasPriceToTend()),
+            {"from": gov},
+        )
+
+    yield set_params
+
+
+@pytest.fixture(scope="session")
 def RELATIVE_APPROX():
     yield 1e-5
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def cloner(
+    snapshots,
     strategist,
     vault,
     AaveLenderBorrowerCloner,
@@ -263,6 +540,7 @@ def cloner(
     token,
     borrow_token,
 ):
+    snapshots.unwind()
     cloner = strategist.deploy(
         AaveLenderBorrowerCloner,
         vault,
@@ -273,3 +551,80 @@ def cloner(
     )
 
     yield cloner
+
+
+# Pre-built positions. A test asking for one starts from it (see `isolation`);
+# each is built once on top of its parent and then restored with one revert.
+
+
+def deposited_path(vault, strategy, token, token_whale, AaveLibrary):
+    def deposit():
+        token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+        vault.deposit(AaveLibrary.fromETH(DEPOSIT_ETH, token), {"from": token_whale})
+        chain.sleep(1)
+
+    return [BASE, ("deposited", deposit)]
+
+
+def levered_path(vault, strategy, token, token_whale, gov, AaveLibrary):
+    return deposited_path(vault, strategy, token, token_whale, AaveLibrary) + [
+        ("levered", lambda: strategy.harvest({"from": gov}))
+    ]
+
+
+@pytest.fixture
+def deposited(snapshots, vault, strategy, token, token_whale, AaveLibrary):
+    # the whale's deposit is in the vault, the strategy has not harvested it yet
+    snapshots.restore(deposited_path(vault, strategy, token, token_whale, AaveLibrary))
+
+
+@pytest.fixture
+def levered(snapshots, vault, strategy, token, token_whale, gov, AaveLibrary):
+    # harvested: want supplied to Aave and investment token borrowed at target LTV
+    snapshots.restore(
+        levered_path(vault, strategy, token, token_whale, gov, AaveLibrary)
+    )
+
+
+@pytest.fixture
+def past_warning(
+    snapshots, vault, strategy, token, token_whale, gov, AaveLibrary, aave_mock
+):
+    # levered, then want lost 40% of its value: LTV is over warning LTV
+    if not aave_mock:
+        pytest.skip("prices can only be moved on the mock")
+
+    def drop_price():
+        price = mock_aave.RESERVES[token.symbol()][1]
+        aave_mock.set_price(token.symbol(), price * 6 // 10)
+
+    snapshots.restore(
+        levered_path(vault, strategy, token, token_whale, gov, AaveLibrary)
+        + [("past_warning", drop_price)]
+    )
+
+
+@pytest.fixture
+def costs_above_acceptable(
+    snapshots,
+    vault,
+    strategy,
+    token,
+    token_whale,
+    gov,
+    AaveLibrary,
+    lendingPool,
+    borrow_token,
+    set_strategy_params,
+):
+    # levered, then acceptable costs lowered to half the current borrow rate
+    def lower_acceptable_costs():
+        rate = lendingPool.getReserveData(borrow_token).dict()[
+            "currentVariableBorrowRate"
+        ]
+        set_strategy_params(strategy, acceptableCostsRay=rate // 2)
+
+    snapshots.restore(
+        levered_path(vault, strategy, token, token_whale, gov, AaveLibrary)
+        + [("costs_above_acceptable", lower_acceptable_costs)]
+    )
@@ -0,0 +1,61 @@
+"""
+Handles on the mainnet contracts the fork tests use, built from the interfaces
+under `contracts/interfaces` instead of ABIs fetched from Etherscan.
+
+`contract_registry.json` maps each known address to a kind, and each kind to
+the interfaces whose ABIs make it up. The interfaces are compiled with the
+project, so a handle needs no network and no explorer cache. Addresses read
+from the chain (aTokens, debt tokens, a yVault's token) are not listed, the
+fixture that reads them passes the kind. Anything else falls back to
+`Contract(address)`, which fetches the ABI as before.
+"""
+import json
+from pathlib import Path
+
+from brownie import Contract, interface
+
+VERSION = 1
+PATH = Path(__file__).with_name("contract_registry.json")
+
+# loaded on first use, see `_load`
+_kinds = None
+_contracts = None
+_abis = {}
+
+
+def _load():
+    global _kinds, _contracts
+    if _contracts is None:
+        data = json.loads(PATH.read_text())
+        if data["version"] != VERSION:
+            raise ValueError(f"{PATH} is version {data['version']}, not {VERSION}")
+        _kinds = data["interfaces"]
+        _contracts = {
+            address.lower(): kind for address, kind in data["contracts"].items()
+        }
+
+
+def abi(kind):
+    """ABI of `kind`: the entries of its interfaces, without repeats."""
+    _load()
+    if kind not in _abis:
+        entries = {}
+        for name in _kinds[kind]:
+            for entry in getattr(interface, name).abi:
+                inputs = tuple(i["type"] for i in entry.get("inputs", []))
+                entries.setdefault((entry["type"], entry.get("name"), inputs), entry)
+        _abis[kind] = list(entries.values())
+    return _abis[kind]
+
+
+def kind_of(address):
+    _load()
+    return _contracts.get(str(address).lower())
+
+
+def contract(address, kind=None):
+    """Handle on `address`, as `kind` or as registered."""
+    kind = kind or kind_of(address)
+    if kind is None:
+        return Contract(address)
+    return Contract.from_abi(kind, address, abi(kind))
@@ -0,0 +1,81 @@
+import fcntl
+import json
+from pathlib import Path
+
+import pytest
+from brownie import network
+
+BASELINE = Path(__file__).parent / "baseline.json"
+
+
+def pytest_runtest_setup(item):
+    # gas is only reproducible on the mock market, a fork moves under our feet
+    if "fork" in network.show_active():
+        pytest.skip("gas benchmarks run against the Aave mocks")
+
+
+class GasBenchmark:
+    def __init__(self, baseline, tolerance, update):
+        self.baseline = baseline
+        self.tolerance = tolerance
+        self.update = update
+        self.recorded = {}
+
+    def check(self, name, tx):
+        """Record the gas used by `tx` and fail if it regressed past tolerance."""
+        self.recorded[name] = tx.gas_used
+        if self.update:
+            return
+        if self.baseline is None:
+            pytest.skip(
+                "no gas baseline recorded yet. Run with --update-gas-baseline and "
+                "commit tests/gas/baseline.json"
+            )
+        assert name in self.baseline, (
+            f"{name} has no baseline. Run with --update-gas-baseline and commit "
+            "tests/gas/baseline.json"
+        )
+        limit = self.baseline[name] * (100 + self.tolerance) / 100
+        assert tx.gas_used <= limit, (
+            f"{name} used {tx.gas_used} gas, {self.baseline[name]} in the baseline "
+            f"(+{(tx.gas_used / self.baseline[name] - 1) * 100:.2f}%). Run with "
+            "--update-gas-baseline if the increase is expected"
+        )
+
+
+@pytest.fixture(scope="session")
+def gas_benchmark(request):
+    # None until a baseline is recorded, then every benchmark needs an entry
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else None
+    benchmark = GasBenchmark(
+        baseline,
+        request.config.getoption("gas_tolerance"),
+        request.config.getoption("update_gas_baseline"),
+    )
+    yield benchmark
+
+    # the baseline only changes when asked to
+    if not benchmark.update or not benchmark.recorded:
+        return
+    # with -n, every worker merges what it recorded into the file in turn
+    with BASELINE.open("a+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        text = f.read()
+        baseline = json.loads(text) if text else {}
+        updated = {**baseline, **benchmark.recorded}
+        if updated != baseline:
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(dict(sorted(updated.items())), indent=4) + "\n")
+
+
+@pytest.fixture
+def gas(gas_benchmark, request):
+    # baseline entries are per benchmark and token pair
+    pair = request.node.callspec.id
+
+    def check(name, tx):
+        gas_benchmark.check(f"{name}[{pair}]", tx)
+
+    yield check
@@ -0,0 +1,205 @@
+import pytest
+from brownie import accounts, chain, web3
+
+import mock_aave
+
+RAY = 10 ** 27
+
+
+def deposit_and_harvest(vault, strategy, token, token_whale, gov):
+    token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+    vault.deposit(500_000 * (10 ** token.decimals()), {"from": token_whale})
+    chain.sleep(1)
+    return strategy.harvest({"from": gov})
+
+
+def config_slot(strategy):
+    # Strategy.Config fields, lowest bits first. The referral has no getter
+    # (the cloner sets one), its bits are left out of the comparison
+    fields = [
+        (strategy.acceptableCostsRay(), 96),
+        (strategy.targetLTVMultiplier(), 16),
+        (strategy.warningLTVMultiplier(), 16),
+        (strategy.maxGasPriceToTend(), 64),
+        (strategy.maxLoss(), 16),
+        (None, 16),
+        (strategy.isWantIncentivised(), 8),
+        (strategy.isInvestmentTokenIncentivised(), 8),
+        (strategy.leaveDebtBehind(), 8),
+        (strategy.flashLoanUnwind(), 8),
+    ]
+    word, mask, offset = 0, 0, 0
+    for value, bits in fields:
+        if value is not None:
+            word |= int(value) << offset
+            mask |= (2 ** bits - 1) << offset
+        offset += bits
+    return next(
+        slot
+        for slot in range(64)
+        if int.from_bytes(web3.eth.get_storage_at(strategy.address, slot), "big") & mask
+        == word
+    )
+
+
+def sloads(tx, contract):
+    """Storage slots of `contract` read by `tx`, in order."""
+    return [
+        int(step["stack"][-1], 16)
+        for step in tx.trace
+        if step["op"] == "SLOAD" and step["address"] == contract.address
+    ]
+
+
+def test_harvest_suboptimal_borrow(
+    vault, strategy, token, token_whale, gov, vdToken, gas
+):
+    tx = deposit_and_harvest(vault, strategy, token, token_whale, gov)
+    assert vdToken.balanceOf(strategy) > 0
+    gas("harvest_suboptimal_borrow", tx)
+
+
+def test_estimated_total_assets(vault, strategy, token, token_whale, gov, gas):
+    deposit_and_harvest(vault, strategy, token, token_whale, gov)
+
+    # a view, sent as a transaction to measure it
+    tx = strategy.estimatedTotalAssets.transact({"from": gov})
+    assert tx.return_value == strategy.estimatedTotalAssets()
+    gas("estimated_total_assets", tx)
+
+
+def test_tend_trigger(vault, strategy, token, token_whale, gov, gas):
+    deposit_and_harvest(vault, strategy, token, token_whale, gov)
+
+    # both read the interest rate strategy params from the cache, and all the
+    # strategy params from the config slot (maxTotalBorrowIT, in the next one,
+    # is only read when borrowing)
+    slot = config_slot(strategy)
+    tx = strategy.tendTrigger.transact(0, {"from": gov})
+    assert tx.return_value == strategy.tendTrigger(0)
+    assert slot in sloads(tx, strategy) and slot + 1 not in sloads(tx, strategy)
+    gas("tend_trigger", tx)
+
+    tx = strategy.tend({"from": gov})
+    assert "Held" in tx.events
+    assert slot in sloads(tx, strategy) and slot + 1 not in sloads(tx, strategy)
+    gas("tend_no_change", tx)
+
+
+def test_tend_unhealthy_repay(
+    vault, strategy, token, token_whale, gov, vdToken, aave_mock, gas
+):
+    deposit_and_harvest(vault, strategy, token, token_whale, gov)
+    debt = vdToken.balanceOf(strategy)
+
+    # collateral loses 40% of its value, pushing LTV over the warning LTV
+    price = mock_aave.RESERVES[token.symbol()][1]
+    aave_mock.set_price(token.symbol(), price * 6 // 10)
+    tx = strategy.tend({"from": gov})
+    assert "RepayDebt" in tx.events
+    assert 0 < vdToken.balanceOf(strategy) < debt
+    gas("tend_unhealthy_repay", tx)
+
+
+def test_tend_full_repay(
+    vault,
+    strategy,
+    token,
+    token_whale,
+    gov,
+    vdToken,
+    borrow_token,
+    aave_mock,
+    gas,
+    set_strategy_params,
+):
+    deposit_and_harvest(vault, strategy, token, token_whale, gov)
+
+    # utilization above optimal and asking for less than base + slope1 makes
+    # maxProtocolDebt 0, so all the debt is repaid
+    aave_mock.set_interest_rate_strategy(
+        borrow_token.symbol(), RAY * 3 // 10, 0, RAY * 7 // 100, RAY * 3
+    )
+    set_strategy_params(strategy, acceptableCostsRay=RAY // 100)
+    tx = strategy.tend({"from": gov})
+    assert tx.events["RepayDebt"]["repayAmount"] == (
+        tx.events["RepayDebt"]["previousDebtBalance"]
+    )
+    gas("tend_max_protocol_debt_zero_full_repay", tx)
+
+
+def test_withdraw_liquidate_position(
+    vault, strategy, token, token_whale, gov, vdToken, gas
+):
+    deposit_and_harvest(vault, strategy, token, token_whale, gov)
+    debt = vdToken.balanceOf(strategy)
+
+    tx = vault.withdraw(vault.balanceOf(token_whale) // 2, {"from": token_whale})
+    assert vdToken.balanceOf(strategy) < debt
+    gas("withdraw_liquidate_position", tx)
+
+
+def test_harvest_debt_ratio_decrease(
+    vault, strategy, token, token_whale, gov, vdToken, gas
+):
+    deposit_and_harvest(vault, strategy, token, token_whale, gov)
+    debt = vdToken.balanceOf(strategy)
+
+    vault.updateStrategyDebtRatio(strategy, 5_000, {"from": gov})
+    chain.sleep(1)
+    tx = strategy.harvest({"from": gov})
+    assert vdToken.balanceOf(strategy) < debt
+    gas("harvest_debt_ratio_decrease", tx)
+
+
+def test_withdraw_buys_investment_token_with_want(
+    vault, strategy, token, token_whale, gov, vdToken, yvault, gas
+):
+    deposit_and_harvest(vault, strategy, token, token_whale, gov)
+
+    debt = vdToken.balanceOf(strategy)
+
+    # the yVault position is gone, so debt can only be repaid by selling want.
+    # The want freed first has to cover it: a full withdrawal needs a flash
+    # loan (see test_flash_loan)
+    strategy_account = accounts.at(strategy.address, force=True)
+    yvault.transfer(gov, yvault.balanceOf(strategy), {"from": strategy_account})
+
+    tx = vault.withdraw(
+        vault.balanceOf(token_whale) * 6 // 10,
+        token_whale,
+        10_000,
+        {"from": token_whale},
+    )
+    assert vdToken.balanceOf(strategy) < debt
+    gas("withdraw_buy_investment_token_loss", tx)
+
+
+def test_harvest_claim_rewards(
+    vault,
+    strategy,
+    token,
+    token_whale,
+    gov,
+    stkAave,
+    token_incentivised,
+    borrow_incentivised,
+    gas,
+):
+    if not (token_incentivised or borrow_incentivised):
+        pytest.skip("no Aave rewards for this pair")
+    deposit_and_harvest(vault, strategy, token, token_whale, gov)
+
+    chain.sleep(2 * 24 * 3600)
+    chain.mine(1)
+    tx = strategy.harvest({"from": gov})
+    assert stkAave.stakersCooldowns(strategy) != 0
+    assert tx.events["StartedCooldown"]["stkAaveBalance"] == stkAave.balanceOf(strategy)
+    gas("harvest_claim_rewards_start_cooldown", tx)
+
+    chain.sleep(10 * 24 * 3600 + 1)
+    chain.mine(1)
+    tx = strategy.harvest({"from": gov})
+    assert "Redeem" in tx.events
+    assert tx.events["SoldAave"]["wantAmount"] > 0
+    gas("harvest_redeem_and_sell_aave", tx)
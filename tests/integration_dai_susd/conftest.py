@@ -1,5 +1,13 @@
 import pytest
-from brownie import Contract, ZERO_ADDRESS
+from brownie import Contract, ZERO_ADDRESS, network
+
+import contract_registry
+
+
+def pytest_runtest_setup(item):
+    # these tests deploy against live mainnet vaults, there are no mocks for them
+    if "fork" not in network.show_active():
+        pytest.skip("integration tests need a mainnet fork")
 
 
 @pytest.fixture(scope="session")
@@ -19,13 +27,13 @@ def vault():
 
 @pytest.fixture(scope="session")
 def gov(accounts):
-    vault = Contract("0xdA816459F1AB5631232FE5e97a05BBBb94970c95")
+    vault = contract_registry.contract("0xdA816459F1AB5631232FE5e97a05BBBb94970c95")
     yield accounts.at(vault.governance(), force=True)
 
 
 @pytest.fixture(scope="session")
 def dai():
-    yield Contract("0x6B175474E89094C44Da98b954EedeAC495271d0F")
+    yield contract_registry.contract("0x6B175474E89094C44Da98b954EedeAC495271d0F")
 
 
 @pytest.fixture(scope="session")
@@ -35,12 +43,12 @@ def dai_whale():
 
 @pytest.fixture(scope="session")
 def vdsusd():
-    yield Contract("0xdC6a3Ab17299D9C2A412B0e0a4C1f55446AE0817")
+    yield contract_registry.contract("0xdC6a3Ab17299D9C2A412B0e0a4C1f55446AE0817")
 
 
 @pytest.fixture(scope="session")
 def susd():
-    yield Contract("0x57Ab1ec28D129707052df4dF418D58a2D46d5f51")
+    yield contract_registry.contract("0x57Ab1ec28D129707052df4dF418D58a2D46d5f51")
 
 
 @pytest.fixture(scope="session")
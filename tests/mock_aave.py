@@ -0,0 +1,246 @@
+"""
+Local stand-in for the Aave V2 market, yVaults and DEX routers the strategy
+talks to, so the suite can run on a plain development chain with no network.
+
+Strategy and AaveLenderBorrowerLib read some mainnet contracts from constants
+(protocol data provider, stkAAVE, AAVE, WETH, routers, base fee oracle and
+health check). Those mocks are deployed normally and their runtime code is then
+copied to the hardcoded address, which needs a node that supports setting code
+(ganache >= 7, hardhat or anvil).
+"""
+from brownie import (
+    Contract,
+    MockAToken,
+    MockBaseFee,
+    MockERC20,
+    MockHealthCheck,
+    MockIncentivesController,
+    MockLendingPool,
+    MockLendingPoolAddressesProvider,
+    MockPriceOracle,
+    MockProtocolDataProvider,
+    MockReserveInterestRateStrategy,
+    MockRouter,
+    MockStakedAave,
+    MockVariableDebtToken,
+    MockYVault,
+    ZERO_ADDRESS,
+    web3,
+)
+
+PROTOCOL_DATA_PROVIDER = "0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d"
+STKAAVE = "0x4da27a545c0c5B758a6BA100e3a049001de870f5"
+AAVE = "0x7Fc66500c84A76Ad7e9c93437bFc5Ac33E2DDaE9"
+WETH = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+SUSHISWAP_ROUTER = "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F"
+UNISWAP_ROUTER = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
+BASE_FEE_PROVIDER = "0xf8d0Ec04e94296773cE20eFbeeA82e76220cD549"
+HEALTH_CHECK = "0xDDCea799fF1699e98EDF118e0629A974Df7DF012"
+
+RAY = 10 ** 27
+
+# symbol: (decimals, price in ETH, LTV, liquidation threshold, incentivised)
+RESERVES = {
+    "WBTC": (8, 15 * 10 ** 18, 7_000, 7_500, True),
+    "YFI": (18, 10 * 10 ** 18, 4_000, 5_500, False),
+    "WETH": (18, 10 ** 18, 8_000, 8_250, True),
+    "LINK": (18, 5 * 10 ** 15, 7_000, 7_500, False),
+    "USDT": (6, 4 * 10 ** 14, 0, 0, True),
+    "DAI": (18, 4 * 10 ** 14, 7_500, 8_000, True),
+    "USDC": (6, 4 * 10 ** 14, 8_000, 8_500, True),
+    "sUSD": (18, 4 * 10 ** 14, 0, 0, True),
+    "SNX": (18, 3 * 10 ** 15, 1_500, 4_000, False),
+}
+
+YVAULTS = {
+    "yvWBTC": "WBTC",
+    "yvWETH": "WETH",
+    "yvUSDT": "USDT",
+    "yvUSDC": "USDC",
+    "yvDAI": "DAI",
+    "yvSUSD": "sUSD",
+    "yvSNX": "SNX",
+}
+
+# (optimal utilization, base rate, slope1, slope2) as in Aave's stablecoin IRS
+INTEREST_RATE_STRATEGY = (RAY * 8 // 10, 0, RAY * 4 // 100, RAY * 75 // 100)
+
+AAVE_PRICE = 10 ** 17
+BASE_FEE = 100 * 10 ** 9  # tests on shouldRebalance assume a 100 gwei base fee
+
+# every reserve starts with this much liquidity, partly borrowed
+RESERVE_LIQUIDITY_ETH = 50_000 * 10 ** 18
+RESERVE_UTILIZATION_BPS = 4_000
+WHALE_BALANCE = 10 ** 9  # whole tokens minted to the whale for each reserve
+
+# liquidity mining emissions, per second per whole token held
+REWARDS_PER_TOKEN_PER_SECOND = 10 ** 8
+STAKING_REWARDS_PER_SECOND = 10 ** 11
+
+
+def set_code(target, source):
+    """Copy the runtime code of `source` to `target` and return a handle on it."""
+    code = web3.eth.get_code(source.address).hex()
+    for method in ("evm_setAccountCode", "hardhat_setCode", "anvil_setCode"):
+        if "error" not in web3.provider.make_request(method, [target, code]):
+            return Contract.from_abi(source._name, target, source.abi)
+    raise RuntimeError(
+        "The development node cannot set contract code, use ganache >= 7, "
+        "hardhat or anvil to run the suite against the Aave mocks"
+    )
+
+
+class MockAave:
+    """Handles on a deployed mock market, keyed by reserve symbol."""
+
+    def __init__(self, whale):
+        self.whale = whale
+        self.tokens = {}
+        self.a_tokens = {}
+        self.variable_debt_tokens = {}
+        self.interest_rate_strategies = {}
+        self.yvaults = {}
+        self._contracts = {}
+
+    def contract(self, address):
+        """Return the mock deployed at `address`."""
+        return self._contracts[str(address).lower()]
+
+    def _track(self, *contracts):
+        for contract in contracts:
+            self._contracts[contract.address.lower()] = contract
+
+    def set_price(self, symbol, price):
+        self.price_oracle.setAssetPrice(
+            self.tokens[symbol], price, {"from": self.whale}
+        )
+
+    def set_interest_rate_strategy(self, symbol, *params, update=True):
+        """
+        Move a reserve to a new strategy with `params` (optimal utilization,
+        base rate, slope1, slope2), as Aave governance does: mainnet strategies
+        cannot be changed once deployed. `interest_rate_strategies` keeps the
+        ones deployed with the market, tests revert to them.
+
+        The pool emits nothing when the strategy changes. With `update` the
+        reserve's rates are then recomputed, as any action on it would do.
+        """
+        tx = {"from": self.whale}
+        irs = MockReserveInterestRateStrategy.deploy(*params, tx)
+        self.lending_pool.setReserveInterestRateStrategyAddress(
+            self.tokens[symbol], irs, tx
+        )
+        if update:
+            self.lending_pool.updateReserve(self.tokens[symbol], tx)
+        self._track(irs)
+        return irs
+
+
+def deploy(deployer, whale):
+    """Deploy the mock market and fund `whale` with every reserve token."""
+    tx = {"from": deployer}
+    aave = MockAave(whale)
+
+    aave.addresses_provider = MockLendingPoolAddressesProvider.deploy(tx)
+    aave.price_oracle = MockPriceOracle.deploy(tx)
+    aave.addresses_provider.setPriceOracle(aave.price_oracle, tx)
+    aave.lending_pool = MockLendingPool.deploy(aave.addresses_provider, tx)
+    aave.addresses_provider.setLendingPoolImpl(aave.lending_pool, tx)
+
+    aave.data_provider = set_code(
+        PROTOCOL_DATA_PROVIDER, MockProtocolDataProvider.deploy(tx)
+    )
+    aave.data_provider.initialize(aave.addresses_provider, tx)
+
+    aave.aave = set_code(AAVE, MockERC20.deploy("Aave Token", "AAVE", 18, tx))
+    aave.aave.initialize("Aave Token", "AAVE", 18, tx)
+    aave.price_oracle.setAssetPrice(aave.aave, AAVE_PRICE, tx)
+
+    aave.stkaave = set_code(STKAAVE, MockStakedAave.deploy(tx))
+    aave.stkaave.initialize(aave.aave, STAKING_REWARDS_PER_SECOND, tx)
+    aave.incentives_controller = MockIncentivesController.deploy(aave.stkaave, tx)
+
+    for symbol, (decimals, price, ltv, threshold, incentivised) in RESERVES.items():
+        if symbol == "WETH":
+            token = set_code(WETH, MockERC20.deploy(symbol, symbol, decimals, tx))
+            token.initialize(symbol, symbol, decimals, tx)
+        else:
+            token = MockERC20.deploy(symbol, symbol, decimals, tx)
+        aave.price_oracle.setAssetPrice(token, price, tx)
+
+        controller = aave.incentives_controller if incentivised else ZERO_ADDRESS
+        irs = MockReserveInterestRateStrategy.deploy(*INTEREST_RATE_STRATEGY, tx)
+        a_token = MockAToken.deploy(
+            aave.lending_pool, token, controller, f"Aave {symbol}", f"a{symbol}", tx
+        )
+        vd_token = MockVariableDebtToken.deploy(
+            aave.lending_pool,
+            token,
+            controller,
+            f"Aave variable debt {symbol}",
+            f"variableDebt{symbol}",
+            tx,
+        )
+        aave.lending_pool.initReserve(token, a_token, vd_token, irs, ltv, threshold, tx)
+        if incentivised:
+            emission = REWARDS_PER_TOKEN_PER_SECOND * 10 ** (18 - decimals)
+            aave.incentives_controller.configureAsset(a_token, emission, tx)
+            aave.incentives_controller.configureAsset(vd_token, emission, tx)
+
+        token.mint(whale, WHALE_BALANCE * 10 ** decimals, tx)
+
+        aave.tokens[symbol] = token
+        aave.a_tokens[symbol] = a_token
+        aave.variable_debt_tokens[symbol] = vd_token
+        aave.interest_rate_strategies[symbol] = irs
+        aave._track(token, a_token, vd_token, irs)
+
+    for name, symbol in YVAULTS.items():
+        yvault = MockYVault.deploy(aave.tokens[symbol], deployer, tx)
+        yvault.setDepositLimit(2 ** 256 - 1, tx)
+        aave.yvaults[name] = yvault
+        aave._track(yvault)
+
+    aave.sushiswap = set_code(SUSHISWAP_ROUTER, MockRouter.deploy(tx))
+    aave.uniswap = set_code(UNISWAP_ROUTER, MockRouter.deploy(tx))
+    for router in (aave.sushiswap, aave.uniswap):
+        router.setPriceOracle(aave.price_oracle, tx)
+
+    aave.base_fee = set_code(BASE_FEE_PROVIDER, MockBaseFee.deploy(tx))
+    aave.base_fee.setBaseFee(BASE_FEE, tx)
+    aave.health_check = set_code(HEALTH_CHECK, MockHealthCheck.deploy(tx))
+
+    aave._track(
+        aave.addresses_provider,
+        aave.price_oracle,
+        aave.lending_pool,
+        aave.data_provider,
+        aave.aave,
+        aave.stkaave,
+        aave.incentives_controller,
+    )
+    _seed_reserves(aave, deployer)
+    return aave
+
+
+def _seed_reserves(aave, supplier):
+    # deposit liquidity in every reserve, then borrow part of it back so rates
+    # are above the base rate and calcMaxDebt has a utilization to work with
+    tx = {"from": supplier}
+    amounts = {}
+    for symbol, (decimals, price, *_) in RESERVES.items():
+        token = aave.tokens[symbol]
+        amounts[symbol] = RESERVE_LIQUIDITY_ETH * 10 ** decimals // price
+        token.mint(supplier, amounts[symbol], tx)
+        token.approve(aave.lending_pool, 2 ** 256 - 1, tx)
+        aave.lending_pool.deposit(token, amounts[symbol], supplier, 0, tx)
+
+    for symbol, amount in amounts.items():
+        aave.lending_pool.borrow(
+            aave.tokens[symbol],
+            amount * RESERVE_UTILIZATION_BPS // 10_000,
+            2,
+            0,
+            supplier,
+            tx,
+        )
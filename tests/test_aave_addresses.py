@@ -0,0 +1,44 @@
+import pytest
+from brownie import MockPriceOracle
+
+RAY = 10 ** 27
+
+
+def test_resolved_overloads_match(AaveLibrary, borrow_token, lendingPool):
+    # the strategy passes the addresses it cached to these overloads
+    price_oracle = AaveLibrary.priceOracle()
+    resolving = AaveLibrary.calcMaxDebt["address,uint256"]
+    resolved = AaveLibrary.calcMaxDebt["address,address,address,uint256"]
+    assert resolved(lendingPool, price_oracle, borrow_token, RAY) == resolving(
+        borrow_token, RAY
+    )
+
+    resolving = AaveLibrary.toETH["uint256,address"]
+    resolved = AaveLibrary.toETH["uint256,address,address"]
+    assert resolved(RAY, borrow_token, price_oracle) == resolving(RAY, borrow_token)
+
+
+def test_refresh_aave_addresses(strategy, gov, token, aave_mock):
+    if not aave_mock:
+        pytest.skip("the addresses provider can only be changed on the mock")
+
+    amount = 10 ** 18
+    want_amount = strategy.ethToWant(amount)
+
+    # Aave moves to a new oracle that quotes want at twice the price
+    price_oracle = MockPriceOracle.deploy({"from": gov})
+    for asset in aave_mock.tokens.values():
+        price = aave_mock.price_oracle.getAssetPrice(asset)
+        price_oracle.setAssetPrice(asset, price, {"from": gov})
+    price_oracle.setAssetPrice(
+        token, aave_mock.price_oracle.getAssetPrice(token) * 2, {"from": gov}
+    )
+    aave_mock.addresses_provider.setPriceOracle(price_oracle, {"from": gov})
+
+    # the strategy keeps using the oracle it resolved until told otherwise
+    assert strategy.priceOracle() == aave_mock.price_oracle
+    assert strategy.ethToWant(amount) == want_amount
+
+    strategy.refreshAaveAddresses({"from": gov})
+    assert strategy.priceOracle() == price_oracle
+    assert strategy.ethToWant(amount) == want_amount // 2
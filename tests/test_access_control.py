@@ -25,3 +25,26 @@ def test_switch_dex_acl(strategy, gov, strategist, management, guardian, user):
 
     strategy.switchDex(False, {"from": gov})
     assert strategy.router() == sushiswap
+
+
+def test_refresh_aave_addresses_acl(
+    strategy, gov, strategist, management, guardian, user
+):
+    with reverts("!authorized"):
+        strategy.refreshAaveAddresses({"from": user})
+
+    for account in [strategist, guardian, management, gov]:
+        strategy.refreshAaveAddresses({"from": account})
+
+
+def test_set_flash_loan_unwind_acl(
+    strategy, gov, strategist, management, guardian, user
+):
+    for account in [user, guardian, strategist]:
+        with reverts("!authorized"):
+            strategy.setFlashLoanUnwind(True, {"from": account})
+
+    strategy.setFlashLoanUnwind(True, {"from": management})
+    assert strategy.flashLoanUnwind()
+    strategy.setFlashLoanUnwind(False, {"from": gov})
+    assert not strategy.flashLoanUnwind()
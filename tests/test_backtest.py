@@ -0,0 +1,160 @@
+import csv
+
+import pytest
+from brownie import interface
+
+from scripts.aave_lender_borrower_lib import calculate_amount_to_repay
+from scripts.backtest import Backtest, read_blocks, sample
+from scripts.strategy_model import Block, StrategyParams, adjust_position
+
+RAY = 10 ** 27
+
+# amount, collateral, debt, warning LTV, target LTV, min threshold (all in ETH)
+REPAY_CASES = [
+    (0, 1_000 * 10 ** 18, 400 * 10 ** 18, 6_400, 4_800, 10 ** 16),
+    (10 ** 18, 1_000 * 10 ** 18, 400 * 10 ** 18, 6_400, 4_800, 10 ** 16),
+    (500 * 10 ** 18, 1_000 * 10 ** 18, 400 * 10 ** 18, 6_400, 4_800, 10 ** 16),
+    (1_000 * 10 ** 18, 1_000 * 10 ** 18, 400 * 10 ** 18, 6_400, 4_800, 10 ** 16),
+    (2_000 * 10 ** 18, 1_000 * 10 ** 18, 400 * 10 ** 18, 6_400, 4_800, 10 ** 16),
+    (380 * 10 ** 18, 1_000 * 10 ** 18, 400 * 10 ** 18, 6_400, 4_800, 10 ** 24),
+    (200 * 10 ** 18, 1_000 * 10 ** 18, 10 ** 15, 0, 4_800, 10 ** 16),
+]
+
+
+def expected_adjustment(AaveLibrary, lendingPool, strategy, borrow_token):
+    collateral, debt, available, lt, _, _ = lendingPool.getUserAccountData(strategy)
+    return adjust_position(
+        collateral,
+        debt,
+        available,
+        lt,
+        strategy.targetLTVMultiplier(),
+        strategy.warningLTVMultiplier(),
+        AaveLibrary.calcMaxDebt(borrow_token, strategy.acceptableCostsRay()),
+        AaveLibrary.toETH(strategy.maxTotalBorrowIT(), borrow_token)
+        if strategy.maxTotalBorrowIT() < 2 ** 256 - 1
+        else 2 ** 256 - 1,
+    )
+
+
+@pytest.mark.parametrize("case", REPAY_CASES)
+def test_calculate_amount_to_repay_port(AaveLibrary, borrow_token, case):
+    price_oracle = interface.IPriceOracle(AaveLibrary.priceOracle())
+    price = price_oracle.getAssetPrice(borrow_token)
+    assert calculate_amount_to_repay(
+        *case, price, borrow_token.decimals()
+    ) == AaveLibrary.calculateAmountToRepay(*case[:5], borrow_token, case[5])
+
+
+def test_adjust_position_port_borrow(
+    levered,
+    AaveLibrary,
+    strategy,
+    borrow_token,
+    vdToken,
+    lendingPool,
+    gov,
+    set_strategy_params,
+    RELATIVE_APPROX,
+):
+    set_strategy_params(
+        strategy, targetLTVMultiplier=strategy.targetLTVMultiplier() + 1_000
+    )
+    adjustment = expected_adjustment(AaveLibrary, lendingPool, strategy, borrow_token)
+    assert adjustment.borrow > 0 and adjustment.repay == 0
+
+    debt = vdToken.balanceOf(strategy)
+    strategy.tend({"from": gov})
+    assert pytest.approx(vdToken.balanceOf(strategy) - debt, rel=RELATIVE_APPROX) == (
+        AaveLibrary.fromETH(adjustment.borrow, borrow_token)
+    )
+
+
+def test_adjust_position_port_repay(
+    past_warning,
+    AaveLibrary,
+    strategy,
+    borrow_token,
+    lendingPool,
+    gov,
+    RELATIVE_APPROX,
+):
+    adjustment = expected_adjustment(AaveLibrary, lendingPool, strategy, borrow_token)
+    assert adjustment.borrow == 0 and adjustment.repay > 0
+
+    tx = strategy.tend({"from": gov})
+    assert (
+        pytest.approx(tx.events["RepayDebt"]["repayAmount"], rel=RELATIVE_APPROX)
+        == adjustment.repay
+    )
+
+
+def synthetic_blocks(count, crash_at):
+    # DAI/sUSD like market, want loses 30% of its value at `crash_at`
+    for i in range(count):
+        yield Block(
+            block_number=12_000_000 + i,
+            timestamp=1_620_000_000 + 13 * i,
+            base_fee=50 * 10 ** 9,
+            available_liquidity=10 ** 24,
+            total_stable_debt=0,
+            total_variable_debt=10 ** 24,
+            variable_borrow_rate=RAY * 3 // 100,
+            optimal_rate=RAY * 8 // 10,
+            base_rate=0,
+            slope1=RAY * 4 // 100,
+            slope2=RAY * 3 // 4,
+            want_liquidity_rate=RAY * 2 // 100,
+            want_price=4 * 10 ** 14 if i < crash_at else 28 * 10 ** 13,
+            investment_token_price=4 * 10 ** 14,
+            price_per_share=10 ** 18 + i * 10 ** 10,
+        )
+
+
+def test_backtest_from_csv(tmp_path):
+    path = tmp_path / "blocks.csv"
+    with path.open("w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(Block._fields)
+        writer.writerows(synthetic_blocks(2_000, crash_at=1_000))
+
+    params = [
+        StrategyParams(6_000, 8_000, RAY, 100 * 10 ** 9),
+        # tending is never cheap enough
+        StrategyParams(6_000, 8_000, RAY, 10 ** 9),
+    ]
+    blocks = list(sample(read_blocks(path), 5))
+    assert len(blocks) == 400
+    assert blocks[1].block_number == 12_000_005
+
+    tended, not_tended = Backtest(params, chunk_size=64).run(blocks)
+    assert tended.blocks == not_tended.blocks == 400
+    # the crash pushes LTV over warning LTV, which is repaid regardless of gas
+    assert tended.tends == not_tended.tends == 1
+    assert tended.gas_spent == not_tended.gas_spent == 10 ** 6 * 50 * 10 ** 9
+    assert tended.borrow_cost > 0
+    assert tended.liquidations == 0
+    assert tended.pnl == tended.final_assets - tended.capital - tended.gas_spent_want
+
+    # evaluating calcMaxDebt in chunks does not change the outcome
+    assert Backtest(params, chunk_size=1).run(blocks) == [tended, not_tended]
+
+
+def test_backtest_from_parquet(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    blocks = list(synthetic_blocks(500, crash_at=250))
+    # uint256 columns stored as strings
+    table = pa.table(
+        {
+            field: [str(getattr(block, field)) for block in blocks]
+            for field in Block._fields
+        }
+    )
+    path = tmp_path / "blocks.parquet"
+    pq.write_table(table, path)
+
+    assert list(read_blocks(path)) == blocks
+    params = [StrategyParams(6_000, 8_000, RAY, 100 * 10 ** 9)]
+    assert Backtest(params).run(read_blocks(path)) == Backtest(params).run(blocks)
@@ -0,0 +1,148 @@
+import pytest
+from brownie import chain, reverts
+
+MAX_GAS_PRICE_TO_TEND = 1_000 * 10 ** 9
+
+
+@pytest.fixture
+def batch_keeper(gov, AaveLenderBorrowerBatchKeeper):
+    yield gov.deploy(AaveLenderBorrowerBatchKeeper)
+
+
+@pytest.fixture
+def clone(
+    Strategy,
+    vault,
+    strategy,
+    cloner,
+    strategist,
+    rewards,
+    yvault,
+    gov,
+    token_incentivised,
+    borrow_incentivised,
+    batch_keeper,
+):
+    tx = cloner.cloneAaveLenderBorrower(
+        vault,
+        strategist,
+        rewards,
+        batch_keeper,
+        yvault,
+        token_incentivised,
+        borrow_incentivised,
+        "StrategyAaveLenderBorrowerClone",
+    )
+    clone = Strategy.at(tx.events["Cloned"]["clone"])
+    vault.updateStrategyDebtRatio(strategy, 5_000, {"from": gov})
+    vault.addStrategy(clone, 5_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    strategy.setKeeper(batch_keeper, {"from": gov})
+    yield clone
+
+
+@pytest.fixture
+def strategies(vault, strategy, clone, token, token_whale, gov, set_strategy_params):
+    token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+    vault.deposit(500_000 * (10 ** token.decimals()), {"from": token_whale})
+    chain.sleep(1)
+    for s in (strategy, clone):
+        set_strategy_params(s, maxGasPriceToTend=MAX_GAS_PRICE_TO_TEND)
+        s.harvest({"from": gov})
+    yield [strategy, clone]
+
+
+def test_tends_only_triggered_strategies(
+    strategies, batch_keeper, vdToken, gov, user, set_strategy_params
+):
+    strategy, clone = strategies
+    # 10p.p. over the current LTV, the strategy has to take on more debt
+    set_strategy_params(strategy, targetLTVMultiplier=strategy.warningLTVMultiplier())
+    assert batch_keeper.workable(strategies + [user], 0, False) == [
+        True,
+        False,
+        False,
+    ]
+
+    debt = vdToken.balanceOf(strategy)
+    clone_debt = vdToken.balanceOf(clone)
+    tx = batch_keeper.tendMany(strategies + [user], 0, {"from": gov})
+
+    results = [result.dict() for result in tx.return_value]
+    assert [r["strategy"] for r in results] == strategies + [user]
+    assert [r["triggered"] for r in results] == [True, False, False]
+    assert results[0]["success"] and results[0]["gasUsed"] > 0
+    assert results[1]["gasUsed"] == results[2]["gasUsed"] == 0
+    assert tx.events["Executed"]["strategy"] == strategy
+    assert tx.events["Executed"]["gasUsed"] == results[0]["gasUsed"]
+    assert vdToken.balanceOf(strategy) > debt
+    assert vdToken.balanceOf(clone) == clone_debt
+    assert not strategy.tendTrigger(0)
+
+
+def test_failure_does_not_revert_batch(
+    strategies, batch_keeper, vdToken, keeper, gov, set_strategy_params
+):
+    strategy, clone = strategies
+    for s in strategies:
+        set_strategy_params(s, targetLTVMultiplier=s.warningLTVMultiplier())
+    # the batch keeper is not allowed to tend this one anymore
+    strategy.setKeeper(keeper, {"from": gov})
+
+    clone_debt = vdToken.balanceOf(clone)
+    tx = batch_keeper.tendMany(strategies, 0, {"from": gov})
+
+    failed, tended = [result.dict() for result in tx.return_value]
+    assert failed["triggered"] and not failed["success"]
+    assert tended["triggered"] and tended["success"]
+    assert tx.events["Failed"]["strategy"] == strategy
+    assert tx.events["Executed"]["strategy"] == clone
+    assert vdToken.balanceOf(clone) > clone_debt
+    assert strategy.tendTrigger(0)
+
+
+def test_batch_is_cheaper_than_separate_tends(
+    strategies, batch_keeper, gov, snapshots, set_strategy_params
+):
+    for s in strategies:
+        set_strategy_params(s, targetLTVMultiplier=s.warningLTVMultiplier())
+
+    with snapshots.checkpoint():
+        separate = sum(s.tend({"from": gov}).gas_used for s in strategies)
+
+    tx = batch_keeper.tendMany(strategies, 0, {"from": gov})
+    assert all(result.dict()["success"] for result in tx.return_value)
+    assert tx.gas_used < separate
+
+
+def test_harvest_many(strategies, batch_keeper, gov):
+    strategy, clone = strategies
+    clone.setMaxReportDelay(0, {"from": gov})
+    chain.sleep(1)
+    chain.mine()
+    assert clone.harvestTrigger(0)
+
+    tx = batch_keeper.harvestMany(strategies, 0, {"from": gov})
+    harvested = [result.dict() for result in tx.return_value][1]
+    assert harvested["triggered"] and harvested["success"]
+    assert clone in [event["strategy"] for event in tx.events["Executed"]]
+    assert all(event["harvest"] for event in tx.events["Executed"])
+
+
+def test_batch_keeper_acl(batch_keeper, strategy, gov, keeper, user):
+    with reverts("dev: !keeper"):
+        batch_keeper.tendMany([strategy], 0, {"from": keeper})
+    with reverts("dev: !governance"):
+        batch_keeper.setKeeper(keeper, True, {"from": user})
+
+    batch_keeper.setKeeper(keeper, True, {"from": gov})
+    batch_keeper.tendMany([strategy], 0, {"from": keeper})
+    batch_keeper.harvestMany([strategy], 0, {"from": keeper})
+
+    batch_keeper.setKeeper(keeper, False, {"from": gov})
+    with reverts("dev: !keeper"):
+        batch_keeper.harvestMany([strategy], 0, {"from": keeper})
+
+    with reverts("dev: !governance"):
+        batch_keeper.setGovernance(user, {"from": user})
+    batch_keeper.setGovernance(user, {"from": gov})
+    assert batch_keeper.governance() == user
@@ -0,0 +1,123 @@
+import random
+
+import brownie
+import numpy as np
+import pytest
+from brownie import interface
+
+from scripts.aave_lender_borrower_lib import (
+    RAY,
+    Revert,
+    calc_max_debt,
+    calc_max_debt_batch,
+)
+
+
+def reserve_inputs(AaveLibrary, lendingPool, token):
+    # everything calcMaxDebt reads on-chain, in the port's argument order
+    data_provider = interface.IProtocolDataProvider(AaveLibrary.protocolDataProvider())
+    liquidity, stable_debt, variable_debt, *_ = data_provider.getReserveData(token)
+    irs = interface.IReserveInterestRateStrategy(
+        lendingPool.getReserveData(token).dict()["interestRateStrategyAddress"]
+    )
+    oracle = interface.IPriceOracle(AaveLibrary.priceOracle())
+    return dict(
+        available_liquidity=liquidity,
+        total_stable_debt=stable_debt,
+        total_variable_debt=variable_debt,
+        optimal_rate=irs.OPTIMAL_UTILIZATION_RATE(),
+        base_rate=irs.baseVariableBorrowRate(),
+        slope1=irs.variableRateSlope1(),
+        slope2=irs.variableRateSlope2(),
+        price=oracle.getAssetPrice(token),
+        decimals=token.decimals(),
+    )
+
+
+def acceptable_costs(inputs):
+    # both sides of every kink of the rate curve plus a spread of random values
+    kinks = [inputs["base_rate"], inputs["base_rate"] + inputs["slope1"]]
+    costs = [0, 1, RAY, 2 * RAY] + [k + d for k in kinks for d in (-1, 0, 1)]
+    rng = random.Random(42)
+    costs += [rng.randrange(2 * RAY) for _ in range(20)]
+    return [c for c in costs if c >= 0]
+
+
+def assert_port_matches_library(AaveLibrary, token, inputs, costs):
+    batch = calc_max_debt_batch(acceptable_costs_ray=costs, **inputs)
+    for i, cost in enumerate(costs):
+        if batch.reverted[i]:
+            with brownie.reverts():
+                AaveLibrary.calcMaxDebt(token, cost)
+            with pytest.raises(Revert):
+                calc_max_debt(acceptable_costs_ray=cost, **inputs)
+            continue
+
+        expected = tuple(AaveLibrary.calcMaxDebt(token, cost))
+        assert (
+            batch.current_protocol_debt[i],
+            batch.max_protocol_debt[i],
+            batch.target_utilisation[i],
+        ) == expected
+        assert calc_max_debt(acceptable_costs_ray=cost, **inputs) == expected
+
+
+def test_port_matches_library(AaveLibrary, lendingPool, borrow_token):
+    inputs = reserve_inputs(AaveLibrary, lendingPool, borrow_token)
+    assert_port_matches_library(
+        AaveLibrary, borrow_token, inputs, acceptable_costs(inputs)
+    )
+
+
+@pytest.mark.parametrize(
+    "optimal,base,slope1,slope2",
+    [
+        (RAY * 8 // 10, RAY // 100, RAY * 4 // 100, RAY * 75 // 100),
+        # seeded utilization is 40%, so this reserve is above optimal
+        (RAY * 3 // 10, 0, RAY * 7 // 100, RAY * 3),
+        # broken strategies the library reverts on
+        (RAY * 8 // 10, RAY // 50, RAY // 100, RAY),
+        (RAY * 3 // 10, 0, RAY // 100, 0),
+    ],
+)
+def test_port_matches_library_across_curves(
+    AaveLibrary, lendingPool, borrow_token, aave_mock, optimal, base, slope1, slope2
+):
+    if not aave_mock:
+        pytest.skip("interest rate strategies can only be changed on the mock")
+
+    irs = aave_mock.interest_rate_strategies[borrow_token.symbol()]
+    irs.setParams(optimal, base, slope1, slope2, {"from": aave_mock.whale})
+    inputs = reserve_inputs(AaveLibrary, lendingPool, borrow_token)
+    assert_port_matches_library(
+        AaveLibrary, borrow_token, inputs, acceptable_costs(inputs)
+    )
+
+
+def test_batch_broadcasts_reserve_scenarios():
+    liquidity = np.array([10 ** 24, 4 * 10 ** 23, 0], dtype=object)
+    costs = [RAY // 100, RAY // 10]
+    result = calc_max_debt_batch(
+        liquidity[:, None],
+        0,
+        6 * 10 ** 23,
+        RAY * 8 // 10,
+        0,
+        RAY * 4 // 100,
+        RAY * 75 // 100,
+        costs,
+    )
+    assert result.max_protocol_debt.shape == (3, 2)
+    for i in range(3):
+        for j, cost in enumerate(costs):
+            scalar = calc_max_debt(
+                liquidity[i],
+                0,
+                6 * 10 ** 23,
+                RAY * 8 // 10,
+                0,
+                RAY * 4 // 100,
+                RAY * 75 // 100,
+                cost,
+            )
+            assert scalar[1] == result.max_protocol_debt[i, j]
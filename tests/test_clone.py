@@ -15,13 +15,13 @@ def test_clone(
     borrow_whale,
     yvault,
     cloner,
+    lendingPool,
+    snx_yvault,
+    snx,
+    snx_whale,
 ):
-    pd_provider = Contract("0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d")
-    a_provider = Contract(pd_provider.ADDRESSES_PROVIDER())
-    lp = Contract(a_provider.getLendingPool())
-    vault_snx = Contract("0xF29AE508698bDeF169B89834F76704C3B205aedf")
-    snx = Contract(vault_snx.token())
-    snx_whale = "0xA1d7b2d891e3A1f9ef4bBC5be20630C2FEB1c470"
+    lp = lendingPool
+    vault_snx = snx_yvault
     clone_tx = cloner.cloneAaveLenderBorrower(
         vault,
         strategist,
@@ -50,7 +50,7 @@ def test_clone(
         {"from": strategy.strategist()},
     )
 
-    uniswap = Contract("0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D")
+    uniswap = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
     cloned_strategy.switchDex(True, {"from": gov})
     assert cloned_strategy.router() == uniswap
 
@@ -98,8 +98,10 @@ def test_clone(
     vault.withdraw({"from": token_whale})
 
 
-def test_clone_of_clone(vault, strategist, rewards, keeper, strategy, cloner):
-    vault_snx = Contract("0xF29AE508698bDeF169B89834F76704C3B205aedf")
+def test_clone_of_clone(
+    vault, strategist, rewards, keeper, strategy, cloner, snx_yvault
+):
+    vault_snx = snx_yvault
 
     clone_tx = cloner.cloneAaveLenderBorrower(
         vault,
@@ -124,3 +126,88 @@ def print_debug(yvSNX, strategy, lp):
     print(f"yvSNX balance {yvSNX_balance} with pps {yvSNX_pps}")
     yvSNX_value = (yvSNX_balance * yvSNX_pps) / 1e18
     print(f"yvSNX value {yvSNX_value/1e18}SNX vs {totalDebtETH/1e18}ETH\n")
+
+
+def clone_params(vault, strategist, rewards, keeper, yvault, name, target):
+    return (
+        vault,
+        strategist,
+        rewards,
+        keeper,
+        yvault,
+        name,
+        target,  # targetLTVMultiplier
+        7_000,  # warningLTVMultiplier
+        5 * 10 ** 25,  # acceptableCostsRay
+        7,  # aaveReferral
+        10 ** 24,  # maxTotalBorrowIT
+        True,  # isWantIncentivised
+        False,  # isInvestmentTokenIncentivised
+        True,  # leaveDebtBehind
+        10,  # maxLoss
+        30 * 10 ** 9,  # maxGasPriceToTend
+    )
+
+
+def check_clone(Strategy, address, params):
+    clone = Strategy.at(address)
+    assert clone.vault() == params[0]
+    assert clone.strategist() == params[1]
+    assert clone.rewards() == params[2]
+    assert clone.keeper() == params[3]
+    assert clone.yVault() == params[4]
+    assert clone.name() == params[5]
+    assert clone.targetLTVMultiplier() == params[6]
+    assert clone.warningLTVMultiplier() == params[7]
+    assert clone.acceptableCostsRay() == params[8]
+    assert clone.maxTotalBorrowIT() == params[10]
+    assert clone.isWantIncentivised() == params[11]
+    assert clone.isInvestmentTokenIncentivised() == params[12]
+    assert clone.leaveDebtBehind() == params[13]
+    assert clone.maxLoss() == params[14]
+    assert clone.maxGasPriceToTend() == params[15]
+
+
+def test_deterministic_clone(
+    Strategy, vault, strategist, rewards, keeper, gov, cloner, snx_yvault
+):
+    params = clone_params(
+        vault, strategist, rewards, keeper, snx_yvault, "StrategyCreate2", 5_000
+    )
+    salt = "0x" + "01" * 32
+    predicted = cloner.predictCloneAddress(strategist, salt)
+
+    tx = cloner.cloneAaveLenderBorrowerDeterministic(params, salt, {"from": strategist})
+    assert tx.events["Cloned"]["clone"] == predicted
+    check_clone(Strategy, predicted, params)
+
+    with reverts("dev: salt already used"):
+        cloner.cloneAaveLenderBorrowerDeterministic(params, salt, {"from": strategist})
+
+    # salts are per caller
+    other = cloner.predictCloneAddress(gov, salt)
+    assert other != predicted
+    tx = cloner.cloneAaveLenderBorrowerDeterministic(params, salt, {"from": gov})
+    assert tx.events["Cloned"]["clone"] == other
+
+
+def test_batch_clone(
+    Strategy, vault, strategist, rewards, keeper, cloner, yvault, snx_yvault
+):
+    params = [
+        clone_params(vault, strategist, rewards, keeper, yv, f"StrategyBatch{i}", t)
+        for i, (yv, t) in enumerate(
+            [(yvault, 4_000), (snx_yvault, 5_000), (snx_yvault, 6_000)]
+        )
+    ]
+    salts = [f"0x{i:064x}" for i in range(len(params))]
+    predicted = [cloner.predictCloneAddress(strategist, salt) for salt in salts]
+
+    tx = cloner.cloneAaveLenderBorrowerBatch(params, salts, {"from": strategist})
+    assert tx.return_value == predicted
+    assert [event["clone"] for event in tx.events["Cloned"]] == predicted
+    for address, p in zip(predicted, params):
+        check_clone(Strategy, address, p)
+
+    with reverts("dev: length mismatch"):
+        cloner.cloneAaveLenderBorrowerBatch(params, salts[:2], {"from": strategist})
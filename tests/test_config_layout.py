@@ -0,0 +1,95 @@
+from brownie import reverts, web3
+
+RAY = 10 ** 27
+
+# Strategy.Config, in declaration order: (field, bits). Solidity packs the
+# fields of a slot from the lowest bits up
+CONFIG_LAYOUT = [
+    ("acceptableCostsRay", 96),
+    ("targetLTVMultiplier", 16),
+    ("warningLTVMultiplier", 16),
+    ("maxGasPriceToTend", 64),
+    ("maxLoss", 16),
+    ("referral", 16),
+    ("isWantIncentivised", 8),
+    ("isInvestmentTokenIncentivised", 8),
+    ("leaveDebtBehind", 8),
+    ("flashLoanUnwind", 8),
+]
+
+
+def pack_config(**fields):
+    word, offset = 0, 0
+    for field, bits in CONFIG_LAYOUT:
+        value = int(fields[field])
+        assert value < 2 ** bits
+        word |= value << offset
+        offset += bits
+    assert offset == 256
+    return word
+
+
+def storage(strategy, slot):
+    return int.from_bytes(web3.eth.get_storage_at(strategy.address, slot), "big")
+
+
+def find_slot(strategy, word, slots=64):
+    found = [slot for slot in range(slots) if storage(strategy, slot) == word]
+    assert len(found) == 1
+    return found[0]
+
+
+PARAMS = dict(
+    targetLTVMultiplier=5_123,
+    warningLTVMultiplier=7_456,
+    acceptableCostsRay=RAY * 7 // 100 + 1,
+    referral=42,
+    isWantIncentivised=True,
+    isInvestmentTokenIncentivised=False,
+    leaveDebtBehind=True,
+    maxLoss=9_999,
+    maxGasPriceToTend=123 * 10 ** 9,
+)
+
+
+def test_params_share_one_slot(strategy, set_strategy_params):
+    set_strategy_params(strategy, maxTotalBorrowIT=0xB0220, **PARAMS)
+
+    slot = find_slot(strategy, pack_config(flashLoanUnwind=False, **PARAMS))
+    # maxTotalBorrowIT is declared right after config, in its own slot
+    assert storage(strategy, slot + 1) == 0xB0220
+
+    for field, value in PARAMS.items():
+        if field != "referral":
+            assert getattr(strategy, field)() == value
+    assert strategy.maxTotalBorrowIT() == 0xB0220
+    assert not strategy.flashLoanUnwind()
+
+
+def test_set_flash_loan_unwind_keeps_params(strategy, gov, set_strategy_params):
+    set_strategy_params(strategy, **PARAMS)
+    slot = find_slot(strategy, pack_config(flashLoanUnwind=False, **PARAMS))
+    before = [storage(strategy, s) for s in range(slot + 2)]
+
+    strategy.setFlashLoanUnwind(True, {"from": gov})
+    assert storage(strategy, slot) == pack_config(flashLoanUnwind=True, **PARAMS)
+    assert [storage(strategy, s) for s in range(slot)] == before[:slot]
+    assert storage(strategy, slot + 1) == before[slot + 1]
+
+    # and setStrategyParams does not reset it
+    set_strategy_params(strategy, maxLoss=1)
+    assert strategy.flashLoanUnwind()
+    assert strategy.maxLoss() == 1
+
+
+def test_params_larger_than_their_field_revert(strategy, set_strategy_params):
+    with reverts():
+        set_strategy_params(strategy, acceptableCostsRay=2 ** 96)
+    with reverts():
+        set_strategy_params(strategy, maxGasPriceToTend=2 ** 64)
+
+    set_strategy_params(
+        strategy, acceptableCostsRay=2 ** 96 - 1, maxGasPriceToTend=2 ** 64 - 1
+    )
+    assert strategy.acceptableCostsRay() == 2 ** 96 - 1
+    assert strategy.maxGasPriceToTend() == 2 ** 64 - 1
@@ -0,0 +1,35 @@
+from brownie import chain
+
+
+def strategy_calls(tx, strategy, function):
+    # library calls are delegatecalls, so they are made from the strategy too
+    return [
+        call
+        for call in tx.subcalls
+        if call["from"] == strategy.address
+        and call.get("function", "").startswith(f"{function}(")
+    ]
+
+
+def test_withdrawal_reads_account_once(levered, vault, strategy, token_whale, vdToken):
+    debt = vdToken.balanceOf(strategy)
+
+    # repays debt and then withdraws collateral, with the account data and
+    # prices read before the repayment
+    tx = vault.withdraw(vault.balanceOf(token_whale) // 2, {"from": token_whale})
+    assert vdToken.balanceOf(strategy) < debt
+    assert len(strategy_calls(tx, strategy, "getUserAccountData")) == 1
+    assert len(strategy_calls(tx, strategy, "getAssetsPrices")) == 1
+    assert len(strategy_calls(tx, strategy, "getAssetPrice")) == 0
+
+
+def test_harvest_reads_account_once_per_step(levered, vault, strategy, gov, vdToken):
+    debt = vdToken.balanceOf(strategy)
+
+    # prepareReturn frees the debt outstanding, adjustPosition rebalances what
+    # is left: each reads the account once
+    vault.updateStrategyDebtRatio(strategy, 5_000, {"from": gov})
+    chain.sleep(1)
+    tx = strategy.harvest({"from": gov})
+    assert vdToken.balanceOf(strategy) < debt
+    assert len(strategy_calls(tx, strategy, "getUserAccountData")) == 2
@@ -0,0 +1,32 @@
+import json
+
+from brownie import interface
+
+import contract_registry
+
+
+def test_registry_resolves_locally():
+    data = json.loads(contract_registry.PATH.read_text())
+    assert data["version"] == contract_registry.VERSION
+    for kind, names in data["interfaces"].items():
+        assert all(hasattr(interface, name) for name in names), kind
+    for address, kind in data["contracts"].items():
+        assert kind in data["interfaces"], address
+        assert contract_registry.kind_of(address.lower()) == kind
+
+
+def test_handles_have_what_fixtures_call():
+    weth = contract_registry.contract("0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2")
+    assert hasattr(weth, "deposit") and hasattr(weth, "approve")
+
+    yvault = contract_registry.contract("0xa258C4606Ca8206D8aA700cE2143D7db854D168c")
+    for method in ("setDepositLimit", "governance", "pricePerShare", "token"):
+        assert hasattr(yvault, method)
+
+    a_token = contract_registry.contract(
+        "0x9ff58f4fFB29fA2266Ab25e75e2A8b3503311656", "AToken"
+    )
+    assert hasattr(a_token, "decimals") and hasattr(a_token, "getIncentivesController")
+
+    stk_aave = contract_registry.contract("0x4da27a545c0c5B758a6BA100e3a049001de870f5")
+    assert hasattr(stk_aave, "balanceOf") and hasattr(stk_aave, "stakersCooldowns")
@@ -0,0 +1,21 @@
+import pytest
+
+# EIP-170
+MAX_CODE_SIZE = 24_576
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "Strategy",
+        "AaveLenderBorrowerLib",
+        "AaveLenderBorrowerCloner",
+        "AaveLenderBorrowerLens",
+        "AaveLenderBorrowerBatchKeeper",
+    ],
+)
+def test_deployable(name, request):
+    # unlinked library addresses are 40 placeholder characters, 20 bytes as well
+    bytecode = request.getfixturevalue(name)._build["deployedBytecode"]
+    size = len(bytecode[2:] if bytecode.startswith("0x") else bytecode) // 2
+    assert size <= MAX_CODE_SIZE, f"{name} is {size} bytes"
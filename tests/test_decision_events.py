@@ -0,0 +1,130 @@
+import pytest
+from brownie import accounts
+
+# Strategy.BorrowCap and Strategy.RepayReason
+NONE, AVAILABLE_BORROWS, MAX_PROTOCOL_DEBT, MAX_TOTAL_BORROW = range(4)
+WARNING_LTV, COSTS, NO_ACCEPTABLE_DEBT = range(3)
+
+
+def test_borrowed(deposited, strategy, gov, vdToken, lendingPool, RELATIVE_APPROX):
+    tx = strategy.harvest({"from": gov})
+    borrowed = tx.events["Borrowed"]
+    assert borrowed["amountIT"] > 0
+    assert borrowed["amountIT"] == pytest.approx(
+        vdToken.balanceOf(strategy), rel=RELATIVE_APPROX
+    )
+    assert borrowed["cap"] == NONE
+    assert borrowed["totalDebtETH"] == 0
+    data = lendingPool.getUserAccountData(strategy).dict()
+    assert borrowed["totalCollateralETH"] == pytest.approx(
+        data["totalCollateralETH"], rel=RELATIVE_APPROX
+    )
+    assert borrowed["currentProtocolDebt"] < borrowed["maxProtocolDebt"]
+    assert "Repaid" not in tx.events and "Held" not in tx.events
+
+
+def test_borrow_cap(levered, strategy, gov, vdToken, set_strategy_params):
+    debt = vdToken.balanceOf(strategy)
+    set_strategy_params(
+        strategy,
+        targetLTVMultiplier=strategy.warningLTVMultiplier(),
+        maxTotalBorrowIT=debt,
+    )
+    tx = strategy.tend({"from": gov})
+    assert tx.events["Borrowed"]["amountIT"] == 0
+    assert tx.events["Borrowed"]["cap"] == MAX_TOTAL_BORROW
+
+
+def test_held(levered, strategy, gov, set_strategy_params):
+    set_strategy_params(
+        strategy, targetLTVMultiplier=strategy.targetLTVMultiplier() - 1_000
+    )
+    tx = strategy.tend({"from": gov})
+    held = tx.events["Held"]
+    ltv = held["totalDebtETH"] * 10_000 // held["totalCollateralETH"]
+    assert held["targetLTV"] < ltv <= held["warningLTV"]
+    assert "Borrowed" not in tx.events and "Repaid" not in tx.events
+
+
+def test_repaid_past_warning(past_warning, strategy, gov, vdToken, RELATIVE_APPROX):
+    debt = vdToken.balanceOf(strategy)
+    tx = strategy.tend({"from": gov})
+    repaid = tx.events["Repaid"]
+    assert repaid["reason"] == WARNING_LTV
+    assert repaid["repaidIT"] > 0
+    assert repaid["repaidIT"] == pytest.approx(
+        debt - vdToken.balanceOf(strategy), rel=RELATIVE_APPROX
+    )
+    assert repaid["repaidIT"] <= repaid["amountIT"]
+    assert repaid["totalDebtETH"] == tx.events["RepayDebt"]["previousDebtBalance"]
+
+
+def test_repaid_costs(costs_above_acceptable, strategy, gov):
+    tx = strategy.tend({"from": gov})
+    repaid = tx.events["Repaid"]
+    assert repaid["reason"] == COSTS
+    assert repaid["currentProtocolDebt"] > repaid["maxProtocolDebt"]
+    assert repaid["repaidIT"] > 0
+
+
+def test_unwound(
+    levered, vault, strategy, token_whale, vdToken, aToken, RELATIVE_APPROX
+):
+    debt = vdToken.balanceOf(strategy)
+    collateral = aToken.balanceOf(strategy)
+    tx = vault.withdraw(
+        vault.balanceOf(token_whale) // 2, token_whale, 10_000, {"from": token_whale}
+    )
+    unwound = tx.events["Unwound"]
+    assert unwound["repaidIT"] > 0 and unwound["withdrawn"] > 0
+    assert unwound["repaidIT"] == pytest.approx(
+        debt - vdToken.balanceOf(strategy), rel=RELATIVE_APPROX
+    )
+    assert unwound["withdrawn"] == pytest.approx(
+        collateral - aToken.balanceOf(strategy), rel=RELATIVE_APPROX
+    )
+    assert unwound["boughtIT"] == 0
+
+
+def test_unwound_selling_want(
+    levered, vault, strategy, token_whale, gov, vdToken, yvault, RELATIVE_APPROX
+):
+    # the yVault position is gone, debt can only be repaid by selling want
+    strategy_account = accounts.at(strategy.address, force=True)
+    yvault.transfer(gov, yvault.balanceOf(strategy), {"from": strategy_account})
+
+    debt = vdToken.balanceOf(strategy)
+    tx = vault.withdraw(
+        vault.balanceOf(token_whale) * 6 // 10,
+        token_whale,
+        10_000,
+        {"from": token_whale},
+    )
+    unwound = tx.events["Unwound"]
+    assert unwound["boughtIT"] > 0
+    assert unwound["repaidIT"] == pytest.approx(
+        debt - vdToken.balanceOf(strategy), rel=RELATIVE_APPROX
+    )
+
+
+def test_flash_loan_unwound(
+    levered, vault, strategy, token_whale, gov, vdToken, aToken, yvault, RELATIVE_APPROX
+):
+    strategy.setFlashLoanUnwind(True, {"from": gov})
+    strategy_account = accounts.at(strategy.address, force=True)
+    yvault.transfer(gov, yvault.balanceOf(strategy), {"from": strategy_account})
+
+    debt = vdToken.balanceOf(strategy)
+    collateral = aToken.balanceOf(strategy)
+    tx = vault.withdraw(
+        vault.balanceOf(token_whale), token_whale, 10_000, {"from": token_whale}
+    )
+    flash_loan = tx.events["FlashLoanUnwound"]
+    assert flash_loan["amountIT"] == pytest.approx(debt, rel=RELATIVE_APPROX)
+    # the yVault is empty, the loan and its premium are paid back with want
+    assert (
+        0 < flash_loan["boughtIT"] <= flash_loan["amountIT"] + flash_loan["premiumIT"]
+    )
+    unwound = tx.events["Unwound"]
+    assert unwound["repaidIT"] == flash_loan["amountIT"]
+    assert unwound["withdrawn"] == pytest.approx(collateral, rel=RELATIVE_APPROX)
@@ -0,0 +1,30 @@
+WETH = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+
+
+def to_want(AaveLibrary, amount, investment_token, want):
+    # the strategy's _fromETH(_toETH(amount, investmentToken), want)
+    if amount in (0, 2 ** 256 - 1):
+        return amount
+    if investment_token.address != WETH:
+        amount = AaveLibrary.toETH(amount, investment_token)
+    if amount in (0, 2 ** 256 - 1) or want.address == WETH:
+        return amount
+    return AaveLibrary.fromETH(amount, want)
+
+
+def test_estimated_total_assets_matches_oracle_conversion(
+    levered, AaveLibrary, strategy, token, aToken, vdToken, yvault, borrow_token
+):
+    debt = vdToken.balanceOf(strategy)
+    value_of_investment = (
+        yvault.balanceOf(strategy) * yvault.pricePerShare() // 10 ** yvault.decimals()
+    )
+    assert debt > 0 and value_of_investment > 0
+
+    assert strategy.estimatedTotalAssets() == (
+        token.balanceOf(strategy)
+        + aToken.balanceOf(strategy)
+        + to_want(AaveLibrary, value_of_investment, borrow_token, token)
+        - to_want(AaveLibrary, debt, borrow_token, token)
+    )
+    assert strategy.delegatedAssets() == to_want(AaveLibrary, debt, borrow_token, token)
@@ -0,0 +1,113 @@
+from brownie import chain
+
+from scripts.event_indexer import EventIndexer
+
+
+def test_indexes_strategy_history(
+    tmp_path,
+    deposited,
+    strategy,
+    cloner,
+    vault,
+    strategist,
+    rewards,
+    keeper,
+    yvault,
+    token_incentivised,
+    borrow_incentivised,
+    gov,
+):
+    path = tmp_path / "events.db"
+    # small ranges, so the sync takes several
+    indexer = EventIndexer(path, cloner, chunk_size=3)
+    strategy.harvest({"from": gov})
+    tx = cloner.cloneAaveLenderBorrower(
+        vault,
+        strategist,
+        rewards,
+        keeper,
+        yvault,
+        token_incentivised,
+        borrow_incentivised,
+        "Clone",
+    )
+    clone = tx.events["Cloned"]["clone"]
+    indexer.sync()
+
+    assert [e.event for e in indexer.events(strategy)] == [
+        "Deployed",
+        # the vault reports during the harvest, the position is adjusted and
+        # Harvested is emitted after
+        "StrategyReported",
+        "Borrowed",
+        "Harvested",
+    ]
+    [reported] = indexer.events(strategy, "StrategyReported")
+    assert reported.address == vault
+    assert reported.args["totalDebt"] == vault.strategies(strategy).dict()["totalDebt"]
+    [cloned] = indexer.events(event="Cloned")
+    assert cloned.strategy == clone
+    assert cloned.block_number == tx.block_number
+    assert indexer.contracts("strategy") == [strategy, clone]
+
+    # another indexer on the same file resumes from the checkpoint
+    indexer.close()
+    chain.sleep(1)
+    tx = strategy.harvest({"from": gov})
+    indexer = EventIndexer(path, cloner)
+    indexer.sync()
+    harvested = indexer.events(strategy, "Harvested")
+    assert len(harvested) == 2
+    assert harvested[-1].transaction_hash == tx.txid
+    assert harvested[-1].args["profit"] == tx.events["Harvested"]["profit"]
+
+
+def test_indexes_repay_debt(tmp_path, costs_above_acceptable, strategy, cloner, gov):
+    indexer = EventIndexer(tmp_path / "events.db", cloner)
+    tx = strategy.tend({"from": gov})
+    indexer.sync()
+
+    [repaid] = indexer.events(strategy, "RepayDebt")
+    assert repaid.block_number == tx.block_number
+    assert repaid.args == dict(tx.events["RepayDebt"])
+
+
+def test_rolls_back_reorg(tmp_path, deposited, strategy, cloner, gov, snapshots):
+    indexer = EventIndexer(tmp_path / "events.db", cloner)
+    indexer.sync()
+    head = chain.height
+
+    with snapshots.checkpoint():
+        strategy.harvest({"from": gov})
+        indexer.sync()
+        assert len(indexer.events(strategy, "Harvested")) == 1
+
+    # the harvest is gone, other blocks are mined at its height
+    chain.mine(3)
+    indexer.sync()
+    assert indexer.events(strategy, "Harvested") == []
+    assert indexer.next_block == chain.height + 1
+
+    chain.sleep(1)
+    tx = strategy.harvest({"from": gov})
+    indexer.sync()
+    [harvested] = indexer.events(strategy, "Harvested")
+    assert harvested.block_number == tx.block_number > head
+
+
+def test_rolls_back_reorg_of_a_large_range(
+    tmp_path, deposited, strategy, cloner, gov, snapshots
+):
+    with snapshots.checkpoint():
+        chain.mine(5)
+        strategy.harvest({"from": gov})
+        # the whole chain in one range
+        indexer = EventIndexer(tmp_path / "events.db", cloner, chunk_size=10 ** 6)
+        indexer.sync()
+        assert len(indexer.events(strategy, "Harvested")) == 1
+
+    # only the last blocks of the range changed
+    chain.mine(10)
+    indexer.sync()
+    assert indexer.events(strategy, "Harvested") == []
+    assert indexer.next_block == chain.height + 1
@@ -0,0 +1,151 @@
+import pytest
+from brownie import accounts, reverts
+from hexbytes import HexBytes
+
+MAX_BPS = 10_000
+PREMIUM = 9
+# selector of Error(string), the revert data of require and revert with a message
+ERROR_SELECTOR = HexBytes("0x08c379a0")
+
+# withdrawn, collateral, debt, target LTV, investment (ETH)
+CASES = [
+    # the investment pays the loan back
+    (400 * 10 ** 18, 1_000 * 10 ** 18, 480 * 10 ** 18, 4_800, 500 * 10 ** 18),
+    # collateral is sold for part of it
+    (400 * 10 ** 18, 1_000 * 10 ** 18, 480 * 10 ** 18, 4_800, 10 ** 18),
+    (300 * 10 ** 18, 1_000 * 10 ** 18, 450 * 10 ** 18, 4_500, 0),
+    # nothing to repay
+    (10 ** 18, 1_000 * 10 ** 18, 100 * 10 ** 18, 4_800, 0),
+]
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_flash_loan_amount_closed_form(AaveLibrary, case):
+    withdrawn, collateral, debt, target_ltv, investment = case
+    amount = AaveLibrary.calcFlashLoanAmountETH(
+        withdrawn, collateral, debt, target_ltv, investment, PREMIUM
+    )
+    assert amount <= debt
+
+    sold = max(amount * (MAX_BPS + PREMIUM) // MAX_BPS - investment, 0)
+    debt_left = debt - amount
+    target_debt = (collateral - withdrawn - sold) * target_ltv // MAX_BPS
+    if amount == 0:
+        assert debt <= target_debt
+    else:
+        assert debt_left == pytest.approx(target_debt, rel=1e-9)
+
+
+def test_flash_loan_amount_full_withdrawal(AaveLibrary):
+    assert AaveLibrary.calcFlashLoanAmountETH(
+        10 ** 21, 10 ** 21, 48 * 10 ** 19, 4_800, 0, PREMIUM
+    ) == (48 * 10 ** 19)
+
+
+def test_full_withdrawal_in_one_transaction(
+    levered, vault, strategy, token_whale, gov, vdToken, aToken, yvault
+):
+    strategy.setFlashLoanUnwind(True, {"from": gov})
+
+    # the yVault position is gone, so the freed want cannot buy back the debt
+    strategy_account = accounts.at(strategy.address, force=True)
+    yvault.transfer(gov, yvault.balanceOf(strategy), {"from": strategy_account})
+
+    tx = vault.withdraw(
+        vault.balanceOf(token_whale), token_whale, 10_000, {"from": token_whale}
+    )
+    assert "FlashLoan" in tx.events
+    assert vdToken.balanceOf(strategy) == 0
+    assert aToken.balanceOf(strategy) == 0
+
+
+def test_emergency_exit_in_one_transaction(levered, strategy, gov, vdToken, yvault):
+    strategy.setFlashLoanUnwind(True, {"from": gov})
+    strategy_account = accounts.at(strategy.address, force=True)
+    yvault.transfer(gov, yvault.balanceOf(strategy), {"from": strategy_account})
+
+    # liquidateAllPositions, as before a migration
+    strategy.setEmergencyExit({"from": gov})
+    tx = strategy.harvest({"from": gov})
+    assert "FlashLoan" in tx.events
+    assert vdToken.balanceOf(strategy) == 0
+
+
+def test_no_flash_loan_when_leaving_debt_behind(
+    levered, vault, strategy, token_whale, gov, vdToken, yvault, set_strategy_params
+):
+    strategy.setFlashLoanUnwind(True, {"from": gov})
+    set_strategy_params(strategy, leaveDebtBehind=True)
+    strategy_account = accounts.at(strategy.address, force=True)
+    yvault.transfer(gov, yvault.balanceOf(strategy), {"from": strategy_account})
+    debt = vdToken.balanceOf(strategy)
+
+    # want is not sold to repay the debt, the withdrawal takes the loss
+    tx = vault.withdraw(
+        vault.balanceOf(token_whale), token_whale, 10_000, {"from": token_whale}
+    )
+    assert "FlashLoan" not in tx.events
+    assert tx.events["Unwound"]["boughtIT"] == 0
+    assert tx.events["Unwound"]["loss"] > 0
+    assert vdToken.balanceOf(strategy) >= debt
+
+
+def test_failed_flash_loan_does_not_revert_withdrawal(
+    levered, vault, strategy, token_whale, gov, borrow_token, lendingPool, yvault
+):
+    strategy.setFlashLoanUnwind(True, {"from": gov})
+    strategy_account = accounts.at(strategy.address, force=True)
+    yvault.transfer(gov, yvault.balanceOf(strategy), {"from": strategy_account})
+
+    # no investment token left in the reserve to lend
+    reserve = lendingPool.getReserveData(borrow_token).dict()["aTokenAddress"]
+    borrow_token.transfer(
+        gov,
+        borrow_token.balanceOf(reserve),
+        {"from": accounts.at(reserve, force=True)},
+    )
+
+    # as without flashLoanUnwind: want is sold to repay the debt
+    tx = vault.withdraw(
+        vault.balanceOf(token_whale) * 6 // 10,
+        token_whale,
+        10_000,
+        {"from": token_whale},
+    )
+    assert "FlashLoan" not in tx.events
+    assert tx.events["Unwound"]["boughtIT"] > 0
+
+    # the reverted loan is recorded with its revert data, an Error(string)
+    failed = tx.events["FlashLoanFailed"]
+    assert failed["amountIT"] > 0
+    assert HexBytes(failed["reason"])[:4] == ERROR_SELECTOR
+
+
+def test_no_flash_loan_when_yvault_covers_repayment(
+    levered, vault, strategy, token_whale, gov, vdToken
+):
+    strategy.setFlashLoanUnwind(True, {"from": gov})
+    debt = vdToken.balanceOf(strategy)
+
+    tx = vault.withdraw(vault.balanceOf(token_whale) // 2, {"from": token_whale})
+    assert "FlashLoan" not in tx.events
+    assert vdToken.balanceOf(strategy) < debt
+
+
+def test_execute_operation_only_from_own_flash_loan(
+    strategy, borrow_token, lendingPool, user
+):
+    with reverts("dev: !lendingPool"):
+        strategy.executeOperation(
+            [borrow_token], [1], [0], strategy, b"", {"from": user}
+        )
+
+    with reverts("dev: !initiator"):
+        strategy.executeOperation(
+            [borrow_token],
+            [1],
+            [0],
+            user,
+            b"",
+            {"from": accounts.at(lendingPool, force=True)},
+        )
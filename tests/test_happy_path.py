@@ -1,13 +1,19 @@
 import pytest
-from brownie import chain, reverts, Contract
+from brownie import chain, reverts
 
 
 def test_happy_path(
-    vault, strategy, gov, token, token_whale, borrow_token, borrow_whale, yvault
+    vault,
+    strategy,
+    gov,
+    token,
+    token_whale,
+    borrow_token,
+    borrow_whale,
+    yvault,
+    lendingPool,
 ):
-    pd_provider = Contract("0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d")
-    a_provider = Contract(pd_provider.ADDRESSES_PROVIDER())
-    lp = Contract(a_provider.getLendingPool())
+    lp = lendingPool
     prev_balance = token.balanceOf(token_whale)
 
     token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
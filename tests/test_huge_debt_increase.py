@@ -1,15 +1,15 @@
 import pytest
-from brownie import chain, Contract
+from brownie import chain
 
 
-def test_huge_debt(vault, strategy, gov, token, token_whale):
+def test_huge_debt(vault, strategy, gov, token, token_whale, lendingPool):
     prev_balance = token.balanceOf(token_whale)
     token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
     vault.deposit(500_000 * (10 ** token.decimals()), {"from": token_whale})
 
     chain.sleep(1)
     strategy.harvest({"from": gov})
-    lp = get_lending_pool()
+    lp = lendingPool
 
     prev_debt = lp.getUserAccountData(strategy).dict()["totalDebtETH"]
     print(f"T=0 totalDebtETH: {prev_debt}")
@@ -32,9 +32,3 @@ def test_huge_debt(vault, strategy, gov, token, token_whale):
     # we are currently in a profitable scenario so there is no loss
     print(f"diff {prev_balance-token.balanceOf(token_whale)}")
     assert token.balanceOf(token_whale) - prev_balance > 0
-
-
-def get_lending_pool():
-    pd_provider = Contract("0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d")
-    a_provider = Contract(pd_provider.ADDRESSES_PROVIDER())
-    return Contract(a_provider.getLendingPool())
@@ -1,4 +1,4 @@
-from brownie import chain, Wei, reverts, Contract
+from brownie import chain, Wei, reverts
 
 
 def test_increase_costs(
@@ -13,6 +13,7 @@ def test_increase_costs(
     vdToken,
     aToken,
     AaveLibrary,
+    lendingPool,
 ):
     if token.symbol() == "WETH":
         deposit_amount = 500 * (10 ** token.decimals())
@@ -27,7 +28,7 @@ def test_increase_costs(
     token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
     vault.deposit(deposit_amount, {"from": token_whale})
     # whale has deposited 10btc in fixture
-    lp = get_lending_pool()
+    lp = lendingPool
 
     chain.sleep(1)
     tx = strategy.harvest({"from": gov})
@@ -118,10 +119,3 @@ def test_increase_costs(
     tx = strategy.harvest({"from": gov})
     assert previousDebt > vdToken.balanceOf(strategy)
     assert vdToken.balanceOf(strategy) == 0
-
-
-def get_lending_pool():
-    pd_provider = Contract("0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d")
-    a_provider = Contract(pd_provider.ADDRESSES_PROVIDER())
-    lp = Contract(a_provider.getLendingPool())
-    return lp
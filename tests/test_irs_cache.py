@@ -0,0 +1,52 @@
+import pytest
+
+import mock_aave
+
+RAY = 10 ** 27
+
+
+@pytest.fixture(autouse=True)
+def mock_only(aave_mock):
+    if not aave_mock:
+        pytest.skip("interest rate strategies can only be changed on the mock")
+
+
+def test_new_interest_rate_strategy_is_read(
+    levered, strategy, gov, vdToken, borrow_token, aave_mock, set_strategy_params
+):
+    set_strategy_params(
+        strategy, acceptableCostsRay=RAY // 100, maxGasPriceToTend=mock_aave.BASE_FEE
+    )
+    assert not strategy.tendTrigger(0)
+
+    # above optimal utilization and asking for less than base + slope1, so
+    # maxProtocolDebt is 0 and all the debt has to be repaid
+    aave_mock.set_interest_rate_strategy(
+        borrow_token.symbol(), RAY * 3 // 10, 0, RAY * 7 // 100, RAY * 3
+    )
+    # the cache still holds the old strategy's params, tendTrigger reads around it
+    assert strategy.tendTrigger(0)
+
+    tx = strategy.tend({"from": gov})
+    assert tx.events["RepayDebt"]["repayAmount"] == (
+        tx.events["RepayDebt"]["previousDebtBalance"]
+    )
+    assert vdToken.balanceOf(strategy) == 0
+
+
+def test_cache_saves_gas(levered, strategy, gov, borrow_token, aave_mock):
+    cached_trigger = strategy.tendTrigger.estimate_gas(0)
+    cached_tend = strategy.tend({"from": gov}).gas_used
+
+    # same params behind a new address: the cache is stale until the next tend
+    aave_mock.set_interest_rate_strategy(
+        borrow_token.symbol(), *mock_aave.INTEREST_RATE_STRATEGY
+    )
+    stale_trigger = strategy.tendTrigger.estimate_gas(0)
+    refreshing_tend = strategy.tend({"from": gov}).gas_used
+    assert strategy.tendTrigger.estimate_gas(0) == cached_trigger
+
+    # a stale cache costs what reading the strategy on every call did
+    assert cached_trigger < stale_trigger
+    # the refresh is paid once, by the next tend
+    assert cached_tend < refreshing_tend
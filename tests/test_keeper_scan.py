@@ -0,0 +1,75 @@
+import asyncio
+
+from brownie import chain
+
+from scripts.keeper_scan import HARVEST_GAS, FleetScanner
+
+
+def test_scan_matches_onchain_triggers(
+    vault,
+    strategy,
+    Strategy,
+    strategist,
+    rewards,
+    keeper,
+    gov,
+    token,
+    token_whale,
+    yvault,
+    cloner,
+    token_incentivised,
+    borrow_incentivised,
+    set_strategy_params,
+):
+    clones = []
+    for i in range(3):
+        tx = cloner.cloneAaveLenderBorrower(
+            vault,
+            strategist,
+            rewards,
+            keeper,
+            yvault,
+            token_incentivised,
+            borrow_incentivised,
+            f"Clone{i}",
+        )
+        clones.append(tx.events["Cloned"]["clone"])
+
+    token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+    vault.deposit(500_000 * (10 ** token.decimals()), {"from": token_whale})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+    # leave the position below target LTV so tendTrigger fires
+    set_strategy_params(
+        strategy,
+        targetLTVMultiplier=strategy.targetLTVMultiplier() + 2_000,
+        warningLTVMultiplier=strategy.warningLTVMultiplier() + 1_000,
+        maxGasPriceToTend=2 ** 64 - 1,
+    )
+    chain.mine(1)
+
+    scanner = FleetScanner(cloner, cloner.tx.block_number, concurrency=2, chunk_size=2)
+    results = asyncio.run(scanner.scan())
+
+    assert [r.strategy for r in results] == [strategy.address] + clones
+    base_fee = scanner.snapshotter.snapshot(strategy).base_fee
+    for result in results:
+        onchain = Strategy.at(result.strategy)
+        assert result.error is None
+        assert result.tend == onchain.tendTrigger(0)
+        assert result.harvest == onchain.harvestTrigger(HARVEST_GAS * base_fee)
+    assert results[0].tend
+
+    # new clones are picked up on the next scan
+    tx = cloner.cloneAaveLenderBorrower(
+        vault,
+        strategist,
+        rewards,
+        keeper,
+        yvault,
+        token_incentivised,
+        borrow_incentivised,
+        "Clone3",
+    )
+    results = asyncio.run(scanner.scan())
+    assert results[-1].strategy == tx.events["Cloned"]["clone"]
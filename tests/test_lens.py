@@ -0,0 +1,128 @@
+import pytest
+from brownie import MockPriceOracle
+
+NO_COLLATERAL, SUBOPTIMAL, HEALTHY, UNHEALTHY = range(4)
+
+
+@pytest.fixture
+def lens(gov, AaveLenderBorrowerLens, AaveLibrary):
+    yield gov.deploy(AaveLenderBorrowerLens)
+
+
+def test_preview_healthy(levered, lens, strategy, set_strategy_params):
+    set_strategy_params(
+        strategy, targetLTVMultiplier=strategy.targetLTVMultiplier() - 1_000
+    )
+    decision = lens.previewTend(strategy).dict()
+    assert decision["branch"] == HEALTHY
+    assert decision["targetLTV"] < decision["currentLTV"] <= decision["warningLTV"]
+    assert decision["amountToBorrowIT"] == decision["amountToRepayIT"] == 0
+
+
+def test_preview_borrow(
+    levered, lens, strategy, vdToken, gov, set_strategy_params, RELATIVE_APPROX
+):
+    set_strategy_params(strategy, targetLTVMultiplier=strategy.warningLTVMultiplier())
+    decision = lens.previewTend(strategy).dict()
+    assert decision["branch"] == SUBOPTIMAL
+    assert decision["amountToRepayIT"] == 0
+    assert decision["targetLTV"] > decision["currentLTV"]
+    assert decision["currentProtocolDebt"] < decision["maxProtocolDebt"]
+
+    debt = vdToken.balanceOf(strategy)
+    strategy.tend({"from": gov})
+    assert pytest.approx(vdToken.balanceOf(strategy) - debt, rel=RELATIVE_APPROX) == (
+        decision["amountToBorrowIT"]
+    )
+
+
+def test_preview_uses_cached_aave_addresses(
+    levered,
+    lens,
+    strategy,
+    vdToken,
+    borrow_token,
+    gov,
+    aave_mock,
+    set_strategy_params,
+    RELATIVE_APPROX,
+):
+    if not aave_mock:
+        pytest.skip("the addresses provider can only be changed on the mock")
+    set_strategy_params(strategy, targetLTVMultiplier=strategy.warningLTVMultiplier())
+    price_oracle = strategy.priceOracle()
+
+    # Aave moves to a new oracle quoting the investment token 5% higher, the
+    # strategy converts with the one it cached until refreshAaveAddresses
+    new_oracle = MockPriceOracle.deploy({"from": gov})
+    for asset in aave_mock.tokens.values():
+        price = aave_mock.price_oracle.getAssetPrice(asset)
+        if asset.address == borrow_token.address:
+            price = price * 105 // 100
+        new_oracle.setAssetPrice(asset, price, {"from": gov})
+    aave_mock.addresses_provider.setPriceOracle(new_oracle, {"from": gov})
+    assert strategy.priceOracle() == price_oracle
+
+    decision = lens.previewTend(strategy).dict()
+    assert decision["branch"] == SUBOPTIMAL
+    debt = vdToken.balanceOf(strategy)
+    strategy.tend({"from": gov})
+    assert pytest.approx(vdToken.balanceOf(strategy) - debt, rel=RELATIVE_APPROX) == (
+        decision["amountToBorrowIT"]
+    )
+
+
+def test_preview_counts_idle_want(
+    levered, lens, strategy, token, token_whale, aToken, vdToken, gov, RELATIVE_APPROX
+):
+    # adjustPosition deposits it before deciding
+    token.transfer(strategy, aToken.balanceOf(strategy) // 2, {"from": token_whale})
+    decision = lens.previewTend(strategy).dict()
+    assert decision["branch"] == SUBOPTIMAL
+
+    debt = vdToken.balanceOf(strategy)
+    strategy.tend({"from": gov})
+    assert pytest.approx(vdToken.balanceOf(strategy) - debt, rel=RELATIVE_APPROX) == (
+        decision["amountToBorrowIT"]
+    )
+
+
+def test_preview_borrow_cap(levered, lens, strategy, vdToken, set_strategy_params):
+    set_strategy_params(
+        strategy,
+        targetLTVMultiplier=strategy.warningLTVMultiplier(),
+        maxTotalBorrowIT=vdToken.balanceOf(strategy),
+    )
+    decision = lens.previewTend(strategy).dict()
+    assert decision["branch"] == SUBOPTIMAL
+    assert decision["amountToBorrowIT"] == 0
+    assert decision["maxTotalBorrowIT"] == strategy.maxTotalBorrowIT()
+
+
+def test_preview_repay(
+    past_warning, lens, strategy, AaveLibrary, borrow_token, gov, RELATIVE_APPROX
+):
+    decision = lens.previewTend(strategy).dict()
+    assert decision["branch"] == UNHEALTHY
+    assert decision["currentLTV"] > decision["warningLTV"]
+    assert decision["amountToBorrowIT"] == 0
+
+    tx = strategy.tend({"from": gov})
+    assert pytest.approx(decision["amountToRepayIT"], rel=RELATIVE_APPROX) == (
+        AaveLibrary.fromETH(tx.events["RepayDebt"]["repayAmount"], borrow_token)
+    )
+
+
+def test_preview_repay_costs(costs_above_acceptable, lens, strategy, AaveLibrary):
+    decision = lens.previewTend(strategy).dict()
+    assert decision["branch"] == UNHEALTHY
+    assert decision["currentProtocolDebt"] > decision["maxProtocolDebt"]
+    assert decision["currentLTV"] <= decision["warningLTV"]
+    assert decision["amountToRepayIT"] > 0
+
+
+def test_preview_many(deposited, lens, strategy, user):
+    nothing, not_a_strategy = [d.dict() for d in lens.previewTends([strategy, user])]
+    assert nothing["success"] and nothing["branch"] == NO_COLLATERAL
+    assert nothing["amountToBorrowIT"] == nothing["amountToRepayIT"] == 0
+    assert not_a_strategy["strategy"] == user and not not_a_strategy["success"]
@@ -0,0 +1,89 @@
+import math
+
+import pytest
+
+from scripts.price_stress import (
+    SECONDS_PER_YEAR,
+    PriceModel,
+    StressInputs,
+    simulate,
+    tend_probability,
+)
+
+DAY = 24 * 3600
+
+
+def normal_sf(x):
+    return 0.5 * math.erfc(x / math.sqrt(2))
+
+
+def test_one_check_matches_closed_form():
+    # LTV 64%, warning 66%, liquidation 82.5%, tended at the next check
+    inputs = StressInputs(1_000 * 10 ** 18, 640 * 10 ** 18, 8_250, 8_000)
+    model = PriceModel(0.8, 0.1, correlation=0.3)
+    result = simulate(
+        inputs, model, check_every=DAY, max_checks=1, paths=200_000, seed=1
+    )
+
+    # log(LTV) moves by the investment token log return less want's
+    dt = DAY / SECONDS_PER_YEAR
+    mean = (model.vol_want ** 2 - model.vol_investment_token ** 2) / 2 * dt
+    std = math.sqrt(
+        (
+            model.vol_want ** 2
+            + model.vol_investment_token ** 2
+            - 2 * model.correlation * model.vol_want * model.vol_investment_token
+        )
+        * dt
+    )
+    for p, ltv in ((result.warning, 0.66), (result.liquidation, 0.825)):
+        expected = normal_sf((math.log(ltv / 0.64) - mean) / std)
+        assert p == pytest.approx(expected, abs=4 * result.stderr(expected) + 1e-6)
+    assert result.mean_checks_to_tend == 1
+
+
+def test_gas_price_delays_tends():
+    inputs = StressInputs(1_000 * 10 ** 18, 500 * 10 ** 18, 8_250, 8_000)
+    model = PriceModel(0.9, 0.05, tail_df=4)
+    kwargs = dict(check_every=3_600, max_checks=48, paths=100_000, seed=2)
+
+    always = simulate(inputs, model, **kwargs)
+    rarely = simulate(inputs._replace(tend_probability=0.05), model, **kwargs)
+    assert rarely.warning > always.warning
+    assert rarely.liquidation <= rarely.warning
+    assert rarely.mean_checks_to_tend > 10
+    assert rarely.truncated == pytest.approx(0.95 ** 48, abs=0.01)
+
+
+def test_chunks_do_not_change_the_estimate():
+    inputs = StressInputs(1_000 * 10 ** 18, 600 * 10 ** 18, 8_250, 8_000, 0.2)
+    model = PriceModel(0.9, 0.05, correlation=0.2)
+    kwargs = dict(check_every=3_600, max_checks=24, paths=100_000)
+
+    whole = simulate(inputs, model, chunk_size=100_000, seed=3, **kwargs)
+    chunked = simulate(inputs, model, chunk_size=7_000, seed=4, **kwargs)
+    assert chunked.paths == whole.paths
+    assert chunked.warning == pytest.approx(
+        whole.warning, abs=5 * whole.stderr(whole.warning)
+    )
+
+
+def test_no_move_no_risk():
+    inputs = StressInputs(1_000 * 10 ** 18, 500 * 10 ** 18, 8_250, 8_000)
+    # perfectly correlated prices with the same volatility keep LTV constant
+    result = simulate(inputs, PriceModel(0.5, 0.5, correlation=1.0), paths=10_000)
+    assert result.warning == result.liquidation == 0
+
+    result = simulate(inputs._replace(total_debt_eth=0), PriceModel(0.5, 0.1))
+    assert result.warning == 0
+
+
+def test_tend_probability():
+    base_fees = [30e9, 50e9, 80e9, 120e9]
+    assert tend_probability(base_fees, 60e9) == 0.5
+    assert tend_probability(iter(base_fees), 200e9) == 1
+    with pytest.raises(ValueError):
+        simulate(
+            StressInputs(1, 1, 8_250, 8_000, tend_probability(base_fees, 10e9)),
+            PriceModel(0.5, 0.1),
+        )
@@ -1,15 +1,17 @@
 import pytest
-from brownie import chain, Wei, Contract, accounts, ZERO_ADDRESS
-
-
-def get_lp():
-    pd_provider = Contract("0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d")
-    a_provider = Contract(pd_provider.ADDRESSES_PROVIDER())
-    return Contract(a_provider.getLendingPool())
+from brownie import chain, Wei, accounts, ZERO_ADDRESS
 
 
 def test_rate_above_optimal(
-    vault, strategy, gov, token, token_whale, vdToken, borrow_whale, borrow_token
+    vault,
+    strategy,
+    gov,
+    token,
+    token_whale,
+    vdToken,
+    borrow_whale,
+    borrow_token,
+    lendingPool,
 ):
     token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
     vault.deposit(500_000 * (10 ** token.decimals()), {"from": token_whale})
@@ -29,16 +31,14 @@ def test_rate_above_optimal(
     )
 
     # This will increase the rate to > 100%
-    increase_interest(borrow_token, borrow_whale)
+    increase_interest(lendingPool, borrow_token, borrow_whale)
 
     strategy.harvest({"from": gov})
     assert vdToken.balanceOf(strategy) == 0
 
-    currentCost = (
-        get_lp()
-        .getReserveData(Contract(strategy.yVault()).token())
-        .dict()["currentVariableBorrowRate"]
-    )
+    currentCost = lendingPool.getReserveData(borrow_token).dict()[
+        "currentVariableBorrowRate"
+    ]
     print(f"current rate: {currentCost/1e27}")
 
     strategy.setStrategyParams(
@@ -59,8 +59,7 @@ def test_rate_above_optimal(
     assert vdToken.balanceOf(strategy) > 0
 
 
-def increase_interest(bToken, whale):
-    lp = get_lp()
+def increase_interest(lp, bToken, whale):
     aBorrow = lp.getReserveData(bToken).dict()["aTokenAddress"]
     liquidity = bToken.balanceOf(aBorrow)
     to_move = liquidity * 0.9
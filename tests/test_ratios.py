@@ -1,4 +1,4 @@
-from brownie import chain, reverts, Contract
+from brownie import chain, reverts
 
 
 def test_lev_ratios(
@@ -12,8 +12,9 @@ def test_lev_ratios(
     yvault,
     vdToken,
     aToken,
+    lendingPool,
 ):
-    lp = get_lending_pool()
+    lp = lendingPool
 
     token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
     vault.deposit(500_000 * (10 ** token.decimals()), {"from": token_whale})
@@ -117,13 +118,6 @@ def test_lev_ratios(
     vault.withdraw({"from": token_whale})
 
 
-def get_lending_pool():
-    pd_provider = Contract("0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d")
-    a_provider = Contract(pd_provider.ADDRESSES_PROVIDER())
-    lp = Contract(a_provider.getLendingPool())
-    return lp
-
-
 def print_status(lp, strategy):
     userDict = lp.getUserAccountData(strategy).dict()
     currentDebtETH = userDict["totalDebtETH"]
@@ -0,0 +1,108 @@
+import pytest
+from brownie import chain
+
+from scripts.aave_lender_borrower_lib import (
+    NO_REBALANCE,
+    REBALANCE,
+    REBALANCE_IF_GAS,
+)
+from scripts.rebalance_evaluator import RebalanceEvaluator
+
+RAY = 10 ** 27
+
+# acceptable costs, target LTV, warning LTV, collateral, debt, max gas price to tend
+CASES = [
+    (10 ** 27, 5_000, 6_000, 1_000, 500, 600 * 10 ** 9),
+    (10 ** 27, 5_000, 6_000, 1_000, 601, 600 * 10 ** 9),
+    (10 ** 27, 5_000, 4_999, 1_000, 500, 0),
+    (10 ** 23, 5_000, 6_000, 1_000, 500, 101 * 10 ** 9),
+    (10 ** 23, 5_000, 6_000, 1_000, 500, 99 * 10 ** 9),
+    (10 ** 27, 5_000, 6_000, 1_000, 100, 600 * 10 ** 9),
+    (10 ** 27, 5_000, 6_000, 1_000, 100, 0),
+    (10 ** 27, 5_000, 6_000, 1_000, 450, 600 * 10 ** 9),
+]
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_evaluator_matches_library(AaveLibrary, borrow_token, case):
+    evaluator = RebalanceEvaluator()
+    assert evaluator.should_rebalance(borrow_token, *case) == (
+        AaveLibrary.shouldRebalance(borrow_token, *case)
+    )
+
+
+def test_reserve_cached_until_updated(
+    AaveLibrary, borrow_token, borrow_whale, lendingPool
+):
+    evaluator = RebalanceEvaluator()
+    state = evaluator.reserve(borrow_token)
+
+    chain.mine(5)
+    assert evaluator.reserve(borrow_token) is state
+
+    amount = 10 ** borrow_token.decimals()
+    borrow_token.approve(lendingPool, amount, {"from": borrow_whale})
+    lendingPool.deposit(borrow_token, amount, borrow_whale, 0, {"from": borrow_whale})
+    refreshed = evaluator.reserve(borrow_token)
+    assert refreshed.block_number > state.block_number
+    assert refreshed.available_liquidity == state.available_liquidity + amount
+
+    for case in CASES:
+        assert evaluator.should_rebalance(borrow_token, *case) == (
+            AaveLibrary.shouldRebalance(borrow_token, *case)
+        )
+
+
+def test_reserve_reread_after_interest_rate_strategy_change(
+    AaveLibrary, borrow_token, aave_mock
+):
+    if not aave_mock:
+        pytest.skip("interest rate strategies can only be changed on the mock")
+
+    evaluator = RebalanceEvaluator()
+    state = evaluator.reserve(borrow_token)
+    # the pool emits no event for it, only the address changes
+    irs = aave_mock.set_interest_rate_strategy(
+        borrow_token.symbol(), RAY * 3 // 10, 0, RAY * 7 // 100, RAY * 3, update=False
+    )
+    refreshed = evaluator.reserve(borrow_token)
+    assert refreshed is not state
+    assert refreshed.interest_rate_strategy == irs.address
+    assert refreshed.slope2 == RAY * 3
+
+    # checked once per block
+    assert evaluator.reserve(borrow_token) is refreshed
+    chain.mine(1)
+    assert evaluator.reserve(borrow_token) is refreshed
+
+    for case in CASES:
+        assert evaluator.should_rebalance(borrow_token, *case) == (
+            AaveLibrary.shouldRebalance(borrow_token, *case)
+        )
+
+
+def test_recheck_only_reads_gas(AaveLibrary, borrow_token, aave_mock):
+    if not aave_mock:
+        pytest.skip("the base fee can only be changed on the mock")
+
+    evaluator = RebalanceEvaluator()
+    # far below target LTV, more debt is acceptable: depends on the gas price
+    decision = evaluator.evaluate(borrow_token, 10 ** 27, 5_000, 6_000, 1_000, 100, 0)
+    assert decision.need == REBALANCE_IF_GAS
+    assert not evaluator.recheck(decision)
+
+    aave_mock.base_fee.setBaseFee(0, {"from": aave_mock.whale})
+    assert evaluator.recheck(decision)
+    assert evaluator.recheck(decision) == AaveLibrary.shouldRebalance(
+        borrow_token, 10 ** 27, 5_000, 6_000, 1_000, 100, 0
+    )
+
+    # above warning LTV: rebalance whatever the gas price
+    decision = evaluator.evaluate(borrow_token, 10 ** 27, 5_000, 6_000, 1_000, 601, 0)
+    assert decision.need == REBALANCE
+    aave_mock.base_fee.setBaseFee(10 ** 12, {"from": aave_mock.whale})
+    assert evaluator.recheck(decision)
+
+    decision = evaluator.evaluate(borrow_token, 10 ** 27, 5_000, 6_000, 1_000, 450, 0)
+    assert decision.need == NO_REBALANCE
+    assert not decision.should_rebalance(0)
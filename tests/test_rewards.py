@@ -1,4 +1,4 @@
-from brownie import chain, Wei, Contract
+from brownie import chain, Wei
 
 
 def test_rewards(
@@ -14,13 +14,10 @@ def test_rewards(
     borrow_incentivised,
     borrow_token,
     borrow_whale,
+    stkAave,
+    incentivesController,
 ):
-    ic = get_incentives_controller(
-        aToken, vdToken, token_incentivised, borrow_incentivised
-    )
-    aToken = aToken
-    vdToken = vdToken
-    stkAave = Contract("0x4da27a545c0c5B758a6BA100e3a049001de870f5")
+    ic = incentivesController
 
     token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
     vault.deposit(500_000 * (10 ** token.decimals()), {"from": token_whale})
@@ -101,14 +98,3 @@ def test_rewards(
     assert tx.events["Harvested"]
     # rewards off (expected to come back)
     # assert len(tx.events["RewardsClaimed"]) == 2
-
-
-def get_incentives_controller(aToken, vdToken, token_incentivised, borrow_incentivised):
-    if token_incentivised:
-        ic = Contract(aToken.getIncentivesController())
-        return ic
-    elif borrow_incentivised:
-        ic = Contract(vdToken.getIncentivesController())
-        return ic
-
-    return
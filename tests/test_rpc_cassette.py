@@ -0,0 +1,181 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import Request, urlopen
+
+import pytest
+import requests
+
+from scripts.rpc_cassette import (
+    MISS_CODE,
+    Cassette,
+    CassetteMiss,
+    CassetteProxy,
+    rpc_key,
+)
+
+SLOT = "0x" + "00" * 31 + "07"
+DAI = "0x6B175474E89094C44Da98b954EedeAC495271d0F"
+
+
+class Upstream(BaseHTTPRequestHandler):
+    # an archive node and an explorer that count what they are asked
+    calls = []
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.calls.append(request["method"])
+        if request["method"] == "eth_blockNumber":
+            body = {"result": "0xc5d488"}
+        elif request["method"] == "eth_getStorageAt":
+            body = {"result": "0x" + "00" * 31 + "2a"}
+        elif request["method"] == "eth_chainId":
+            body = {"error": {"code": -32005, "message": "rate limited"}}
+        else:
+            body = {"error": {"code": -32601, "message": "method not found"}}
+        self._send({"jsonrpc": "2.0", "id": request["id"], **body})
+
+    def do_GET(self):
+        self.calls.append(self.path)
+        self._send({"status": "1", "message": "OK", "result": [{"ABI": "[]"}]})
+
+    def _send(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    Upstream.calls = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Upstream)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, body):
+    request = Request(
+        url, json.dumps(body).encode(), {"Content-Type": "application/json"}
+    )
+    with urlopen(request) as response:
+        return json.load(response)
+
+
+def rpc(url, method, params, id=1):
+    return post(url, {"jsonrpc": "2.0", "id": id, "method": method, "params": params})
+
+
+def record(path, upstream):
+    with CassetteProxy(Cassette(path, record=True, upstream=upstream)) as proxy:
+        answers = [
+            rpc(proxy.url, "eth_blockNumber", []),
+            rpc(proxy.url, "eth_getStorageAt", [DAI, SLOT, "0xc5d488"]),
+            rpc(proxy.url, "eth_getCode", [DAI, "0xc5d488"]),
+        ]
+        # asked again, answered from the cassette
+        rpc(proxy.url, "eth_blockNumber", [])
+    return answers
+
+
+def test_replays_without_upstream(tmp_path, upstream):
+    path = tmp_path / "cassette.json.gz"
+    recorded = record(path, upstream)
+    assert Upstream.calls == ["eth_blockNumber", "eth_getStorageAt", "eth_getCode"]
+    assert recorded[2]["error"]["code"] == -32601
+
+    with CassetteProxy(Cassette(path)) as proxy:
+        replayed = [
+            rpc(proxy.url, "eth_blockNumber", []),
+            # addresses are matched whatever their case
+            rpc(proxy.url, "eth_getStorageAt", [DAI.lower(), SLOT, "0xc5d488"]),
+            rpc(proxy.url, "eth_getCode", [DAI, "0xc5d488"]),
+        ]
+    assert replayed == recorded
+    assert len(Upstream.calls) == 3
+
+
+def test_miss_is_reported(tmp_path, upstream):
+    path = tmp_path / "cassette.json.gz"
+    record(path, upstream)
+
+    cassette = Cassette(path)
+    with CassetteProxy(cassette) as proxy:
+        answer = rpc(proxy.url, "eth_getBalance", [DAI, "0xc5d488"])
+    assert answer["error"]["code"] == MISS_CODE
+    assert "eth_getBalance" in answer["error"]["message"]
+    assert str(path) in answer["error"]["message"]
+    assert cassette.misses == [rpc_key("eth_getBalance", [DAI, "0xc5d488"])]
+    assert len(Upstream.calls) == 3
+
+    with pytest.raises(FileNotFoundError):
+        Cassette(tmp_path / "missing.json.gz")
+
+
+def test_transient_errors_are_not_recorded(tmp_path, upstream):
+    path = tmp_path / "cassette.json.gz"
+    with CassetteProxy(Cassette(path, record=True, upstream=upstream)) as proxy:
+        assert rpc(proxy.url, "eth_chainId", [])["error"]["code"] == -32005
+    with pytest.raises(CassetteMiss):
+        Cassette(path).call("eth_chainId", [])
+
+
+def test_batch_requests(tmp_path, upstream):
+    path = tmp_path / "cassette.json.gz"
+    record(path, upstream)
+
+    with CassetteProxy(Cassette(path)) as proxy:
+        answers = post(
+            proxy.url,
+            [
+                {"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber", "params": []},
+                {"jsonrpc": "2.0", "id": 2, "method": "eth_gasPrice", "params": []},
+            ],
+        )
+    assert [answer["id"] for answer in answers] == [1, 2]
+    assert answers[0]["result"] == "0xc5d488"
+    assert answers[1]["error"]["code"] == MISS_CODE
+
+
+def test_recordings_are_merged(tmp_path, upstream):
+    path = tmp_path / "cassette.json.gz"
+    record(path, upstream)
+    with CassetteProxy(Cassette(path, record=True, upstream=upstream)) as proxy:
+        rpc(proxy.url, "eth_getStorageAt", [DAI, SLOT, "0xc5d489"])
+
+    cassette = Cassette(path)
+    cassette.call("eth_blockNumber", [])
+    cassette.call("eth_getStorageAt", [DAI, SLOT, "0xc5d489"])
+
+
+def test_explorer_sources(tmp_path, upstream):
+    path = tmp_path / "cassette.json.gz"
+    hosts = ("127.0.0.1",)
+    url = f"{upstream}/api"
+    params = {"module": "contract", "action": "getsourcecode", "address": DAI}
+
+    original = requests.sessions.Session.request
+    cassette = Cassette(path, record=True, upstream=upstream)
+    with cassette.patch_requests(hosts):
+        recorded = requests.get(url, params={**params, "apikey": "secret"}).json()
+    cassette.save()
+    assert len(Upstream.calls) == 1
+    assert "secret" not in json.dumps(Cassette(path).explorer)
+
+    cassette = Cassette(path)
+    with cassette.patch_requests(hosts):
+        # another API key, same answer
+        assert (
+            requests.get(url, params={**params, "apikey": "other"}).json() == recorded
+        )
+        with pytest.raises(CassetteMiss):
+            requests.get(url, params={**params, "address": SLOT})
+    assert len(Upstream.calls) == 1
+    assert requests.sessions.Session.request is original
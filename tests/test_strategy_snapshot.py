@@ -0,0 +1,57 @@
+import pytest
+from brownie import chain
+
+from scripts.strategy_snapshot import Snapshotter
+
+
+def test_snapshot_matches_direct_reads(
+    levered,
+    strategy,
+    token,
+    yvault,
+    borrow_token,
+    lendingPool,
+    aToken,
+    vdToken,
+    AaveLibrary,
+):
+    snapshot = Snapshotter().snapshot(strategy)
+    assert snapshot.block_number == chain.height
+
+    assert snapshot.markets.want == token.address
+    assert snapshot.markets.investment_token == borrow_token.address
+    assert snapshot.markets.a_token == aToken.address
+    assert snapshot.markets.variable_debt_token == vdToken.address
+
+    assert snapshot[2:8] == tuple(lendingPool.getUserAccountData(strategy))
+    assert snapshot.total_debt_eth > 0
+    assert snapshot.price_per_share == yvault.pricePerShare()
+    assert snapshot.yvault_shares == yvault.balanceOf(strategy)
+    assert snapshot.want_balance == token.balanceOf(strategy)
+    assert snapshot.a_token_balance == aToken.balanceOf(strategy)
+    assert snapshot.debt_balance == vdToken.balanceOf(strategy)
+    assert snapshot.acceptable_costs_ray == strategy.acceptableCostsRay()
+    assert snapshot.max_gas_price_to_tend == strategy.maxGasPriceToTend()
+
+    assert snapshot.calc_max_debt() == tuple(
+        AaveLibrary.calcMaxDebt(borrow_token, strategy.acceptableCostsRay())
+    )
+
+    with pytest.raises(AttributeError):
+        snapshot.total_debt_eth = 0
+
+
+def test_snapshot_is_cached_per_block(levered, vault, strategy, gov, lendingPool):
+    snapshotter = Snapshotter()
+    before = snapshotter.snapshot(strategy)
+    assert snapshotter.snapshot(strategy, before.block_number) is before
+
+    chain.sleep(60 * 60 * 24)
+    chain.mine(1)
+    after = snapshotter.snapshot(strategy)
+    assert after.block_number > before.block_number
+    assert after.total_debt_eth > before.total_debt_eth
+
+    # older blocks are still served from the cache
+    assert snapshotter.snapshot(strategy, before.block_number) is before
+    assert after[2:8] == tuple(lendingPool.getUserAccountData(strategy))
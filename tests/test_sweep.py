@@ -0,0 +1,104 @@
+import csv
+from collections import namedtuple
+
+import pytest
+
+from scripts.backtest import Backtest, read_blocks
+from scripts.strategy_model import Block
+from scripts.sweep import grid, pareto_front, sweep, write_results
+
+RAY = 10 ** 27
+
+
+@pytest.fixture
+def blocks_csv(tmp_path):
+    # want loses 30% of its value halfway through
+    path = tmp_path / "blocks.csv"
+    with path.open("w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(Block._fields)
+        for i in range(600):
+            writer.writerow(
+                Block(
+                    block_number=12_000_000 + i,
+                    timestamp=1_620_000_000 + 13 * i,
+                    base_fee=(30 + i % 50) * 10 ** 9,
+                    available_liquidity=10 ** 24,
+                    total_stable_debt=0,
+                    total_variable_debt=10 ** 24 + i * 10 ** 20,
+                    variable_borrow_rate=RAY * 3 // 100,
+                    optimal_rate=RAY * 8 // 10,
+                    base_rate=0,
+                    slope1=RAY * 4 // 100,
+                    slope2=RAY * 3 // 4,
+                    want_liquidity_rate=RAY * 2 // 100,
+                    want_price=4 * 10 ** 14 if i < 300 else 28 * 10 ** 13,
+                    investment_token_price=4 * 10 ** 14,
+                    price_per_share=10 ** 18 + i * 10 ** 10,
+                )
+            )
+    yield path
+
+
+def test_grid_skips_rejected_params():
+    params = grid([5_000, 7_000, 9_500], [6_000, 9_000, 9_500], [RAY])
+    assert [(p.target_ltv_multiplier, p.warning_ltv_multiplier) for p in params] == [
+        (5_000, 6_000),
+        (5_000, 9_000),
+        (7_000, 9_000),
+    ]
+
+
+def test_sweep_matches_backtest(blocks_csv):
+    params = grid(
+        [4_000, 6_000],
+        [7_000, 8_000],
+        [RAY * 3 // 100, RAY],
+        [None, 10 ** 24],
+        [40 * 10 ** 9, 100 * 10 ** 9],
+    )
+    kwargs = {"withdraw_every": 100, "withdraw_bps": 1_000}
+    results = sweep([blocks_csv], params, workers=2, batch_size=3, **kwargs)
+
+    assert [result.params for result in results] == params
+    assert results == Backtest(params, **kwargs).run(read_blocks(blocks_csv))
+    assert all(result.withdrawn > 0 for result in results)
+
+
+def test_pareto_front():
+    Result = namedtuple("Result", "name pnl max_ltv tends")
+    results = [
+        Result("best pnl", 100, 6_000, 10),
+        Result("safer", 90, 5_000, 10),
+        Result("cheaper", 80, 6_000, 2),
+        Result("dominated", 70, 6_000, 10),
+        Result("same as safer", 90, 5_000, 10),
+        Result("safest", -10, 1_000, 50),
+    ]
+    assert [r.name for r in pareto_front(results)] == [
+        "best pnl",
+        "safer",
+        "cheaper",
+        "safest",
+    ]
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_write_results(blocks_csv, tmp_path, suffix):
+    if suffix == ".parquet":
+        pq = pytest.importorskip("pyarrow.parquet")
+
+    params = grid([5_000, 6_000], [8_000], [RAY])
+    results = Backtest(params).run(read_blocks(blocks_csv))
+    path = tmp_path / f"sweep{suffix}"
+    write_results(results, path)
+
+    if suffix == ".parquet":
+        columns = pq.read_table(path).to_pydict()
+    else:
+        with path.open(newline="") as f:
+            rows = list(csv.DictReader(f))
+        columns = {key: [row[key] for row in rows] for key in rows[0]}
+    assert [int(v) for v in columns["target_ltv_multiplier"]] == [5_000, 6_000]
+    assert [int(v) for v in columns["tends"]] == [r.tends for r in results]
+    assert [float(v) for v in columns["pnl"]] == [r.pnl / 10 ** 18 for r in results]
@@ -0,0 +1,117 @@
+import random
+from fractions import Fraction
+
+import pytest
+
+from scripts.strategy_snapshot import Snapshotter
+from scripts.threshold_index import LEVELS, Crossing, Position, ThresholdIndex
+
+MAX_BPS = 10_000
+
+
+def test_price_move_finds_crossed_strategies(
+    levered, strategy, token, borrow_token, lendingPool, aave_mock, gov
+):
+    if not aave_mock:
+        pytest.skip("prices can only be moved on the mock")
+
+    index = ThresholdIndex()
+    index.refresh(Snapshotter(), [strategy])
+    assert index.beyond(token, borrow_token, "warning") == []
+
+    # want loses value until the ratio is 1% under the warning one
+    warning = index.thresholds(strategy)["warning"]
+    it_price = aave_mock.price_oracle.getAssetPrice(borrow_token)
+    price = int(warning * it_price * 99 / 100)
+    aave_mock.set_price(token.symbol(), price)
+
+    crossings = index.set_price(token, price)
+    # levered at target LTV, it may or may not have been just under it
+    assert Crossing(strategy, "warning", True) in crossings
+    assert all(c.rising and c.level != "liquidation" for c in crossings)
+    data = lendingPool.getUserAccountData(strategy).dict()
+    ltv = data["totalDebtETH"] * MAX_BPS // data["totalCollateralETH"]
+    assert (
+        ltv
+        > data["currentLiquidationThreshold"]
+        * strategy.warningLTVMultiplier()
+        // MAX_BPS
+    )
+    assert strategy.tendTrigger(0)
+
+    # tend repays debt, the index is refreshed with the new balances
+    strategy.tend({"from": gov})
+    index.refresh(Snapshotter(), [strategy])
+    assert index.beyond(token, borrow_token, "warning") == []
+    assert index.thresholds(strategy)["warning"] < warning
+
+
+def brute_force(positions, prices, asset, price):
+    def ltv_at_or_above(position, level, prices):
+        ratio = Fraction(prices[position.want], prices[position.investment_token])
+        return ratio <= position.level_ratio(level)
+
+    moved = dict(prices, **{asset: price})
+    crossings = []
+    for position in positions:
+        for level in LEVELS:
+            if position.level_ratio(level) is None:
+                continue
+            before = ltv_at_or_above(position, level, prices)
+            after = ltv_at_or_above(position, level, moved)
+            if before != after:
+                crossings.append(Crossing(position.strategy, level, after))
+    return sorted(crossings)
+
+
+def test_crossings_match_brute_force():
+    rng = random.Random(1)
+    assets = ["WBTC", "WETH", "DAI", "USDC"]
+    prices = {asset: rng.randint(10 ** 14, 10 ** 19) for asset in assets}
+    positions = []
+    for i in range(300):
+        want, investment_token = rng.sample(assets, 2)
+        threshold = rng.randint(5_000, 8_500)
+        positions.append(
+            Position(
+                f"strategy{i}",
+                want,
+                investment_token,
+                rng.randint(1, 10 ** 24),
+                rng.choice([6, 8, 18]),
+                # some positions have no debt, they cannot cross anything
+                rng.choice([0, rng.randint(1, 10 ** 24)]),
+                rng.choice([6, 8, 18]),
+                threshold * 6_000 // MAX_BPS,
+                threshold * 8_000 // MAX_BPS,
+                threshold,
+            )
+        )
+
+    index = ThresholdIndex()
+    for position in positions:
+        index.update(position)
+    for asset, price in prices.items():
+        assert index.set_price(asset, price) == []
+
+    for _ in range(200):
+        asset = rng.choice(assets)
+        price = prices[asset] * rng.randint(50, 150) // 100
+        assert sorted(index.set_price(asset, price)) == brute_force(
+            positions, prices, asset, price
+        )
+        prices[asset] = price
+
+        # a tend or harvest changed a position
+        i = rng.randrange(len(positions))
+        positions[i] = positions[i]._replace(debt=rng.randint(0, 10 ** 24))
+        index.update(positions[i])
+
+    index.remove("strategy0")
+    assert len(index) == len(positions) - 1
+    assert all(
+        "strategy0" not in index.beyond(want, it, level)
+        for want in assets
+        for it in assets
+        for level in LEVELS
+    )